@@ -0,0 +1,314 @@
+"""
+Inventory stock adjustments for the Factory Inventory Management System
+Signed quantity_on_hand deltas are applied under a lock per SKU, so
+adjustments of different SKUs never wait for each other, and are appended
+to a write-ahead log before they are applied. A request is answered once
+its log entry is on disk; concurrent requests share one fsync (group
+commit). The log is replayed when the inventory is loaded, and worker
+processes sharing it read each other's batches before checking their own.
+"""
+
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: the log is only shared safely by the threads of one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# (item id, signed quantity delta)
+Adjustment = Tuple[str, int]
+
+# Bump when the log entry layout changes; a log written in another format is set aside
+LOG_FORMAT = 1
+
+
+def timestamp() -> str:
+    """The current local time, formatted like last_updated"""
+    return datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def adjusted(item: dict, delta: int, at: str) -> dict:
+    """A copy of an inventory item with delta added to its quantity on hand"""
+    return dict(item, quantity_on_hand=item['quantity_on_hand'] + delta, last_updated=at)
+
+
+class UnknownItemError(KeyError):
+    """An adjustment names an inventory item id that does not exist"""
+
+    @property
+    def item_id(self) -> str:
+        return self.args[0]
+
+
+class InsufficientStockError(ValueError):
+    """An adjustment would take an item's quantity on hand below zero"""
+
+    def __init__(self, item_id: str, quantity_on_hand: int, delta: int):
+        super().__init__(f"Adjustment of {delta} would take item {item_id} below zero "
+                         f"({quantity_on_hand} on hand)")
+        self.item_id = item_id
+        self.quantity_on_hand = quantity_on_hand
+        self.delta = delta
+
+
+class KeyedLocks:
+    """A lock per key, created on first use and kept for reuse"""
+
+    def __init__(self):
+        self._locks: Dict[Hashable, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    @contextmanager
+    def hold(self, keys: Iterable[Hashable]) -> Iterator[None]:
+        """Hold the locks of all keys, taken in sorted order so concurrent holders cannot deadlock"""
+        with self._guard:
+            locks = [self._locks.setdefault(key, threading.Lock()) for key in sorted(set(keys), key=str)]
+        acquired = []
+        try:
+            for lock in locks:
+                lock.acquire()
+                acquired.append(lock)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+
+def _source_stamp(source: str) -> list:
+    stat = os.stat(source)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _parse(data: bytes) -> Tuple[List[Tuple[str, List[Adjustment]]], int]:
+    """Batches of the complete lines of data, stopping at the first that does not parse, and the bytes they span"""
+    batches = []
+    end = 0
+    # The last element is what follows the final newline: empty, or a batch cut off mid write
+    for line in data.split(b'\n')[:-1]:
+        try:
+            entry = json.loads(line)
+            batches.append((entry['at'], [(item_id, delta) for item_id, delta in entry['adjustments']]))
+        except (ValueError, KeyError, TypeError):
+            break
+        end += len(line) + 1
+    return batches, end
+
+
+class AdjustmentLog:
+    """Append-only log of adjustment batches for the inventory loaded from source.
+
+    The first line is a header naming the log format and the size and mtime
+    of the source file. Each further line is one batch,
+    {"at": timestamp, "adjustments": [[id, delta], ...]}, written with a
+    single append so a batch is logged whole or, if the process dies mid
+    write, not at all: replay stops at the first incomplete line and cuts
+    it off. When the source file has changed since the log was started, its
+    entries no longer apply to it; the log is moved aside to path + '.stale'
+    and a new one is started on the first append.
+
+    Worker processes share the log. Replay, the header and every append run
+    under an exclusive flock, and locked() hands out the batches other
+    processes appended since this one last read the log, so a batch is
+    checked against the stock every earlier batch left, whichever worker
+    logged it.
+
+    append() only writes; wait() returns once everything up to a ticket is
+    fsynced. Whichever waiter finds no fsync in flight runs the next one
+    for every batch written so far, so under load one fsync covers many
+    requests.
+    """
+
+    def __init__(self, path: str, source: str):
+        self.path = path
+        self.source = source
+        self._fd: Optional[int] = None
+        self._stamp: Optional[list] = None
+        # Serializes this process's access to the file; the flock serializes processes
+        self._lock = threading.RLock()
+        self._depth = 0
+        # Bytes of the file read or written by this process, and batches read but not yet handed out
+        self._offset = 0
+        self._unapplied: List[Tuple[str, List[Adjustment]]] = []
+        # Descriptors of logs set aside while in use, kept open for waiters still syncing them
+        self._retired: List[int] = []
+        self._condition = threading.Condition()
+        self._written = 0
+        self._synced = 0
+        self._syncing = False
+
+    def _header(self) -> bytes:
+        return json.dumps({'format': LOG_FORMAT, 'source': self._stamp}).encode() + b'\n'
+
+    def _is_current(self, header: bytes) -> bool:
+        """Whether a header line names this log format and the source file as this process loaded it"""
+        try:
+            return json.loads(header) == {'format': LOG_FORMAT, 'source': self._stamp}
+        except ValueError:
+            return False
+
+    def replay(self) -> List[Tuple[str, List[Adjustment]]]:
+        """(timestamp, adjustments) of every batch logged against the current source file, oldest first"""
+        with self._lock:
+            self._stamp = _source_stamp(self.source)
+            if not os.path.exists(self.path):
+                return []
+            self._lock_file()
+            try:
+                data = os.pread(self._fd, os.fstat(self._fd).st_size, 0)
+                if not data:
+                    return []
+                header, _, body = data.partition(b'\n')
+                if not self._is_current(header):
+                    self._set_aside()
+                    self._unlock_file()
+                    os.close(self._fd)
+                    self._fd = None
+                    return []
+                batches, end = _parse(body)
+                self._offset = len(header) + 1 + end
+                if self._offset < len(data):
+                    self._truncate(self._offset)
+                self._unapplied = []
+                return batches
+            finally:
+                self._unlock_file()
+
+    def _set_aside(self):
+        try:
+            os.replace(self.path, self.path + '.stale')
+        except OSError as error:
+            logger.warning("Could not set aside stale adjustment log %s: %s", self.path, error)
+
+    def _truncate(self, length: int):
+        try:
+            os.ftruncate(self._fd, length)
+        except OSError as error:
+            logger.warning("Could not cut the incomplete tail off adjustment log %s: %s", self.path, error)
+
+    def _lock_file(self):
+        """Open the log if need be and flock it, reopening it when another process has set it aside"""
+        if self._stamp is None:
+            self._stamp = _source_stamp(self.source)
+        while True:
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+                self._offset = 0
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                current = os.stat(self.path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current == os.fstat(self._fd).st_ino:
+                return
+            self._unlock_file()
+            os.fsync(self._fd)
+            self._retired.append(self._fd)
+            self._fd = None
+
+    def _unlock_file(self):
+        if fcntl is not None and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _read_new(self):
+        """Start the log with a header if it is empty, else queue the batches appended since the last read"""
+        size = os.fstat(self._fd).st_size
+        if size == 0:
+            header = self._header()
+            self._write(self._fd, header)
+            self._offset = len(header)
+            return
+        if size == self._offset:
+            return
+        data = os.pread(self._fd, size - self._offset, self._offset)
+        start = 0
+        if self._offset == 0:
+            header, _, _ = data.partition(b'\n')
+            if not self._is_current(header):
+                raise OSError(f"{self.path} was started against another version of {self.source}")
+            start = len(header) + 1
+        batches, end = _parse(data[start:])
+        self._unapplied.extend(batches)
+        self._offset += start + end
+        if self._offset < size:
+            # Nobody writes while the flock is held, so this is a batch cut off by a crashed process
+            self._truncate(self._offset)
+
+    @contextmanager
+    def _held(self) -> Iterator[None]:
+        with self._lock:
+            if self._depth == 0:
+                self._lock_file()
+                try:
+                    self._read_new()
+                except BaseException:
+                    self._unlock_file()
+                    raise
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._unlock_file()
+
+    @contextmanager
+    def locked(self) -> Iterator[List[Tuple[str, List[Adjustment]]]]:
+        """Hold the log against every other writer, yielding the batches other processes logged meanwhile.
+
+        Apply those before checking a batch, then append() it before leaving.
+        Raises OSError if the log cannot be opened or belongs to another
+        version of the source file.
+        """
+        with self._held():
+            batches, self._unapplied = self._unapplied, []
+            yield batches
+
+    @staticmethod
+    def _write(fd: int, data: bytes):
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+
+    def append(self, at: str, adjustments: List[Adjustment]) -> int:
+        """Write one batch and return the ticket to wait() on; raises OSError if the log cannot be written"""
+        line = json.dumps({'at': at, 'adjustments': adjustments}, separators=(',', ':')).encode() + b'\n'
+        with self._held():
+            self._write(self._fd, line)
+            self._offset += len(line)
+            with self._condition:
+                self._written += 1
+                return self._written
+
+    def wait(self, ticket: int):
+        """Return once the batch with this ticket, and every one before it, is on disk"""
+        with self._condition:
+            while self._synced < ticket:
+                if self._syncing:
+                    self._condition.wait()
+                    continue
+                self._syncing = True
+                target, fd = self._written, self._fd
+                self._condition.release()
+                try:
+                    os.fsync(fd)
+                finally:
+                    self._condition.acquire()
+                    self._syncing = False
+                    self._condition.notify_all()
+                self._synced = max(self._synced, target)
+
+    def close(self):
+        with self._lock, self._condition:
+            for fd in self._retired + ([self._fd] if self._fd is not None else []):
+                os.close(fd)
+            self._fd = None
+            self._retired = []
@@ -0,0 +1,401 @@
+"""
+Precomputed aggregates for the Factory Inventory Management System
+Keeps dashboard totals per (warehouse, category, status, month) cell so any
+filter combination is answered by adding up the matching cells instead of
+rescanning inventory and orders, per-month order rollups behind the
+reports endpoints, and spending rollups over the transactions.
+"""
+
+import calendar
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from data_store import order_month_key, parse_period, period_label, quarter_label
+
+PENDING_STATUSES = ("Processing", "Backordered")
+
+
+def _matches(key: Optional[str], accepted: Optional[set]) -> bool:
+    return accepted is None or key in accepted
+
+
+def _accumulate(cell: list, index: int, value: float):
+    """Neumaier-compensated add of value into cell[index], keeping the error in cell[index + 1]"""
+    total = cell[index]
+    result = total + value
+    if abs(total) >= abs(value):
+        cell[index + 1] += (total - result) + value
+    else:
+        cell[index + 1] += (value - result) + total
+    cell[index] = result
+
+
+class DashboardCube:
+    """Dashboard totals bucketed by filter dimensions.
+
+    Order cells are keyed by (warehouse, category, status, month) and hold
+    [order count, pending count, total value, compensation]; inventory cells
+    are keyed by (warehouse, category) and hold [item count, low stock count,
+    inventory value, compensation]. Cells are dropped once their record count
+    falls back to zero. Category and status keys are lower-cased to match the
+    filter semantics.
+
+    Writes, including both halves of an update, happen under a lock, and
+    readers sum the cells under the same lock, so a total never mixes a
+    record's old and new contribution or meets a dict changing size.
+
+    Money totals are kept with compensated summation and combined with
+    math.fsum, so results are correctly rounded and do not depend on the
+    order in which records were added. That is a deliberate change from the
+    original endpoint, whose left-to-right sums could differ in the last
+    digit; on the shipped data both give the same values.
+    """
+
+    def __init__(self, inventory_items: Iterable[dict] = (), orders: Iterable[dict] = ()):
+        self.order_cells: Dict[Tuple, list] = {}
+        self.inventory_cells: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+        for item in inventory_items:
+            self.add_inventory_item(item)
+        for order in orders:
+            self.add_order(order)
+
+    @staticmethod
+    def _order_key(order: dict) -> Tuple:
+        return (
+            order.get('warehouse'),
+            (order.get('category') or '').lower(),
+            (order.get('status') or '').lower(),
+            order_month_key(order),
+        )
+
+    @staticmethod
+    def _inventory_key(item: dict) -> Tuple:
+        return (item.get('warehouse'), (item.get('category') or '').lower())
+
+    def _apply_order(self, order: dict, sign: int):
+        key = self._order_key(order)
+        cell = self.order_cells.setdefault(key, [0, 0, 0.0, 0.0])
+        cell[0] += sign
+        cell[1] += sign if order["status"] in PENDING_STATUSES else 0
+        _accumulate(cell, 2, sign * order["total_value"])
+        if cell[0] == 0:
+            del self.order_cells[key]
+
+    def _apply_inventory_item(self, item: dict, sign: int):
+        key = self._inventory_key(item)
+        cell = self.inventory_cells.setdefault(key, [0, 0, 0.0, 0.0])
+        cell[0] += sign
+        cell[1] += sign if item["quantity_on_hand"] <= item["reorder_point"] else 0
+        _accumulate(cell, 2, sign * item["quantity_on_hand"] * item["unit_cost"])
+        if cell[0] == 0:
+            del self.inventory_cells[key]
+
+    def add_order(self, order: dict):
+        with self._lock:
+            self._apply_order(order, 1)
+
+    def remove_order(self, order: dict):
+        with self._lock:
+            self._apply_order(order, -1)
+
+    def add_inventory_item(self, item: dict):
+        with self._lock:
+            self._apply_inventory_item(item, 1)
+
+    def remove_inventory_item(self, item: dict):
+        with self._lock:
+            self._apply_inventory_item(item, -1)
+
+    def update_inventory_item(self, previous: dict, item: dict):
+        """Move an item's contribution from its previous version to the current one, as one write"""
+        with self._lock:
+            self._apply_inventory_item(previous, -1)
+            self._apply_inventory_item(item, 1)
+
+    def order_totals(self, warehouse: Optional[set] = None, category: Optional[set] = None,
+                     status: Optional[set] = None, month: Optional[set] = None) -> Tuple[int, int, float]:
+        """Sum (order count, pending count, total value) over the matching cells"""
+        count = pending = 0
+        values = []
+        with self._lock:
+            for (w, c, s, m), cell in self.order_cells.items():
+                if _matches(w, warehouse) and _matches(c, category) and _matches(s, status) and _matches(m, month):
+                    count += cell[0]
+                    pending += cell[1]
+                    values += cell[2:4]
+        return count, pending, math.fsum(values)
+
+    def inventory_totals(self, warehouse: Optional[set] = None,
+                         category: Optional[set] = None) -> Tuple[float, int]:
+        """Sum (inventory value, low stock count) over the matching cells"""
+        low_stock = 0
+        values = []
+        with self._lock:
+            for (w, c), cell in self.inventory_cells.items():
+                if _matches(w, warehouse) and _matches(c, category):
+                    low_stock += cell[1]
+                    values += cell[2:4]
+        return math.fsum(values), low_stock
+
+
+class OrderPeriodRollup:
+    """Order count, delivered count and revenue per month, for any year.
+
+    Buckets are keyed by integer period (year * 100 + month) and hold
+    [order count, delivered count, revenue, compensation]. Quarterly figures
+    are summed from the three month buckets of each quarter. Reports are
+    built from a copy of the buckets taken under the lock that writes hold.
+    """
+
+    def __init__(self, orders: Iterable[dict] = ()):
+        self.buckets: Dict[int, list] = {}
+        self._lock = threading.Lock()
+        for order in orders:
+            self.add_order(order)
+
+    def _apply_order(self, order: dict, sign: int):
+        period = order_month_key(order)
+        if period is None:
+            return
+        bucket = self.buckets.setdefault(period, [0, 0, 0.0, 0.0])
+        bucket[0] += sign
+        bucket[1] += sign if order.get('status') == 'Delivered' else 0
+        _accumulate(bucket, 2, sign * order.get('total_value', 0))
+        if bucket[0] == 0:
+            del self.buckets[period]
+
+    def add_order(self, order: dict):
+        with self._lock:
+            self._apply_order(order, 1)
+
+    def remove_order(self, order: dict):
+        with self._lock:
+            self._apply_order(order, -1)
+
+    def snapshot(self) -> Dict[int, list]:
+        """Copy of the buckets, taken under the write lock"""
+        with self._lock:
+            return {period: bucket[:] for period, bucket in self.buckets.items()}
+
+    def monthly(self) -> List[dict]:
+        """Month-over-month rows in chronological order"""
+        return monthly_rows(self.snapshot())
+
+    def quarterly(self) -> List[dict]:
+        """Quarterly rows with average order value and fulfillment rate, in chronological order"""
+        return quarterly_rows(self.snapshot())
+
+
+def monthly_rows(buckets: Dict[int, list]) -> List[dict]:
+    """Format period buckets as month-over-month trend rows"""
+    return [
+        {
+            'month': period_label(period),
+            'order_count': bucket[0],
+            'revenue': math.fsum(bucket[2:4]),
+            'delivered_count': bucket[1]
+        }
+        for period, bucket in sorted(buckets.items())
+    ]
+
+
+def quarterly_rows(buckets: Dict[int, list]) -> List[dict]:
+    """Sum period buckets into quarterly report rows"""
+    quarters: Dict[str, list] = {}
+    for period, bucket in sorted(buckets.items()):
+        totals = quarters.setdefault(quarter_label(period), [0, 0, []])
+        totals[0] += bucket[0]
+        totals[1] += bucket[1]
+        totals[2] += bucket[2:4]
+
+    result = []
+    for quarter, (total_orders, delivered_orders, revenue_parts) in quarters.items():
+        total_revenue = math.fsum(revenue_parts)
+        result.append({
+            'quarter': quarter,
+            'total_orders': total_orders,
+            'total_revenue': total_revenue,
+            'delivered_orders': delivered_orders,
+            'avg_order_value': round(total_revenue / total_orders, 2),
+            'fulfillment_rate': round((delivered_orders / total_orders) * 100, 1)
+        })
+    return result
+
+
+# Dimensions of a spending cell, in key order
+SPENDING_DIMENSIONS = ('warehouse', 'category', 'type', 'vendor', 'month')
+
+# Cost bucket of each transaction type, and the summary field holding its total
+SPENDING_BUCKETS = {'Purchase': 'procurement', 'Operational': 'operational', 'Overhead': 'overhead'}
+SPENDING_TOTAL_FIELDS = {
+    'procurement': 'total_procurement_cost',
+    'operational': 'total_operational_cost',
+    'labor': 'total_labor_cost',
+    'overhead': 'total_overhead',
+}
+
+
+def spending_bucket(transaction_type: Optional[str], category: Optional[str]) -> str:
+    """Cost bucket of a transaction: labor for the Labor category, otherwise by type"""
+    if category == 'Labor':
+        return 'labor'
+    return SPENDING_BUCKETS.get(transaction_type, 'operational')
+
+
+class SpendingRollup:
+    """Transaction count and amount per (warehouse, category, type, vendor, month).
+
+    Cells hold [transaction count, amount, compensation] and are dropped once
+    their count falls back to zero. Any grouping over any of the dimensions
+    is summed from the matching cells, so a filtered breakdown never rescans
+    the transactions. Filters follow the orders: exact warehouse,
+    case-insensitive category and integer month periods. Writes and
+    groupings take the same lock.
+    """
+
+    def __init__(self, transactions: Iterable[dict] = ()):
+        self.cells: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+        for transaction in transactions:
+            self.add_transaction(transaction)
+
+    @staticmethod
+    def _key(transaction: dict) -> Tuple:
+        return (
+            transaction.get('warehouse'),
+            transaction.get('category'),
+            transaction.get('type'),
+            transaction.get('vendor'),
+            parse_period(transaction.get('date')),
+        )
+
+    def _apply_transaction(self, transaction: dict, sign: int):
+        key = self._key(transaction)
+        cell = self.cells.setdefault(key, [0, 0.0, 0.0])
+        cell[0] += sign
+        _accumulate(cell, 1, sign * transaction.get('amount', 0))
+        if cell[0] == 0:
+            del self.cells[key]
+
+    def add_transaction(self, transaction: dict):
+        with self._lock:
+            self._apply_transaction(transaction, 1)
+
+    def remove_transaction(self, transaction: dict):
+        with self._lock:
+            self._apply_transaction(transaction, -1)
+
+    def totals(self, by: Iterable[str], warehouse: Optional[set] = None, category: Optional[set] = None,
+               month: Optional[set] = None) -> Dict[Tuple, Tuple[int, float]]:
+        """(transaction count, amount) of the matching cells, grouped by the named dimensions"""
+        positions = [SPENDING_DIMENSIONS.index(name) for name in by]
+        groups: Dict[Tuple, list] = {}
+        with self._lock:
+            for key, cell in self.cells.items():
+                if (_matches(key[0], warehouse) and (category is None or (key[1] or '').lower() in category)
+                        and _matches(key[4], month)):
+                    group = groups.setdefault(tuple(key[position] for position in positions), [0, []])
+                    group[0] += cell[0]
+                    group[1] += cell[1:3]
+        return {key: (count, math.fsum(parts)) for key, (count, parts) in groups.items()}
+
+
+def _previous_period(period: int) -> int:
+    return period - 1 if period % 100 > 1 else (period // 100 - 1) * 100 + 12
+
+
+def _change(current: float, previous: float) -> float:
+    """Percentage change from previous to current, 0 without a previous figure"""
+    return round((current - previous) / previous * 100, 1) if previous else 0.0
+
+
+def _period_amounts(totals: Dict[Tuple, Tuple[int, float]],
+                    label: Callable[[str, str], Optional[str]]) -> Dict[Optional[int], Dict[str, float]]:
+    """Amounts per month period and label, from (type, category, month) totals; None labels are left out"""
+    parts: Dict[Optional[int], Dict[str, list]] = {}
+    for (transaction_type, category, period), (_, amount) in totals.items():
+        name = label(transaction_type, category)
+        if name is not None:
+            parts.setdefault(period, {}).setdefault(name, []).append(amount)
+    return {period: {name: math.fsum(amounts) for name, amounts in names.items()}
+            for period, names in parts.items()}
+
+
+def _selected_periods(periods: Iterable[Optional[int]],
+                      months: Optional[set]) -> Tuple[List[Optional[int]], Optional[int]]:
+    """Periods within the month filter, and the latest of them"""
+    selected = [period for period in periods if months is None or period in months]
+    dated = [period for period in selected if period is not None]
+    return selected, max(dated) if dated else None
+
+
+def spending_summary(totals: Dict[Tuple, Tuple[int, float]], months: Optional[set] = None) -> dict:
+    """Total per cost bucket over the selected months, with the latest month's change on the month before.
+
+    totals are (type, category, month) groups over every month, so the
+    month before the selection is available for the change.
+    """
+    amounts = _period_amounts(totals, spending_bucket)
+    selected, latest = _selected_periods(amounts, months)
+    summary = {}
+    for bucket, field in SPENDING_TOTAL_FIELDS.items():
+        summary[field] = round(math.fsum(amounts[period].get(bucket, 0.0) for period in selected), 2)
+    for bucket in SPENDING_TOTAL_FIELDS:
+        current = amounts.get(latest, {}).get(bucket, 0.0) if latest is not None else 0.0
+        previous = amounts.get(_previous_period(latest), {}).get(bucket, 0.0) if latest is not None else 0.0
+        summary[f'{bucket}_change'] = _change(current, previous)
+    return summary
+
+
+def monthly_spending(totals: Dict[Tuple, Tuple[int, float]], months: Optional[set] = None) -> List[dict]:
+    """Amount per cost bucket for each selected month with transactions, in chronological order"""
+    amounts = _period_amounts(totals, spending_bucket)
+    selected, _ = _selected_periods(amounts, months)
+    return [
+        {
+            'month': calendar.month_abbr[period % 100],
+            'period': period_label(period),
+            **{bucket: round(amounts[period].get(bucket, 0.0), 2) for bucket in SPENDING_TOTAL_FIELDS},
+        }
+        for period in sorted(period for period in selected if period is not None)
+    ]
+
+
+def category_spending(totals: Dict[Tuple, Tuple[int, float]], months: Optional[set] = None) -> List[dict]:
+    """Procurement amount per category over the selected months, its share, and the latest month's change"""
+    amounts = _period_amounts(
+        totals, lambda transaction_type, category: category if transaction_type == 'Purchase' else None)
+    selected, latest = _selected_periods(amounts, months)
+    categories = sorted({category for period in selected for category in amounts[period]})
+    spent = {category: math.fsum(amounts[period].get(category, 0.0) for period in selected)
+             for category in categories}
+    total = math.fsum(spent.values())
+    return [
+        {
+            'category': category,
+            'amount': round(spent[category], 2),
+            'percentage': round(spent[category] / total * 100, 1) if total else 0.0,
+            'change': _change(amounts.get(latest, {}).get(category, 0.0),
+                              amounts.get(_previous_period(latest), {}).get(category, 0.0))
+            if latest is not None else 0.0,
+        }
+        for category in categories
+    ]
+
+
+def spending_breakdown(dimension: str, totals: Dict[Tuple, Tuple[int, float]]) -> List[dict]:
+    """Amount, transaction count and share of each value of one dimension, largest first"""
+    total = math.fsum(amount for _, amount in totals.values())
+    rows = [
+        {
+            dimension: period_label(key) if dimension == 'month' and key is not None else key,
+            'amount': round(amount, 2),
+            'transaction_count': count,
+            'percentage': round(amount / total * 100, 1) if total else 0.0,
+        }
+        for (key,), (count, amount) in totals.items()
+    ]
+    rows.sort(key=lambda row: (-row['amount'], str(row[dimension])))
+    return rows
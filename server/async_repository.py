@@ -0,0 +1,107 @@
+"""
+Async data access for the Factory Inventory Management System
+Wraps a Repository for use from async handlers. Cheap calls on an in-memory
+repository (id lookups, index-backed pages, precomputed aggregates) run
+inline on the event loop, which avoids a threadpool hop per request. Calls
+that scan or aggregate over arbitrary filters, and every call on a
+repository doing blocking I/O, run on a small bounded executor so they can
+neither stall the event loop nor fan out into one thread per request.
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import profiling
+from repository import Criteria, Repository
+
+# Threads available for offloaded work; bounded so heavy requests queue instead of multiplying threads
+ANALYTICS_WORKERS = int(os.environ.get('INVENTORY_ANALYTICS_WORKERS') or min(4, os.cpu_count() or 1))
+
+analytics_executor = ThreadPoolExecutor(max_workers=ANALYTICS_WORKERS, thread_name_prefix='analytics')
+
+
+def _filtered(criteria: Criteria) -> int:
+    return sum(keys is not None for keys in criteria.values())
+
+
+class AsyncRepository:
+    """Awaitable view of a Repository.
+
+    Each method decides whether its call is cheap enough to run inline;
+    anything on a blocking repository is always offloaded.
+    """
+
+    def __init__(self, repository: Repository, executor: ThreadPoolExecutor = analytics_executor):
+        self.repository = repository
+        self.executor = executor
+
+    @property
+    def version(self):
+        return self.repository.version
+
+    async def run(self, function: Callable, *args, offload: bool = True):
+        """Call function, on the executor when offload is set or the repository blocks.
+
+        A profiled request runs everything inline, where its profiler can see it.
+        """
+        if (offload or self.repository.blocking) and not profiling.active.get():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(function, *args))
+        return function(*args)
+
+    async def size(self, collection: str) -> int:
+        return await self.run(self.repository.size, collection, offload=False)
+
+    async def get(self, collection: str, record_id: str) -> Optional[dict]:
+        return await self.run(self.repository.get, collection, record_id, offload=False)
+
+    async def get_many(self, collection: str, field: str, keys: List[str]) -> Dict[str, dict]:
+        return await self.run(self.repository.get_many, collection, field, keys, offload=False)
+
+    async def page(self, collection: str, limit: Optional[int], after: Optional[int], criteria: Criteria,
+                   date_contains: Optional[str] = None) -> Tuple[List[dict], Optional[int]]:
+        # Bounded pages stop early; free-form date filters may scan the whole collection
+        return await self.run(self.repository.page, collection, limit, after, criteria, date_contains,
+                              offload=date_contains is not None)
+
+    def iter_records(self, collection: str, after: Optional[int], criteria: Criteria,
+                     date_contains: Optional[str] = None) -> Iterator[dict]:
+        """A plain iterator; streaming responses already consume it off the event loop"""
+        return self.repository.iter_records(collection, after, criteria, date_contains)
+
+    async def count(self, collection: str, criteria: Criteria, date_contains: Optional[str] = None) -> int:
+        # A single criterion is answered from posting list sizes; anything more walks the matches
+        return await self.run(self.repository.count, collection, criteria, date_contains,
+                              offload=date_contains is not None or _filtered(criteria) > 1)
+
+    async def inventory_totals(self, criteria: Criteria) -> Tuple[float, int]:
+        return await self.run(self.repository.inventory_totals, criteria, offload=False)
+
+    async def order_totals(self, criteria: Criteria, date_contains: Optional[str] = None) -> Tuple[int, int, float]:
+        return await self.run(self.repository.order_totals, criteria, date_contains,
+                              offload=date_contains is not None)
+
+    async def order_period_buckets(self, criteria: Criteria) -> Dict[int, list]:
+        return await self.run(self.repository.order_period_buckets, criteria, offload=_filtered(criteria) > 0)
+
+    async def demand_forecasts(self) -> List[dict]:
+        return await self.run(self.repository.demand_forecasts, offload=False)
+
+    async def backlog_items(self) -> List[dict]:
+        return await self.run(self.repository.backlog_items, offload=False)
+
+    async def purchase_order_backlog_ids(self) -> set:
+        return await self.run(self.repository.purchase_order_backlog_ids, offload=False)
+
+    async def latest_purchase_order(self, backlog_item_id: str) -> Optional[dict]:
+        return await self.run(self.repository.latest_purchase_order, backlog_item_id, offload=False)
+
+    async def transactions(self) -> List[dict]:
+        return await self.run(self.repository.transactions, offload=False)
+
+    async def search(self, query: str, limit: int, types: Optional[List[str]] = None) -> List[dict]:
+        # Index lookups bounded by the limit; cheap enough for the event loop
+        return await self.run(self.repository.search, query, limit, types, offload=False)
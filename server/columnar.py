@@ -0,0 +1,257 @@
+"""
+Columnar order store for the Factory Inventory Management System
+Keeps NumPy arrays alongside the order dicts (values, coded filter fields,
+periods, delivery dates and flattened line items), so analytics over any
+filter combination run as vectorized masks and bincount reductions instead
+of Python loops over dicts.
+"""
+
+import math
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from aggregates import PENDING_STATUSES
+from data_store import order_month_key
+
+# Orders buffered by add_orders before they are folded in without waiting for a read, bounding the buffer
+MAX_PENDING_ORDERS = 8192
+
+
+class Codes:
+    """Dense integer codes for the distinct values of a categorical column"""
+
+    def __init__(self, values: Iterable[Optional[str]] = ()):
+        self.values: List[Optional[str]] = []
+        self._codes: Dict[Optional[str], int] = {}
+        for value in values:
+            self.encode(value)
+
+    def encode(self, value: Optional[str]) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def lookup(self, values: Iterable[Optional[str]]) -> np.ndarray:
+        """Codes of the given values that have been seen; unseen values match nothing"""
+        return np.array([self._codes[value] for value in values if value in self._codes], dtype=np.int32)
+
+
+# Array attributes of OrderColumns, in the order they are stored in a shared dataset
+ARRAYS = ('total_value', 'warehouse', 'category', 'status', 'pending', 'delivered', 'period', 'order_date',
+          'expected_delivery', 'actual_delivery', 'item_offsets', 'item_sku', 'item_quantity', 'item_unit_price')
+CODES = ('warehouses', 'categories', 'statuses', 'skus')
+
+
+def _datetime(value: Optional[str]) -> np.datetime64:
+    """A date column value; missing or unparseable dates are NaT, which no comparison matches"""
+    if not value:
+        return np.datetime64('NaT', 's')
+    try:
+        return np.datetime64(value, 's')
+    except ValueError:
+        return np.datetime64('NaT', 's')
+
+
+class OrderColumns:
+    """Orders as NumPy columns, with line items flattened into CSR-style arrays.
+
+    Order i owns line items item_offsets[i]:item_offsets[i + 1]. Category and
+    status codes are taken from lower-cased values to match the filter
+    semantics. Appended orders are buffered and folded into the arrays on the
+    next mask(); columns only ever grow, so reductions slice them to the
+    length of the mask they were given.
+    """
+
+    def __init__(self, orders: Iterable[dict] = ()):
+        self.warehouses = Codes()
+        self.categories = Codes()
+        self.statuses = Codes()
+        self.skus = Codes()
+        self._pending: List[dict] = []
+        self._lock = threading.Lock()
+
+        self.total_value = np.empty(0, dtype=np.float64)
+        self.warehouse = np.empty(0, dtype=np.int32)
+        self.category = np.empty(0, dtype=np.int32)
+        self.status = np.empty(0, dtype=np.int32)
+        self.pending = np.empty(0, dtype=bool)
+        self.delivered = np.empty(0, dtype=bool)
+        self.period = np.empty(0, dtype=np.int32)
+        self.order_date = np.empty(0, dtype='U1')
+        self.expected_delivery = np.empty(0, dtype='datetime64[s]')
+        self.actual_delivery = np.empty(0, dtype='datetime64[s]')
+        self.item_offsets = np.zeros(1, dtype=np.int64)
+        self.item_sku = np.empty(0, dtype=np.int32)
+        self.item_quantity = np.empty(0, dtype=np.int64)
+        self.item_unit_price = np.empty(0, dtype=np.float64)
+
+        self._pending.extend(orders)
+        self._flush()
+
+    @classmethod
+    def attach(cls, arrays: Dict[str, np.ndarray], codes: Dict[str, List[Optional[str]]],
+               appended: Iterable[dict] = ()) -> 'OrderColumns':
+        """Columns over arrays saved by shared_columns, used in place, plus orders appended since"""
+        columns = cls()
+        for name in ARRAYS:
+            setattr(columns, name, arrays[name])
+        for name in CODES:
+            setattr(columns, name, Codes(codes[name]))
+        columns._pending.extend(appended)
+        return columns
+
+    @classmethod
+    def shared_columns(cls, orders: Iterable[dict]) -> tuple:
+        """(arrays, code values) of the columns over orders, as written to a shared dataset"""
+        columns = cls(orders)
+        return ({name: getattr(columns, name) for name in ARRAYS},
+                {name: getattr(columns, name).values for name in CODES})
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._flush()
+            return len(self.total_value)
+
+    def add_order(self, order: dict):
+        """Buffer an order for the next read"""
+        with self._lock:
+            self._pending.append(order)
+
+    def add_orders(self, orders: List[dict]):
+        """Buffer a batch of orders for the next read, folding them in early once many are waiting"""
+        with self._lock:
+            self._pending.extend(orders)
+            if len(self._pending) >= MAX_PENDING_ORDERS:
+                self._flush()
+
+    def _flush(self):
+        """Fold buffered orders into the columns; callers hold the lock except during construction.
+
+        Every new array is built before any is assigned, so a failure part way
+        leaves the columns aligned and the batch buffered.
+        """
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        try:
+            columns = self._extended(batch)
+        except BaseException:
+            self._pending = batch + self._pending
+            raise
+        for name, array in columns.items():
+            setattr(self, name, array)
+
+    def _extended(self, batch: List[dict]) -> Dict[str, np.ndarray]:
+        """Every array with the orders of batch appended"""
+        items = [order.get('items') or [] for order in batch]
+        counts = np.fromiter((len(order_items) for order_items in items), dtype=np.int64, count=len(batch))
+        flat = [item for order_items in items for item in order_items]
+        # Sized to the longest date, so timestamps with fractions or offsets are kept whole for date_contains
+        order_date = np.array([order.get('order_date') or '' for order in batch], dtype=str)
+
+        return {
+            'total_value': np.concatenate([self.total_value, np.fromiter(
+                (order.get('total_value', 0) for order in batch), dtype=np.float64, count=len(batch))]),
+            'warehouse': np.concatenate([self.warehouse, np.fromiter(
+                (self.warehouses.encode(order.get('warehouse')) for order in batch),
+                dtype=np.int32, count=len(batch))]),
+            'category': np.concatenate([self.category, np.fromiter(
+                (self.categories.encode((order.get('category') or '').lower()) for order in batch),
+                dtype=np.int32, count=len(batch))]),
+            'status': np.concatenate([self.status, np.fromiter(
+                (self.statuses.encode((order.get('status') or '').lower()) for order in batch),
+                dtype=np.int32, count=len(batch))]),
+            'pending': np.concatenate([self.pending, np.fromiter(
+                (order.get('status') in PENDING_STATUSES for order in batch), dtype=bool, count=len(batch))]),
+            'delivered': np.concatenate([self.delivered, np.fromiter(
+                (order.get('status') == 'Delivered' for order in batch), dtype=bool, count=len(batch))]),
+            'period': np.concatenate([self.period, np.fromiter(
+                (order_month_key(order) or 0 for order in batch), dtype=np.int32, count=len(batch))]),
+            'order_date': np.concatenate([self.order_date, order_date]),
+            'expected_delivery': np.concatenate([self.expected_delivery, np.array(
+                [_datetime(order.get('expected_delivery')) for order in batch], dtype='datetime64[s]')]),
+            'actual_delivery': np.concatenate([self.actual_delivery, np.array(
+                [_datetime(order.get('actual_delivery')) for order in batch], dtype='datetime64[s]')]),
+            'item_offsets': np.concatenate([self.item_offsets, self.item_offsets[-1] + np.cumsum(counts)]),
+            'item_sku': np.concatenate([self.item_sku, np.fromiter(
+                (self.skus.encode(item.get('sku')) for item in flat), dtype=np.int32, count=len(flat))]),
+            'item_quantity': np.concatenate([self.item_quantity, np.fromiter(
+                (item.get('quantity', 0) for item in flat), dtype=np.int64, count=len(flat))]),
+            'item_unit_price': np.concatenate([self.item_unit_price, np.fromiter(
+                (item.get('unit_price', 0) for item in flat), dtype=np.float64, count=len(flat))]),
+        }
+
+    def mask(self, warehouse: Optional[Iterable[str]] = None, category: Optional[Iterable[str]] = None,
+             status: Optional[Iterable[str]] = None, month: Optional[Iterable[int]] = None,
+             date_contains: Optional[str] = None) -> np.ndarray:
+        """Boolean mask of orders matching every given filter.
+
+        Filters take the same keys as the order indexes (exact warehouse,
+        lower-cased category and status, integer periods); date_contains
+        matches a substring of order_date for free-form month values.
+        """
+        with self._lock:
+            self._flush()
+            filters = (
+                (self.warehouse, self.warehouses.lookup(warehouse) if warehouse is not None else None),
+                (self.category, self.categories.lookup(category) if category is not None else None),
+                (self.status, self.statuses.lookup(status) if status is not None else None),
+            )
+            period, order_date = self.period, self.order_date
+
+        selected = np.ones(len(period), dtype=bool)
+        for column, codes in filters:
+            if codes is not None:
+                selected &= np.isin(column, codes)
+        if month is not None:
+            selected &= np.isin(period, np.array(list(month), dtype=np.int32))
+        if date_contains is not None:
+            selected &= np.char.find(order_date, date_contains) >= 0
+        return selected
+
+    def order_totals(self, selected: np.ndarray) -> tuple:
+        """(order count, pending count, total value) over the selected orders.
+
+        The value is summed with math.fsum so it agrees exactly with the
+        correctly rounded totals of DashboardCube.
+        """
+        n = len(selected)
+        return (
+            int(np.count_nonzero(selected)),
+            int(np.count_nonzero(self.pending[:n] & selected)),
+            math.fsum(self.total_value[:n][selected].tolist())
+        )
+
+    def period_buckets(self, selected: np.ndarray) -> Dict[int, list]:
+        """Per-period [order count, delivered count, revenue, 0.0] over the selected orders.
+
+        Buckets use the same layout as OrderPeriodRollup, so the same row
+        formatting applies.
+        """
+        n = len(selected)
+        periods = self.period[:n][selected]
+        valid = periods > 0
+        keys, inverse = np.unique(periods[valid], return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(keys))
+        delivered = np.bincount(inverse, weights=self.delivered[:n][selected][valid], minlength=len(keys))
+        # Revenue is summed per bucket with math.fsum, as OrderPeriodRollup's compensated sums are
+        values = self.total_value[:n][selected][valid]
+        order = np.argsort(inverse, kind='stable')
+        revenue = [math.fsum(group.tolist()) for group in np.split(values[order], np.cumsum(counts)[:-1])]
+        return {
+            int(period): [int(count), int(delivered_count), value, 0.0]
+            for period, count, delivered_count, value in zip(keys, counts, delivered, revenue)
+        }
+
+    def sku_quantities(self, selected: np.ndarray) -> Dict[str, int]:
+        """Units ordered per SKU across the line items of the selected orders"""
+        offsets = self.item_offsets[:len(selected) + 1]
+        owners = np.repeat(selected, np.diff(offsets))
+        end = offsets[-1]
+        totals = np.bincount(self.item_sku[:end][owners], weights=self.item_quantity[:end][owners],
+                             minlength=len(self.skus.values))
+        return {self.skus.values[code]: int(total) for code, total in enumerate(totals) if total}
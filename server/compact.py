@@ -0,0 +1,196 @@
+"""
+Compact record storage for the Factory Inventory Management System
+Holds records as tuple rows that share one key tuple per distinct record
+shape, with repetitive string fields interned, and line items packed into
+flat typed arrays addressed by offset. A dict with line item dicts and
+repeated keys costs several times the data it holds; rows are materialized
+back into those dicts only when a record is read, typically just before it
+is serialized.
+"""
+
+import threading
+from array import array
+from collections.abc import Sequence
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Line items with exactly these keys, holding str, str, int and float values, are packed into the item arrays
+ITEM_KEYS = ('sku', 'name', 'quantity', 'unit_price')
+QUANTITY_RANGE = range(-2 ** 63, 2 ** 63)
+
+# Bump when the layout of state() changes so saved states are rebuilt
+COMPACT_FORMAT = 1
+
+# Row slot standing in for packed line items; JSON never yields it and marshal can save it
+_PACKED = Ellipsis
+
+
+class _Strings:
+    """Distinct strings with dense integer codes"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def encode(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class CompactRecords(Sequence):
+    """A sequence of record dicts stored as compact rows.
+
+    Each record becomes a tuple of its values plus the number of its shape,
+    the tuple of its keys, so keys are stored once per shape rather than
+    once per record.
+    Values of the interned fields share one string object per distinct
+    value. When items_field is set, a list of line items with the usual
+    sku/name/quantity/unit_price shape is stored in flat arrays; row i owns
+    items item_offsets[i]:item_offsets[i + 1]. Items of any other shape
+    stay in the row as they are. Reads return new dicts equal to the
+    records stored, key order included. Records are appended, or replaced
+    by a record with the same keys in the same order.
+    """
+
+    def __init__(self, records: Iterable[dict] = (), interned: Iterable[str] = (),
+                 items_field: Optional[str] = None):
+        self._interned_fields = frozenset(interned)
+        self._items_field = items_field
+        self._strings: Dict[str, str] = {}
+        self._shapes: List[Tuple[str, ...]] = []
+        self._shape_ids: Dict[Tuple[str, ...], int] = {}
+        self._shape_flags: List[Tuple[int, ...]] = []
+        self._row_shapes = array('I')
+        self._rows: List[tuple] = []
+        self._lock = threading.Lock()
+
+        self.item_offsets = array('q', [0])
+        self.item_sku = array('i')
+        self.item_name = array('i')
+        self.item_quantity = array('q')
+        self.item_unit_price = array('d')
+        self._item_strings = _Strings()
+
+        for record in records:
+            self._append(record)
+
+    def state(self) -> tuple:
+        """Everything needed to rebuild the records, as plain values marshal can save"""
+        with self._lock:
+            return (tuple(self._interned_fields), self._items_field, list(self._strings), list(self._shapes),
+                    list(self._rows), self._item_strings.values[:],
+                    tuple(column.tobytes() for column in self._columns()))
+
+    @classmethod
+    def from_state(cls, state: tuple) -> 'CompactRecords':
+        """Rebuild records saved by state() without materializing any of them"""
+        interned, items_field, strings, shapes, rows, item_strings, columns = state
+        records = cls((), interned, items_field)
+        records._strings = {value: value for value in strings}
+        for keys in shapes:
+            records._shape(tuple(keys))
+        records._rows = rows
+        for value in item_strings:
+            records._item_strings.encode(value)
+        for column, data in zip(records._columns(), columns):
+            del column[:]
+            column.frombytes(data)
+        return records
+
+    def _columns(self) -> Tuple[array, ...]:
+        return (self._row_shapes, self.item_offsets, self.item_sku, self.item_name, self.item_quantity,
+                self.item_unit_price)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _shape(self, keys: Tuple[str, ...]) -> int:
+        shape = self._shape_ids.get(keys)
+        if shape is None:
+            shape = self._shape_ids[keys] = len(self._shapes)
+            self._shapes.append(keys)
+            # Per key: 2 for the packed items field, 1 for an interned field, 0 otherwise
+            self._shape_flags.append(tuple(
+                2 if key == self._items_field else 1 if key in self._interned_fields else 0 for key in keys))
+        return shape
+
+    def _row(self, shape: int, record: dict, pack: bool) -> tuple:
+        strings = self._strings
+        row = []
+        for flag, value in zip(self._shape_flags[shape], record.values()):
+            if flag == 1 and type(value) is str:
+                value = strings.setdefault(value, value)
+            elif flag == 2 and pack and type(value) is list and self._pack(value):
+                value = _PACKED
+            row.append(value)
+        return tuple(row)
+
+    def _append(self, record: dict):
+        shape = self._shape(tuple(record))
+        row = self._row(shape, record, True)
+        # Item arrays and offsets are extended before the row appears, so readers never see a partial record
+        self.item_offsets.append(len(self.item_sku))
+        self._row_shapes.append(shape)
+        self._rows.append(row)
+
+    def _pack(self, items: List[dict]) -> bool:
+        """Append line items to the item arrays, unless any of them is not of the packed shape"""
+        encode = self._item_strings.encode
+        rows = []
+        for item in items:
+            if type(item) is not dict or tuple(item) != ITEM_KEYS:
+                return False
+            sku, name, quantity, unit_price = item.values()
+            if (type(sku) is not str or type(name) is not str or type(quantity) is not int
+                    or type(unit_price) is not float or quantity not in QUANTITY_RANGE):
+                return False
+            rows.append((encode(sku), encode(name), quantity, unit_price))
+        for column, values in zip((self.item_sku, self.item_name, self.item_quantity, self.item_unit_price),
+                                  zip(*rows)):
+            column.extend(values)
+        return True
+
+    def append(self, record: dict):
+        with self._lock:
+            self._append(record)
+
+    def __setitem__(self, position: int, record: dict):
+        """Replace a record; its line items stay in the row, as the item arrays only grow at the end"""
+        with self._lock:
+            shape = self._row_shapes[position]
+            if tuple(record) != self._shapes[shape]:
+                # Readers take a row's shape and values in two steps, so both must stay valid together
+                raise ValueError("a replacement record must have the same keys as the record it replaces")
+            self._rows[position] = self._row(shape, record, False)
+
+    def _items(self, position: int) -> List[dict]:
+        strings = self._item_strings.values
+        sku, name = self.item_sku, self.item_name
+        quantity, unit_price = self.item_quantity, self.item_unit_price
+        return [{'sku': strings[sku[i]], 'name': strings[name[i]], 'quantity': quantity[i],
+                 'unit_price': unit_price[i]}
+                for i in range(self.item_offsets[position], self.item_offsets[position + 1])]
+
+    def _materialize(self, position: int) -> dict:
+        record = dict(zip(self._shapes[self._row_shapes[position]], self._rows[position]))
+        items_field = self._items_field
+        if items_field is not None and record.get(items_field, None) is _PACKED:
+            record[items_field] = self._items(position)
+        return record
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self._rows)
+            if position < 0:
+                raise IndexError('record index out of range')
+        elif position >= len(self._rows):
+            raise IndexError('record index out of range')
+        return self._materialize(position)
+
+    def __iter__(self) -> Iterator[dict]:
+        for position in range(len(self._rows)):
+            yield self._materialize(position)
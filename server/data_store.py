@@ -0,0 +1,311 @@
+"""
+Indexed in-memory data store for the Factory Inventory Management System
+Wraps the record lists loaded by mock_data.py with a dict keyed by id and hash
+indexes on the common filter fields, so filtering intersects index postings
+instead of rescanning every record.
+"""
+
+import bisect
+import heapq
+import itertools
+import re
+import sys
+import threading
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+MONTH_PATTERN = re.compile(r'^\d{4}-\d{2}$')
+QUARTER_PATTERN = re.compile(r'^Q([1-4])-(\d{4})$')
+
+
+def field_key(field: str) -> Callable[[dict], Optional[str]]:
+    """Index key taken verbatim from a record field"""
+    return lambda record: record.get(field)
+
+
+def lower_field_key(field: str) -> Callable[[dict], Optional[str]]:
+    """Case-insensitive index key for a record field"""
+    return lambda record: (record.get(field) or '').lower()
+
+
+def parse_period(date: Optional[str]) -> Optional[int]:
+    """Parse the YYYY-MM prefix of an ISO date into an integer period (year * 100 + month)"""
+    if not date or len(date) < 7 or date[4] != '-':
+        return None
+    try:
+        year, month = int(date[:4]), int(date[5:7])
+    except ValueError:
+        return None
+    return year * 100 + month if 1 <= month <= 12 else None
+
+
+def order_month_key(record: dict) -> Optional[int]:
+    """Index key for the month of an order_date, as an integer period"""
+    return parse_period(record.get('order_date'))
+
+
+def period_label(period: int) -> str:
+    """Format an integer period as YYYY-MM"""
+    return f"{period // 100:04d}-{period % 100:02d}"
+
+
+def quarter_label(period: int) -> str:
+    """Format the quarter containing an integer period as Qn-YYYY"""
+    return f"Q{(period % 100 - 1) // 3 + 1}-{period // 100}"
+
+
+def month_keys(month: str) -> Optional[List[int]]:
+    """Translate a YYYY-MM or Qn-YYYY filter value into order month index keys.
+
+    Returns None when the value cannot be answered from the month index, in
+    which case callers fall back to matching the raw order_date.
+    """
+    quarter = QUARTER_PATTERN.match(month)
+    if quarter:
+        year, first = int(quarter.group(2)), int(quarter.group(1)) * 3 - 2
+        return [year * 100 + m for m in range(first, first + 3)]
+    period = parse_period(month) if MONTH_PATTERN.match(month) else None
+    return [period] if period else None
+
+
+# Shared by every DatasetVersion, so versions of different dataset generations never collide
+_version_numbers = itertools.count(1)
+
+
+class DatasetVersion:
+    """Version bumped whenever any dataset changes, used to invalidate derived caches.
+
+    Values are drawn from one process-wide counter, so they increase across
+    a dataset and any reloaded replacement of it, and a cache entry built
+    from one generation can never pass for another.
+    """
+
+    def __init__(self):
+        self.value = next(_version_numbers)
+
+    def bump(self, *_):
+        self.value = next(_version_numbers)
+
+
+def _tail(positions: List[int], first: int) -> Iterator[int]:
+    for i in range(first, len(positions)):
+        yield positions[i]
+
+
+class IndexedCollection:
+    """A list of records with an id lookup table and hash indexes.
+
+    Each index maps a key to a posting list of record positions in ascending
+    order, so query results keep the order of the underlying list. Records
+    are only ever appended, or replaced in place by a version with the same
+    index keys, so a record's position is a unique and stable sort key; it
+    is the keyset used by page(). The indexes hold positions and interned
+    keys rather than records, so records may also be a sequence that
+    decodes them on access, like MappedRecords.
+
+    mapped holds indexes that already cover the records present at
+    construction, such as the key indexes of a MappedRecords file: posting
+    maps with a column() of their keys by position, and under 'id' an
+    id -> position map. Those records are not added to them again; later
+    records are.
+    """
+
+    def __init__(self, records: List[dict], indexes: Dict[str, Callable[[dict], Hashable]],
+                 mapped: Optional[Dict[str, object]] = None):
+        mapped = mapped or {}
+        self.records = records
+        self.id_positions: Dict[str, int] = mapped.get('id', {})
+        self._key_funcs = indexes
+        self._postings: Dict[str, Dict[Hashable, List[int]]] = {name: mapped.get(name, {}) for name in indexes}
+        self._keys: Dict[str, List[Hashable]] = {
+            name: mapped[name].column() if name in mapped else [] for name in indexes
+        }
+        # Records below this position are indexed by mapped already, and only go into the other indexes
+        self._mapped_count = len(records) if mapped else 0
+        self._unmapped = {name: key_func for name, key_func in indexes.items() if name not in mapped}
+        self._ids_mapped = 'id' in mapped
+        self._listeners: List[Callable[[dict], None]] = []
+        self._batch_listeners: List[Callable[[List[dict]], None]] = []
+        self._update_listeners: List[Callable[[int, dict, dict], None]] = []
+        self._change_listeners: List[Callable[[], None]] = []
+        # Serializes writers, so listeners keeping aggregates see one change at a time; readers never take it
+        self._write_lock = threading.Lock()
+
+        for position, record in enumerate(records):
+            self._index(position, record)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def _index(self, position: int, record: dict):
+        covered = position < self._mapped_count
+        keys = {}
+        for name, key_func in (self._unmapped if covered else self._key_funcs).items():
+            key = key_func(record)
+            keys[name] = sys.intern(key) if type(key) is str else key
+        # Every key column gets its entry before any posting list names the position, so a
+        # concurrent _scan driven by one posting list can always check the other columns
+        for name, key in keys.items():
+            self._keys[name].append(key)
+        for name, key in keys.items():
+            self._postings[name].setdefault(key, []).append(position)
+        if not (covered and self._ids_mapped):
+            self.id_positions.setdefault(record.get('id'), position)
+
+    def add(self, record: dict):
+        """Append a record and index it"""
+        self.extend([record])
+
+    def extend(self, records: List[dict]):
+        """Append and index a batch of records, notifying batch listeners once for the whole batch"""
+        with self._write_lock:
+            for record in records:
+                position = len(self.records)
+                self.records.append(record)
+                self._index(position, record)
+                for listener in self._listeners:
+                    listener(record)
+            for listener in self._batch_listeners:
+                listener(records)
+            for listener in self._change_listeners:
+                listener()
+
+    def replace(self, position: int, record: dict):
+        """Swap the record at a position for an updated version of it with the same index keys"""
+        with self._write_lock:
+            previous = self.records[position]
+            for name, key_func in {'id': field_key('id'), **self._key_funcs}.items():
+                if key_func(record) != key_func(previous):
+                    raise ValueError(f"replacing record {position} would change its {name} key")
+            self.records[position] = record
+            for listener in self._update_listeners:
+                listener(position, previous, record)
+            for listener in self._change_listeners:
+                listener()
+
+    def copy(self) -> 'IndexedCollection':
+        """A new collection over a shallow copy of the records, with the same indexes and no listeners"""
+        return IndexedCollection(list(self.records), self._key_funcs)
+
+    def subscribe(self, listener: Callable[[dict], None]):
+        """Register a callback invoked with each record added to the collection"""
+        self._listeners.append(listener)
+
+    def subscribe_batches(self, listener: Callable[[List[dict]], None]):
+        """Register a callback invoked once with each batch of records added, after they are all indexed"""
+        self._batch_listeners.append(listener)
+
+    def subscribe_updates(self, listener: Callable[[int, dict, dict], None]):
+        """Register a callback invoked with the position, previous and new record of each replacement"""
+        self._update_listeners.append(listener)
+
+    def subscribe_changes(self, listener: Callable[[], None]):
+        """Register a callback invoked after each batch or replacement, once every other listener has run"""
+        self._change_listeners.append(listener)
+
+    def get(self, record_id: str) -> Optional[dict]:
+        """Look up a record by id"""
+        position = self.id_positions.get(record_id)
+        return None if position is None else self.records[position]
+
+    def lookup(self, name: str, key: Hashable) -> List[dict]:
+        """Records whose index key equals key, in list order"""
+        records = self.records
+        return [records[position] for position in self._postings[name].get(key, [])]
+
+    def keys(self, name: str) -> List[Hashable]:
+        """Distinct keys present in an index"""
+        return list(self._postings[name])
+
+    def postings(self, name: str, keys: Iterable[Hashable]) -> List[int]:
+        """Positions of records whose index key is any of keys, in ascending order"""
+        lists = [self._postings[name].get(key, []) for key in dict.fromkeys(keys)]
+        if len(lists) == 1:
+            return lists[0]
+        return list(heapq.merge(*lists))
+
+    def _posting_size(self, name: str, keys: set) -> int:
+        postings = self._postings[name]
+        return sum(len(postings.get(key, ())) for key in keys)
+
+    def _iter_postings(self, name: str, keys: set, start: int) -> Iterator[int]:
+        """Merged posting positions >= start, without copying the posting lists"""
+        iterators = []
+        for key in keys:
+            positions = self._postings[name].get(key)
+            if positions:
+                first = bisect.bisect_left(positions, start)
+                iterators.append(_tail(positions, first))
+        if len(iterators) == 1:
+            return iterators[0]
+        return heapq.merge(*iterators)
+
+    def _scan(self, criteria: dict, after: Optional[int] = None,
+              predicate: Optional[Callable[[dict], bool]] = None) -> Iterator[Tuple[int, dict]]:
+        start = 0 if after is None else after + 1
+        active = [(name, set(keys)) for name, keys in criteria.items() if keys is not None]
+        records = self.records
+
+        if active:
+            active.sort(key=lambda entry: self._posting_size(*entry))
+            positions = self._iter_postings(*active[0], start)
+            checks = [(self._keys[name], keys) for name, keys in active[1:]]
+        else:
+            positions = range(start, len(records))
+            checks = []
+
+        for position in positions:
+            if all(column[position] in keys for column, keys in checks):
+                record = records[position]
+                if predicate is None or predicate(record):
+                    yield position, record
+
+    def iter_query(self, *, after: Optional[int] = None, predicate: Optional[Callable[[dict], bool]] = None,
+                   **criteria: Optional[Iterable[Hashable]]) -> Iterator[dict]:
+        """Lazily yield records matching every criterion, in list order.
+
+        Each criterion maps an index name to the accepted keys; None skips it.
+        The most selective posting list drives the scan and the remaining
+        criteria are checked against the per-record key columns. Scanning
+        starts just past the position `after`, and `predicate` filters
+        anything the indexes cannot answer.
+        """
+        for _, record in self._scan(criteria, after, predicate):
+            yield record
+
+    def query(self, *, predicate: Optional[Callable[[dict], bool]] = None,
+              **criteria: Optional[Iterable[Hashable]]) -> List[dict]:
+        """Return records matching every criterion (see iter_query)"""
+        if predicate is None and all(keys is None for keys in criteria.values()):
+            return list(self.records)
+        return list(self.iter_query(predicate=predicate, **criteria))
+
+    def page(self, limit: Optional[int], *, after: Optional[int] = None,
+             predicate: Optional[Callable[[dict], bool]] = None,
+             **criteria: Optional[Iterable[Hashable]]) -> Tuple[List[dict], Optional[int]]:
+        """Return up to limit matching records after a position, plus the position to resume from.
+
+        Positions are the keyset: they are unique even when record ids repeat
+        and never move because the collection is append-only. The resume
+        position is None once the result set is exhausted. Only the requested
+        page is scanned, so deep pages cost about the same as the first. A
+        limit of None returns every remaining match.
+        """
+        page = []
+        last = None
+        for position, record in self._scan(criteria, after, predicate):
+            if len(page) == limit:
+                return page, last
+            page.append(record)
+            last = position
+        return page, None
+
+    def count(self, *, predicate: Optional[Callable[[dict], bool]] = None,
+              **criteria: Optional[Iterable[Hashable]]) -> int:
+        """Number of records matching every criterion"""
+        active = [(name, set(keys)) for name, keys in criteria.items() if keys is not None]
+        if predicate is None and len(active) <= 1:
+            return self._posting_size(*active[0]) if active else len(self.records)
+        return sum(1 for _ in self._scan(criteria, predicate=predicate))
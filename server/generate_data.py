@@ -1,30 +1,35 @@
 """
-Script to generate sample data spread across all months of 2025
+Script to generate a seeded, consistent sample dataset at any scale
+
+Writes every file mock_data.py loads (inventory, orders, demand forecasts,
+backlog items, purchase orders, transactions and spending) so that SKUs,
+warehouses, order numbers and backlog items refer to each other. The same
+seed and scale always produce the same files. Orders and transactions are
+streamed to disk, so 10^7 orders can be written without holding them in memory.
+
+Usage:
+    python generate_data.py --seed 42 --orders 100000 --output-dir /tmp/bench-data
 """
+import argparse
 import json
+import os
 import random
+from collections import defaultdict
 from datetime import datetime, timedelta
 
-# Product catalog
-products = [
-    {"sku": "WDG-001", "name": "Industrial Widget Type A", "category": "Widgets", "price": 24.99},
-    {"sku": "WDG-002", "name": "Industrial Widget Type B", "category": "Widgets", "price": 29.99},
-    {"sku": "WDG-003", "name": "Industrial Widget Type C", "category": "Widgets", "price": 34.50},
-    {"sku": "BRG-102", "name": "Steel Bearing Assembly", "category": "Components", "price": 89.50},
-    {"sku": "BRG-103", "name": "Ceramic Bearing Assembly", "category": "Components", "price": 125.00},
-    {"sku": "GSK-203", "name": "High-Temperature Gasket", "category": "Components", "price": 12.75},
-    {"sku": "GSK-204", "name": "Standard Gasket", "category": "Components", "price": 8.50},
-    {"sku": "GSK-205", "name": "Heavy Duty Gasket", "category": "Components", "price": 15.99},
-    {"sku": "MTR-304", "name": "Electric Motor 5HP", "category": "Equipment", "price": 445.00},
-    {"sku": "MTR-305", "name": "Electric Motor 10HP", "category": "Equipment", "price": 725.00},
-    {"sku": "MTR-306", "name": "Electric Motor 3HP", "category": "Equipment", "price": 325.00},
-    {"sku": "FLT-405", "name": "Oil Filter Cartridge", "category": "Consumables", "price": 8.25},
-    {"sku": "FLT-406", "name": "Air Filter Cartridge", "category": "Consumables", "price": 6.50},
-    {"sku": "FLT-407", "name": "Fuel Filter Cartridge", "category": "Consumables", "price": 7.75},
-    {"sku": "VLV-506", "name": "Pressure Relief Valve", "category": "Components", "price": 156.00},
-    {"sku": "VLV-507", "name": "Ball Valve", "category": "Components", "price": 95.00},
-    {"sku": "VLV-508", "name": "Gate Valve", "category": "Components", "price": 110.50},
-]
+# Category catalog: SKU prefix and product names per category
+CATALOG = {
+    "Circuit Boards": ("PCB", ["Single Layer PCB Assembly", "Dual Layer PCB Assembly", "Multi Layer PCB Assembly",
+                               "Flexible PCB Assembly", "Rigid-Flex PCB Assembly"]),
+    "Sensors": ("SNR", ["Temperature Sensor Module", "Pressure Sensor", "Proximity Sensor", "Humidity Sensor",
+                        "Ultrasonic Sensor", "Accelerometer Module", "Gyroscope Module"]),
+    "Actuators": ("ACT", ["Servo Motor", "Stepper Motor", "Linear Actuator", "Solenoid Valve"]),
+    "Controllers": ("CTL", ["Logic Controller Board", "Motor Driver Board", "PWM Controller", "LED Driver",
+                            "Microcontroller Unit"]),
+    "Power Supplies": ("PSU", ["Switching Power Supply", "Linear Power Supply", "DC-DC Converter"]),
+}
+
+BASE_WAREHOUSES = ["San Francisco", "London", "Tokyo"]
 
 customers = [
     "Acme Manufacturing Corp", "TechBuild Industries", "Global Parts Ltd",
@@ -39,96 +44,304 @@ customers = [
     "Summit Parts Corp", "Velocity Industries"
 ]
 
-warehouses = ["A", "B", "C"]
+suppliers = [
+    "Industrial Supply Co", "Precision Parts Ltd", "Global Components Inc",
+    "TechSource Distribution", "Allied Electronics Supply", "Prime Manufacturing Partners"
+]
+
 statuses = ["Delivered", "Shipped", "Processing", "Backordered"]
 
-# Generate orders for each month of 2025
-orders = []
-order_id = 1
+# Transaction types with their spending categories, vendors and amount ranges
+TRANSACTION_TYPES = {
+    "Purchase": (["Circuit Boards", "Sensors", "Actuators", "Controllers", "Power Supplies"],
+                 suppliers, (2000, 25000)),
+    "Operational": (["Labor", "Operational"], ["Internal", "FastShip Logistics", "TechMaintain Pro"], (500, 18000)),
+    "Overhead": (["Overhead"], ["PowerGrid Services", "SecureGuard Insurance", "Facility Care Services"], (300, 9000)),
+}
 
-for month in range(1, 13):  # Jan to Dec
-    # Generate 8-12 orders per month
-    num_orders = random.randint(8, 12)
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
 
-    for _ in range(num_orders):
-        # Random day in the month
-        day = random.randint(1, 28)  # Using 28 to avoid month-end issues
-        hour = random.randint(8, 17)
-        minute = random.randint(0, 59)
 
-        order_date = f"2025-{month:02d}-{day:02d}T{hour:02d}:{minute:02d}:00"
+def build_warehouses(count):
+    """Warehouse names, starting with the sample sites"""
+    return BASE_WAREHOUSES[:count] + [f"Warehouse {n}" for n in range(len(BASE_WAREHOUSES) + 1, count + 1)]
 
-        # Expected delivery 7-14 days later
-        order_datetime = datetime(2025, month, day, hour, minute)
-        delivery_days = random.randint(7, 14)
-        expected_delivery = order_datetime + timedelta(days=delivery_days)
 
-        # Determine status based on date (earlier orders more likely to be delivered)
-        if month <= 8:
-            status = random.choices(statuses, weights=[70, 20, 5, 5])[0]
-        elif month <= 10:
-            status = random.choices(statuses, weights=[40, 40, 15, 5])[0]
-        else:
-            status = random.choices(statuses, weights=[10, 30, 40, 20])[0]
+def build_products(rng, count):
+    """Product catalog of count SKUs spread across the categories"""
+    categories = list(CATALOG)
+    products = []
+    for n in range(count):
+        category = categories[n % len(categories)]
+        prefix, names = CATALOG[category]
+        number = n // len(categories) + 1
+        name = names[(number - 1) % len(names)]
+        if number > len(names):
+            name = f"{name} Rev {(number - 1) // len(names) + 1}"
+        products.append({
+            "sku": f"{prefix}-{number:03d}",
+            "name": name,
+            "category": category,
+            "price": round(rng.uniform(5, 450), 2),
+        })
+    return products
 
-        # Select 1-3 products for the order
-        num_items = random.randint(1, 3)
-        order_products = random.sample(products, num_items)
 
-        items = []
-        total_value = 0
-        primary_category = None
+def write_json_array(path, records):
+    """Stream an iterable of records to a JSON array file"""
+    with open(path, "w") as f:
+        f.write("[")
+        for n, record in enumerate(records):
+            f.write(",\n" if n else "\n")
+            json.dump(record, f)
+        f.write("\n]\n")
 
-        for product in order_products:
-            quantity = random.randint(50, 1000)
-            item_value = quantity * product["price"]
-            total_value += item_value
 
-            if primary_category is None:
-                primary_category = product["category"]
+def generate_inventory(rng, products, warehouses):
+    for n, product in enumerate(products, start=1):
+        warehouse = warehouses[(n - 1) % len(warehouses)]
+        reorder_point = rng.randint(50, 300)
+        yield {
+            "id": str(n),
+            "sku": product["sku"],
+            "name": product["name"],
+            "category": product["category"],
+            "warehouse": warehouse,
+            "quantity_on_hand": rng.randint(0, reorder_point * 3),
+            "reorder_point": reorder_point,
+            "unit_cost": round(product["price"] * 0.6, 2),
+            "location": f"Warehouse {'ABC'[(n - 1) % 3]}-{rng.randint(1, 20):02d}",
+            "last_updated": "2025-09-30T10:30:00",
+        }
 
-            items.append({
-                "sku": product["sku"],
-                "name": product["name"],
-                "quantity": quantity,
-                "unit_price": product["price"]
-            })
 
-        warehouse = random.choice(warehouses)
+def order_months(start_year, years):
+    """(year, month) of every month orders and transactions are spread over"""
+    return [(start_year + n // 12, n % 12 + 1) for n in range(years * 12)]
+
+
+def order_number(n, count, start_year, years):
+    """Order number of the nth of count orders, which carries the year the order was placed in"""
+    months = order_months(start_year, years)
+    year, _ = months[(n - 1) * len(months) // count]
+    return f"ORD-{year}-{n:04d}"
+
+
+def generate_orders(rng, products, warehouses, count, start_year, years):
+    """Orders spread evenly over the months of the requested years"""
+    months = order_months(start_year, years)
+    for n in range(1, count + 1):
+        year, month = months[(n - 1) * len(months) // count]
+        order_datetime = datetime(year, month, rng.randint(1, 28), rng.randint(8, 17), rng.randint(0, 59))
+        delivery_days = rng.randint(7, 14)
+        expected_delivery = order_datetime + timedelta(days=delivery_days)
+
+        # Earlier orders are more likely to be delivered
+        progress = (months.index((year, month)) + 1) / len(months)
+        if progress <= 0.67:
+            status = rng.choices(statuses, weights=[70, 20, 5, 5])[0]
+        elif progress <= 0.84:
+            status = rng.choices(statuses, weights=[40, 40, 15, 5])[0]
+        else:
+            status = rng.choices(statuses, weights=[10, 30, 40, 20])[0]
+
+        items = []
+        total_value = 0
+        order_products = rng.sample(products, min(rng.randint(1, 3), len(products)))
+        primary_category = order_products[0]["category"]
+        for product in order_products:
+            quantity = rng.randint(50, 1000)
+            total_value += quantity * product["price"]
+            items.append({"sku": product["sku"], "name": product["name"],
+                          "quantity": quantity, "unit_price": product["price"]})
 
         order = {
-            "id": str(order_id),
-            "order_number": f"ORD-2025-{order_id:04d}",
-            "customer": random.choice(customers),
+            "id": str(n),
+            "order_number": f"ORD-{year}-{n:04d}",
+            "customer": rng.choice(customers),
             "items": items,
             "status": status,
-            "warehouse": warehouse,
+            "warehouse": rng.choice(warehouses),
             "category": primary_category,
-            "order_date": order_date,
+            "order_date": order_datetime.strftime("%Y-%m-%dT%H:%M:%S"),
             "expected_delivery": expected_delivery.strftime("%Y-%m-%dT%H:%M:%S"),
-            "total_value": round(total_value, 2)
+            "total_value": round(total_value, 2),
         }
-
-        if status == "Delivered" and month <= 10:
-            actual_delivery = order_datetime + timedelta(days=random.randint(6, delivery_days + 2))
+        if status == "Delivered":
+            actual_delivery = order_datetime + timedelta(days=rng.randint(6, delivery_days + 2))
             order["actual_delivery"] = actual_delivery.strftime("%Y-%m-%dT%H:%M:%S")
+        yield order
 
-        orders.append(order)
-        order_id += 1
 
-# Save to file
-with open('data/orders.json', 'w') as f:
-    json.dump(orders, f, indent=2)
+def generate_demand_forecasts(rng, products):
+    for n, product in enumerate(products, start=1):
+        current = rng.randint(50, 1000)
+        trend = rng.choice(["increasing", "stable", "decreasing"])
+        if trend == "increasing":
+            forecasted = int(current * rng.uniform(1.05, 1.6))
+        elif trend == "decreasing":
+            forecasted = int(current * rng.uniform(0.5, 0.95))
+        else:
+            forecasted = current + rng.randint(-(current // 100), current // 100)
+        yield {
+            "id": str(n),
+            "item_sku": product["sku"],
+            "item_name": product["name"],
+            "current_demand": current,
+            "forecasted_demand": forecasted,
+            "trend": trend,
+            "period": "Next 30 days",
+        }
 
-print(f"Generated {len(orders)} orders across 12 months of 2025")
 
-# Count orders per month
-from collections import defaultdict
-orders_per_month = defaultdict(int)
-for order in orders:
-    month = order['order_date'][5:7]
-    orders_per_month[month] += 1
-
-print("\nOrders per month:")
-for month in sorted(orders_per_month.keys()):
-    print(f"  {month}: {orders_per_month[month]} orders")
+def generate_backlog_items(rng, products, order_count, start_year, years, count):
+    for n in range(1, count + 1):
+        product = rng.choice(products)
+        needed = rng.randint(20, 1500)
+        yield {
+            "id": str(n),
+            "order_id": order_number(rng.randint(1, max(order_count, 1)), max(order_count, 1), start_year, years),
+            "item_sku": product["sku"],
+            "item_name": product["name"],
+            "quantity_needed": needed,
+            "quantity_available": rng.randint(0, needed - 1),
+            "days_delayed": rng.randint(0, 14),
+            "priority": rng.choice(["high", "medium", "low"]),
+        }
+
+
+def generate_purchase_orders(rng, products, backlog_count, count, start_year):
+    for n in range(1, count + 1):
+        created = datetime(start_year, rng.randint(1, 12), rng.randint(1, 28), 9, 0)
+        yield {
+            "id": f"PO-{n:04d}",
+            "backlog_item_id": str(rng.randint(1, backlog_count)),
+            "supplier_name": rng.choice(suppliers),
+            "quantity": rng.randint(20, 1500),
+            "unit_cost": rng.choice(products)["price"],
+            "expected_delivery_date": (created + timedelta(days=rng.randint(7, 30))).strftime("%Y-%m-%d"),
+            "status": rng.choice(["Pending", "Approved", "Shipped", "Received"]),
+            "created_date": created.strftime("%Y-%m-%dT%H:%M:%S"),
+            "notes": None,
+        }
+
+
+def generate_transactions(rng, products, warehouses, count, start_year, years, totals):
+    """Transactions spread over the requested years; totals collects spending per (type, category, year, month)"""
+    months = order_months(start_year, years)
+    for n in range(1, count + 1):
+        year, month = months[(n - 1) * len(months) // count]
+        txn_type = rng.choices(list(TRANSACTION_TYPES), weights=[50, 35, 15])[0]
+        categories, vendors, (low, high) = TRANSACTION_TYPES[txn_type]
+        category = rng.choice(categories)
+        amount = round(rng.uniform(low, high), 2)
+        description = f"{rng.choice(products)['name']} Purchase" if txn_type == "Purchase" else f"{category} Expense"
+        totals[(txn_type, category, year, month)] += amount
+        yield {
+            "id": f"TXN-{year}-{n:06d}",
+            "date": f"{year}-{month:02d}-{rng.randint(1, 28):02d}",
+            "description": description,
+            "category": category,
+            "warehouse": rng.choice(warehouses),
+            "amount": amount,
+            "vendor": rng.choice(vendors),
+            "type": txn_type,
+        }
+
+
+def build_spending(totals):
+    """Spending summary blobs derived from the generated transactions"""
+    def month_total(period, txn_type, category=None):
+        return round(sum(amount for (t, c, *p), amount in totals.items()
+                         if t == txn_type and tuple(p) == period and (category is None or c == category)), 2)
+
+    monthly = [{
+        "month": MONTH_NAMES[month - 1],
+        "period": f"{year}-{month:02d}",
+        "procurement": month_total((year, month), "Purchase"),
+        "operational": month_total((year, month), "Operational", "Operational"),
+        "labor": month_total((year, month), "Operational", "Labor"),
+        "overhead": month_total((year, month), "Overhead"),
+    } for year, month in sorted({(year, month) for *_, year, month in totals})]
+
+    purchase_by_category = defaultdict(float)
+    for (txn_type, category, *_), amount in totals.items():
+        if txn_type == "Purchase":
+            purchase_by_category[category] += amount
+    purchase_total = sum(purchase_by_category.values()) or 1
+
+    return {
+        "spending_summary": {
+            "total_procurement_cost": round(sum(m["procurement"] for m in monthly), 2),
+            "total_operational_cost": round(sum(m["operational"] for m in monthly), 2),
+            "total_labor_cost": round(sum(m["labor"] for m in monthly), 2),
+            "total_overhead": round(sum(m["overhead"] for m in monthly), 2),
+            "procurement_change": 0.0,
+            "operational_change": 0.0,
+            "labor_change": 0.0,
+            "overhead_change": 0.0,
+        },
+        "monthly_spending": monthly,
+        "category_spending": [{
+            "category": category,
+            "amount": round(amount, 2),
+            "percentage": round(amount / purchase_total * 100, 1),
+            "change": 0.0,
+        } for category, amount in sorted(purchase_by_category.items())],
+    }
+
+
+def generate(output_dir, seed=42, orders=120, skus=32, warehouses=3, backlog_items=4,
+             purchase_orders=0, transactions=56, start_year=2025, years=1):
+    """Write a full dataset to output_dir and return the number of records per file"""
+    rng = random.Random(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    warehouse_names = build_warehouses(warehouses)
+    products = build_products(rng, skus)
+    totals = defaultdict(float)
+
+    def path(name):
+        return os.path.join(output_dir, name)
+
+    write_json_array(path("inventory.json"), generate_inventory(rng, products, warehouse_names))
+    write_json_array(path("orders.json"), generate_orders(rng, products, warehouse_names, orders, start_year, years))
+    write_json_array(path("demand_forecasts.json"), generate_demand_forecasts(rng, products))
+    write_json_array(path("backlog_items.json"),
+                     generate_backlog_items(rng, products, orders, start_year, years, backlog_items))
+    write_json_array(path("purchase_orders.json"),
+                     generate_purchase_orders(rng, products, max(backlog_items, 1), purchase_orders, start_year))
+    write_json_array(path("transactions.json"), generate_transactions(
+        rng, products, warehouse_names, transactions, start_year, years, totals))
+    with open(path("spending.json"), "w") as f:
+        json.dump(build_spending(totals), f, indent=2)
+
+    return {"inventory": skus, "orders": orders, "demand_forecasts": skus, "backlog_items": backlog_items,
+            "purchase_orders": purchase_orders, "transactions": transactions}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--output-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--orders", type=int, default=120)
+    parser.add_argument("--skus", type=int, default=32)
+    parser.add_argument("--warehouses", type=int, default=3)
+    parser.add_argument("--backlog-items", type=int, default=4)
+    parser.add_argument("--purchase-orders", type=int, default=0)
+    parser.add_argument("--transactions", type=int, default=56)
+    parser.add_argument("--start-year", type=int, default=2025)
+    parser.add_argument("--years", type=int, default=1)
+    args = parser.parse_args()
+
+    counts = generate(args.output_dir, seed=args.seed, orders=args.orders, skus=args.skus,
+                      warehouses=args.warehouses, backlog_items=args.backlog_items,
+                      purchase_orders=args.purchase_orders, transactions=args.transactions,
+                      start_year=args.start_year, years=args.years)
+
+    print(f"Generated dataset in {args.output_dir} (seed {args.seed}):")
+    for name, count in counts.items():
+        print(f"  {name}: {count}")
+
+
+if __name__ == "__main__":
+    main()
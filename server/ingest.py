@@ -0,0 +1,308 @@
+"""
+Streaming bulk import for the Factory Inventory Management System
+Parses NDJSON or CSV request bodies chunk by chunk into rows, validates the
+rows against a Pydantic model a batch at a time and collects per-row
+errors. Only the line being parsed and the current batch are held, so an
+upload of any size is imported in bounded memory. Stored batches can be
+kept in an ImportLog, replayed onto the dataset whenever it is loaded.
+"""
+
+import csv
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Iterator, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized between the threads of one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPES = frozenset({'application/x-ndjson', 'application/ndjson', 'application/jsonl'})
+CSV_MEDIA_TYPES = frozenset({'text/csv', 'application/csv'})
+
+# Rows validated and added to the repository together
+IMPORT_BATCH_SIZE = 1000
+
+# Longest line (or quoted CSV record) accepted; anything longer aborts the import
+MAX_LINE_BYTES = 1 << 20
+
+# Per-row errors listed in a report; later ones are only counted
+MAX_REPORTED_ERRORS = 100
+
+# (row number, parsed row or None, reason the row could not be parsed or None)
+Row = Tuple[int, Optional[object], Optional[str]]
+
+
+class UploadError(ValueError):
+    """The body cannot be read any further"""
+
+
+class ImportReport:
+    """Counts of imported and rejected rows, with the first MAX_REPORTED_ERRORS row errors.
+
+    aborted holds the reason reading stopped early, if it did; rows of
+    batches stored before that stay imported.
+    """
+
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+        self.errors_truncated = False
+        self.aborted: Optional[str] = None
+
+    def add(self, imported: int, errors: List[dict]):
+        """Count one batch: rows imported, and an error dict per problem found in a rejected row"""
+        self.imported += imported
+        self.failed += len({error['row'] for error in errors})
+        room = MAX_REPORTED_ERRORS - len(self.errors)
+        self.errors += errors[:room]
+        self.errors_truncated = self.errors_truncated or len(errors) > room
+
+    def as_dict(self) -> dict:
+        return {
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.errors_truncated,
+            'aborted': self.aborted,
+        }
+
+
+def row_error(row: int, message: str, field: Optional[str] = None) -> dict:
+    return {'row': row, 'field': field, 'message': message}
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    """Numbered lines of the body, without their line endings"""
+    buffer = bytearray()
+    number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while True:
+            end = buffer.find(b'\n', start)
+            if end < 0:
+                break
+            number += 1
+            yield number, bytes(buffer[start:end]).rstrip(b'\r')
+            start = end + 1
+        del buffer[:start]
+        if len(buffer) > MAX_LINE_BYTES:
+            raise UploadError(f"Line {number + 1} is longer than {MAX_LINE_BYTES} bytes")
+    if buffer:
+        yield number + 1, bytes(buffer).rstrip(b'\r')
+
+
+async def ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Row]:
+    """One row per non-blank line, numbered by line"""
+    async for number, line in _lines(chunks):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line), None
+        except ValueError as error:
+            yield number, None, f"Invalid JSON: {error}"
+
+
+async def csv_rows(chunks: AsyncIterator[bytes], json_fields: Iterable[str] = ()) -> AsyncIterator[Row]:
+    """One row dict per record after the header row, numbered by the line the record starts on.
+
+    Empty values are left out, so optional fields read as missing. Values of
+    json_fields hold JSON, such as an order's line items, and are decoded.
+    Quoted values may span lines.
+    """
+    json_fields = frozenset(json_fields)
+    header: Optional[List[str]] = None
+    pending: List[str] = []
+    first = 0
+    async for number, line in _lines(chunks):
+        try:
+            text = line.decode('utf-8')
+        except UnicodeDecodeError as error:
+            yield number, None, f"Invalid UTF-8: {error}"
+            continue
+        if not pending:
+            first = number
+        pending.append(text)
+        record = '\n'.join(pending)
+        # An odd number of quotes means a quoted value continues on the next line
+        if record.count('"') % 2:
+            if len(record) > MAX_LINE_BYTES:
+                raise UploadError(f"Record starting on line {first} is longer than {MAX_LINE_BYTES} bytes")
+            continue
+        pending = []
+        if not record.strip():
+            continue
+        values = next(csv.reader([record]))
+        if header is None:
+            header = [name.lstrip('\ufeff').strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield first, None, f"Expected {len(header)} fields, found {len(values)}"
+            continue
+        row = {}
+        problem = None
+        for name, value in zip(header, values):
+            if value == '':
+                continue
+            if name in json_fields:
+                try:
+                    value = json.loads(value)
+                except ValueError as error:
+                    problem = f"Invalid JSON in {name}: {error}"
+                    break
+            row[name] = value
+        yield first, (None if problem else row), problem
+    if pending:
+        yield first, None, "Unterminated quoted value"
+
+
+def body_rows(media_type: str, chunks: AsyncIterator[bytes], json_fields: Iterable[str] = ()) -> AsyncIterator[Row]:
+    """Rows of a body of the given media type; raises UploadError for types that cannot be imported"""
+    if media_type in NDJSON_MEDIA_TYPES:
+        return ndjson_rows(chunks)
+    if media_type in CSV_MEDIA_TYPES:
+        return csv_rows(chunks, json_fields)
+    raise UploadError(f"Unsupported media type {media_type or '(none)'}; send NDJSON or CSV")
+
+
+def validate_rows(model: Type[BaseModel], rows: List[Row]) -> Tuple[List[Tuple[int, dict]], List[dict]]:
+    """(row number, record) for each row the model accepts, as stored records, and the errors of the rest"""
+    records, errors = [], []
+    for number, row, problem in rows:
+        if problem is not None:
+            errors.append(row_error(number, problem))
+            continue
+        try:
+            records.append((number, model.model_validate(row).model_dump(exclude_none=True)))
+        except ValidationError as error:
+            errors += [row_error(number, detail['msg'], '.'.join(str(part) for part in detail['loc']) or None)
+                       for detail in error.errors()]
+    return records, errors
+
+
+async def import_rows(rows: AsyncIterator[Row],
+                      import_batch: Callable[[List[Row]], Awaitable[Tuple[int, List[dict]]]]) -> ImportReport:
+    """Hand rows to import_batch IMPORT_BATCH_SIZE at a time and total up what it reports.
+
+    import_batch validates and stores one batch, returning the number of
+    rows imported and the errors of the rest. The next batch is only read
+    once the previous one is stored.
+    """
+    report = ImportReport()
+    batch: List[Row] = []
+    try:
+        async for row in rows:
+            batch.append(row)
+            if len(batch) == IMPORT_BATCH_SIZE:
+                report.add(*await import_batch(batch))
+                batch = []
+    except UploadError as error:
+        # Rows read before the problem are still imported, so the report says exactly what was stored
+        report.aborted = str(error)
+    if batch:
+        report.add(*await import_batch(batch))
+    return report
+
+
+class ImportLog:
+    """Append-only log of the records imported into one dataset.
+
+    Each line is one stored batch as a JSON array, written with a single
+    append under an exclusive flock and fsynced before the batch is added
+    to the repository, so imports outlive restarts and reloads of the data
+    files. Unlike the adjustment log it is not tied to a version of the
+    data file: imported records are new records, not deltas. Reading stops
+    at the first incomplete line, left by a process dying mid write, and
+    cuts it off. The log remembers how far this process has read it, so
+    locked() hands over only the records other writers logged since.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._fd: Optional[int] = None
+        # Bytes of the log this process has taken in, by reading it or by its own appends
+        self._offset = 0
+
+    def _open(self) -> int:
+        fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        return fd
+
+    @contextmanager
+    def _held(self) -> Iterator[int]:
+        """The log's descriptor, held under its flock; nested uses share it"""
+        with self._lock:
+            if self._fd is not None:
+                yield self._fd
+                return
+            self._fd = self._open()
+            try:
+                yield self._fd
+            finally:
+                # Closing the descriptor releases the flock
+                fd, self._fd = self._fd, None
+                os.close(fd)
+
+    def _read(self, fd: int) -> List[dict]:
+        """Records of the complete lines past the offset, which moves past them"""
+        size = os.fstat(fd).st_size
+        if size < self._offset:
+            # The log was replaced; read the new one from the start
+            self._offset = 0
+        data = os.pread(fd, size - self._offset, self._offset)
+        records, end = [], 0
+        for line in data.split(b'\n')[:-1]:
+            try:
+                batch = json.loads(line)
+            except ValueError:
+                break
+            records += batch
+            end += len(line) + 1
+        if end < len(data):
+            try:
+                os.ftruncate(fd, self._offset + end)
+            except OSError as error:
+                logger.warning("Could not cut the incomplete tail off import log %s: %s", self.path, error)
+        self._offset += end
+        return records
+
+    def replay(self) -> List[dict]:
+        """Every logged record, oldest first"""
+        if not os.path.exists(self.path):
+            return []
+        with self._held() as fd:
+            self._offset = 0
+            return self._read(fd)
+
+    @contextmanager
+    def locked(self) -> Iterator[List[dict]]:
+        """Hold the log against every other writer, yielding the records logged since this process last read it.
+
+        Add those to the dataset, then append() any batch of its own before
+        leaving. Raises OSError if the log cannot be opened.
+        """
+        with self._held() as fd:
+            yield self._read(fd)
+
+    def append(self, records: List[dict]):
+        """Write one batch and return once it is on disk; raises OSError if the log cannot be written"""
+        line = json.dumps(records, separators=(',', ':')).encode() + b'\n'
+        view = memoryview(line)
+        with self._held() as fd:
+            size = os.fstat(fd).st_size
+            while view:
+                view = view[os.write(fd, view):]
+            os.fsync(fd)
+            if self._offset == size:
+                self._offset += len(line)
@@ -1,50 +1,105 @@
-from fastapi import FastAPI, HTTPException
+import functools
+import itertools
+import json
+import os
+import re
+import threading
+from contextlib import asynccontextmanager
+from datetime import datetime
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
-from pydantic import BaseModel
-from mock_data import inventory_items, orders, demand_forecasts, backlog_items, spending_summary, monthly_spending, category_spending, recent_transactions, purchase_orders
-
-app = FastAPI(title="Factory Inventory Management System")
-
-# Quarter mapping for date filtering
-QUARTER_MAP = {
-    'Q1-2025': ['2025-01', '2025-02', '2025-03'],
-    'Q2-2025': ['2025-04', '2025-05', '2025-06'],
-    'Q3-2025': ['2025-07', '2025-08', '2025-09'],
-    'Q4-2025': ['2025-10', '2025-11', '2025-12']
-}
-
-def filter_by_month(items: list, month: Optional[str]) -> list:
-    """Filter items by month/quarter based on order_date field"""
-    if not month or month == 'all':
-        return items
-
-    if month.startswith('Q'):
-        # Handle quarters
-        if month in QUARTER_MAP:
-            months = QUARTER_MAP[month]
-            return [item for item in items if any(m in item.get('order_date', '') for m in months)]
-    else:
-        # Direct month match
-        return [item for item in items if month in item.get('order_date', '')]
-
-    return items
-
-def apply_filters(items: list, warehouse: Optional[str] = None, category: Optional[str] = None,
-                 status: Optional[str] = None) -> list:
-    """Apply common filters to a list of items"""
-    filtered = items
-
-    if warehouse and warehouse != 'all':
-        filtered = [item for item in filtered if item.get('warehouse') == warehouse]
-
-    if category and category != 'all':
-        filtered = [item for item in filtered if item.get('category', '').lower() == category.lower()]
-
-    if status and status != 'all':
-        filtered = [item for item in filtered if item.get('status', '').lower() == status.lower()]
-
-    return filtered
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from typing import Annotated, Callable, Dict, Iterable, Iterator, List, Literal, Optional, Tuple, Type
+from pydantic import AfterValidator, BaseModel, Field, TypeAdapter, create_model
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from adjustments import Adjustment, InsufficientStockError, UnknownItemError
+from aggregates import (category_spending, monthly_rows, monthly_spending, quarterly_rows, spending_breakdown,
+                        spending_summary)
+from data_store import month_keys
+from ingest import UploadError, body_rows, import_rows, row_error, validate_rows
+from async_repository import AsyncRepository
+from metrics import PROMETHEUS_MEDIA_TYPE, MetricsMiddleware, registry as metrics_registry
+from profiling import ProfileStore, ProfilingMiddleware, token_matches
+from reloader import DataReloader
+from repository import Criteria, Repository
+from response_cache import ResponseCache, cache_key, entity_tag, etag_matches
+from search import RESULT_TYPES
+from mock_data import data_signature, load_repository, repository
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the remaining datasets in the background; until they are all in
+    # memory, data access runs on the analytics executor instead of inline
+    threading.Thread(target=repository.warm, name="data-warmup", daemon=True).start()
+    data_reloader.start()
+    yield
+    data_reloader.stop()
+
+app = FastAPI(title="Factory Inventory Management System", lifespan=lifespan)
+
+def _filter_keys(value: Optional[str], lower: bool = False) -> Optional[List[str]]:
+    """Index keys for a filter value, or None when the filter is not applied"""
+    if not value or value == 'all':
+        return None
+    return [value.lower() if lower else value]
+
+def _filter_criteria(warehouse: Optional[str] = None, category: Optional[str] = None,
+                     status: Optional[str] = None, month: Optional[str] = None
+                     ) -> Tuple[Criteria, Optional[str]]:
+    """Repository criteria for the common filters, plus a date substring for month values the index cannot answer"""
+    criteria = {
+        'warehouse': _filter_keys(warehouse),
+        'category': _filter_keys(category, lower=True),
+        'status': _filter_keys(status, lower=True),
+    }
+    date_contains = None
+    if month and month != 'all':
+        criteria['month'] = month_keys(month)
+        # Unrecognised quarters leave items unfiltered; other free-form values match anywhere in the date
+        if criteria['month'] is None and not month.startswith('Q'):
+            date_contains = month
+    return criteria, date_contains
+
+def _inventory_criteria(warehouse: Optional[str] = None, category: Optional[str] = None) -> Criteria:
+    """Repository criteria for the inventory filters"""
+    return {'warehouse': _filter_keys(warehouse), 'category': _filter_keys(category, lower=True)}
+
+class ConditionalGetMiddleware:
+    """Tag GET /api responses with an ETag and answer matching If-None-Match with 304.
+
+    The tag is derived from the dataset version, path, query and requested
+    representation, so a match is decided before any handler runs. Written
+    as plain ASGI middleware: the @app.middleware("http") wrapper runs every
+    request through an extra task and body stream.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not scope["path"].startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        key = cache_key(request.url.path, request.query_params.multi_items()) + (request.headers.get("accept", ""),)
+        etag = entity_tag(repository.version.value, key)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            metrics_registry.not_modified += 1
+            await Response(status_code=304, headers={"ETag": etag, "Vary": "Accept"})(scope, receive, send)
+            return
+
+        async def send_tagged(message: Message):
+            if message["type"] == "http.response.start" and 200 <= message["status"] < 300:
+                headers = MutableHeaders(scope=message)
+                headers["ETag"] = etag
+                headers["Vary"] = "Accept"
+            await send(message)
+
+        await self.app(scope, receive, send_tagged)
+
+app.add_middleware(ConditionalGetMiddleware)
 
 # CORS middleware
 app.add_middleware(
@@ -53,8 +108,56 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Total-Count", "X-Profile-Id"],
 )
 
+# Outermost, so latency covers every other middleware
+app.add_middleware(MetricsMiddleware)
+
+# Admin token for on-demand request profiling; unset, profiling and /debug/profiles are off
+PROFILING_TOKEN = os.environ.get('INVENTORY_PROFILING_TOKEN') or None
+
+# Most recent request profiles kept for /debug/profiles
+profile_store = ProfileStore(int(os.environ.get('INVENTORY_PROFILE_HISTORY', '20')))
+
+# Only installed when enabled, so ordinary traffic never goes through it
+if PROFILING_TOKEN:
+    app.add_middleware(ProfilingMiddleware, token=PROFILING_TOKEN, store=profile_store)
+
+# Largest page a paginated list request may ask for
+MAX_PAGE_SIZE = 5000
+
+# Most keys of one kind a batch lookup may ask for
+MAX_BATCH_SIZE = 5000
+
+# Most results one search may ask for
+MAX_SEARCH_RESULTS = 100
+
+# Streamed collections are sent as newline-delimited JSON, this many records per chunk
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_BATCH_SIZE = 256
+
+# Encoded bodies of read-mostly endpoints, invalidated by the repository's dataset version
+response_cache = ResponseCache()
+
+def _publish(reloaded: Repository):
+    """Make a reloaded repository current with one reference swap.
+
+    Handlers take a local reference to the repository before using it, so a
+    request that is already running finishes against the dataset it started
+    with. Dataset versions never repeat across reloads, so cached bodies and
+    ETags of the old dataset simply stop matching; the cache is cleared only
+    to free their memory.
+    """
+    global repository
+    repository = reloaded
+    response_cache.clear()
+
+# Polls the data files and publishes a rebuilt repository when they change;
+# INVENTORY_RELOAD_INTERVAL=0 turns it off
+data_reloader = DataReloader(load_repository, _publish, data_signature,
+                             interval=float(os.environ.get('INVENTORY_RELOAD_INTERVAL', '2')))
+
 # Data models
 class InventoryItem(BaseModel):
     id: str
@@ -112,6 +215,41 @@ class PurchaseOrder(BaseModel):
     created_date: str
     notes: Optional[str] = None
 
+class Transaction(BaseModel):
+    id: str
+    date: str
+    description: str
+    category: str
+    warehouse: str
+    amount: float
+    vendor: str
+    type: str
+
+# Dates as the data files write them: YYYY-MM-DD, optionally with a THH:MM[:SS] time
+IMPORT_DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}(T\d{2}:\d{2}(:\d{2})?)?')
+
+def _import_date(value: str) -> str:
+    """Reject dates the month index and delivery analytics cannot read"""
+    try:
+        if IMPORT_DATE_PATTERN.fullmatch(value):
+            datetime.fromisoformat(value)
+            return value
+    except ValueError:
+        pass
+    raise ValueError("must be a date as YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS")
+
+ImportDate = Annotated[str, AfterValidator(_import_date)]
+
+class OrderImport(Order):
+    """An imported order, whose dates must parse before it reaches the indexes and reports"""
+    order_date: ImportDate
+    expected_delivery: ImportDate
+    actual_delivery: Optional[ImportDate] = None
+
+class TransactionImport(Transaction):
+    """An imported transaction, whose date must parse before it reaches the spending rollups"""
+    date: ImportDate
+
 class CreatePurchaseOrderRequest(BaseModel):
     backlog_item_id: str
     supplier_name: str
@@ -120,189 +258,699 @@ class CreatePurchaseOrderRequest(BaseModel):
     expected_delivery_date: str
     notes: Optional[str] = None
 
+class ReplenishmentRecommendation(BaseModel):
+    id: str
+    sku: str
+    name: str
+    category: str
+    warehouse: str
+    quantity_on_hand: int
+    reorder_point: int
+    unit_cost: float
+    forecasted_demand: float
+    backlog_quantity: float
+    on_order_quantity: float
+    projected_quantity: float
+    shortfall: float
+    recommended_quantity: int
+    recommended_cost: float
+
+class SearchResult(BaseModel):
+    type: Literal['inventory', 'order', 'customer', 'order_item']
+    score: int
+    id: Optional[str] = None
+    sku: Optional[str] = None
+    name: Optional[str] = None
+    warehouse: Optional[str] = None
+    category: Optional[str] = None
+    order_number: Optional[str] = None
+    customer: Optional[str] = None
+    status: Optional[str] = None
+    order_date: Optional[str] = None
+    order_count: Optional[int] = None
+
+class InventoryBatchRequest(BaseModel):
+    ids: List[str] = Field(default_factory=list, max_length=MAX_BATCH_SIZE)
+    skus: List[str] = Field(default_factory=list, max_length=MAX_BATCH_SIZE)
+
+class InventoryBatchResponse(BaseModel):
+    found: List[InventoryItem]
+    missing: Dict[str, List[str]]
+
+class OrderBatchRequest(BaseModel):
+    ids: List[str] = Field(default_factory=list, max_length=MAX_BATCH_SIZE)
+    order_numbers: List[str] = Field(default_factory=list, max_length=MAX_BATCH_SIZE)
+
+class OrderBatchResponse(BaseModel):
+    found: List[Order]
+    missing: Dict[str, List[str]]
+
+class ImportRowError(BaseModel):
+    row: int
+    field: Optional[str] = None
+    message: str
+
+class ImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: List[ImportRowError]
+    errors_truncated: bool
+    aborted: Optional[str] = None
+
+class InventoryAdjustmentRequest(BaseModel):
+    delta: int
+
+class StockAdjustment(BaseModel):
+    id: str
+    delta: int
+
+class InventoryAdjustmentsRequest(BaseModel):
+    adjustments: List[StockAdjustment] = Field(min_length=1, max_length=MAX_BATCH_SIZE)
+
+def _projection(fields: Optional[str], model: Type[BaseModel]) -> List[str]:
+    """Parse a comma-separated fields= value against a model's fields"""
+    if not fields:
+        return list(model.model_fields)
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = [name for name in names if name not in model.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+def _projector(fields: Optional[str], model: Type[BaseModel]) -> Callable[[dict], dict]:
+    """Build a function projecting records onto a model's fields, filling optional defaults"""
+    names = _projection(fields, model)
+    defaults = {name: info.default for name, info in model.model_fields.items() if not info.is_required()}
+    return lambda record: {name: record.get(name, defaults.get(name)) for name in names}
+
+def _data() -> AsyncRepository:
+    """The current repository, for one request.
+
+    Taking the reference once per request keeps every call of that request
+    on the same dataset generation, even if a reload swaps it meanwhile.
+    """
+    return AsyncRepository(repository)
+
+async def _parse_cursor(after: Optional[str], repo: AsyncRepository, collection: str) -> Optional[int]:
+    """Decode a pagination cursor into the load position it resumes after"""
+    if after is None:
+        return None
+    if not after.isdigit() or int(after) >= await repo.size(collection):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return int(after)
+
+# Responses with more records than this are encoded on the analytics executor instead of the event loop
+INLINE_ENCODE_LIMIT = 200
+
+async def _encoded(repo: AsyncRepository, size: int, build: Callable[[], Response]) -> Response:
+    return await repo.run(build, offload=size > INLINE_ENCODE_LIMIT)
+
+async def _paged_response(collection: str, model: Type[BaseModel], criteria: Criteria, date_contains: Optional[str],
+                          limit: Optional[int], after: Optional[str], fields: Optional[str],
+                          include_total: bool) -> Response:
+    """Serve one keyset page of a filtered collection.
+
+    Pages follow the collection's load order. The cursor is the load
+    position of the last record returned, which is unique even where record
+    ids repeat; it is sent in X-Next-Cursor while more results remain and is
+    passed back as `after`. X-Total-Count carries the match count when
+    include_total is set. Records are projected onto the model's fields (or
+    the requested subset) instead of being validated one by one.
+    """
+    repo = _data()
+    after_position = await _parse_cursor(after, repo, collection)
+    project = _projector(fields, model)
+    records, resume = await repo.page(collection, limit, after_position, criteria, date_contains)
+
+    headers = {}
+    if resume is not None:
+        headers["X-Next-Cursor"] = str(resume)
+    if include_total:
+        headers["X-Total-Count"] = str(await repo.count(collection, criteria, date_contains))
+    return await _encoded(repo, len(records), lambda: JSONResponse(
+        content=[project(record) for record in records], headers=headers
+    ))
+
+# TypeAdapters are built once per response type
+_type_adapters = {}
+
+def _type_adapter(response_type: object) -> TypeAdapter:
+    adapter = _type_adapters.get(response_type)
+    if adapter is None:
+        adapter = _type_adapters[response_type] = TypeAdapter(response_type)
+    return adapter
+
+async def _validated_response(repo: AsyncRepository, content: object, response_type: object,
+                              size: Optional[int] = None) -> Response:
+    """Validate and encode content against a response type, as response_model would.
+
+    size is the number of records in content, by default its length.
+    """
+    adapter = _type_adapter(response_type)
+    return await _encoded(repo, len(content) if size is None else size, lambda: Response(
+        content=adapter.dump_json(adapter.validate_python(content)), media_type="application/json"
+    ))
+
+async def _batch_lookup(collection: str, lookups: Dict[str, Tuple[str, List[str]]],
+                        response_type: Type[BaseModel]) -> Response:
+    """Resolve groups of keys through the collection's lookup indexes in one response.
+
+    lookups maps each request group to the record field its keys are matched
+    on. Every distinct key found contributes its first record to found, in
+    request order; the keys that matched nothing are listed under missing,
+    per group.
+    """
+    repo = _data()
+    found, missing = [], {}
+    for group, (field, keys) in lookups.items():
+        keys = list(dict.fromkeys(keys))
+        records = await repo.get_many(collection, field, keys)
+        found.extend(records.values())
+        missing[group] = [key for key in keys if key not in records]
+    return await _validated_response(repo, {"found": found, "missing": missing}, response_type, len(found))
+
+async def _cached_response(request: Request, produce: Callable[[Repository], object],
+                           response_type: Optional[object] = None) -> Response:
+    """Serve a JSON body from the response cache, building and encoding it on a miss.
+
+    Hits are answered on the event loop. A miss produces the content from
+    the repository and encodes it on the analytics executor; the content is
+    validated against response_type once, when the entry is built, and hits
+    return the stored bytes as they are.
+    """
+    repo = _data()
+    key = cache_key(request.url.path, request.query_params.multi_items())
+    version = repo.version.value
+    body = response_cache.get(key, version)
+    if body is None:
+        def build() -> bytes:
+            content = produce(repo.repository)
+            if response_type is not None:
+                adapter = _type_adapter(response_type)
+                return adapter.dump_json(adapter.validate_python(content))
+            return json.dumps(content, separators=(",", ":")).encode()
+
+        body = await repo.run(build)
+        response_cache.put(key, version, body)
+    return Response(content=body, media_type="application/json")
+
+def _wants_stream(request: Request, stream: bool) -> bool:
+    """Streaming is opt-in through ?stream=1 or an Accept: application/x-ndjson header"""
+    return stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+def _ndjson_response(records: Iterable[dict]) -> StreamingResponse:
+    """Stream records as newline-delimited JSON while the filter pipeline produces them.
+
+    Lines are flushed in small batches so memory stays flat however many
+    records match, and the first batch goes out as soon as it is full.
+    """
+    def lines() -> Iterator[str]:
+        batch = []
+        for record in records:
+            batch.append(json.dumps(record))
+            if len(batch) == NDJSON_BATCH_SIZE:
+                yield "\n".join(batch) + "\n"
+                batch = []
+        if batch:
+            yield "\n".join(batch) + "\n"
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+
+async def _streamed_collection(collection: str, model: Type[BaseModel], criteria: Criteria,
+                               date_contains: Optional[str], limit: Optional[int], after: Optional[str],
+                               fields: Optional[str]) -> StreamingResponse:
+    """Stream a filtered collection, honouring the pagination and projection parameters"""
+    project = _projector(fields, model)
+    repo = _data()
+    records = repo.iter_records(collection, await _parse_cursor(after, repo, collection), criteria, date_contains)
+    return _ndjson_response(project(record) for record in itertools.islice(records, limit))
+
 # API endpoints
 @app.get("/")
 def root():
     return {"message": "Factory Inventory Management System API", "version": "1.0.0"}
 
 @app.get("/api/inventory", response_model=List[InventoryItem])
-def get_inventory(
+async def get_inventory(
+    request: Request,
     warehouse: Optional[str] = None,
-    category: Optional[str] = None
+    category: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_total: bool = False,
+    stream: bool = False
 ):
-    """Get all inventory items with optional filtering"""
-    return apply_filters(inventory_items, warehouse, category)
+    """Get all inventory items with optional filtering, pagination and field projection"""
+    criteria = _inventory_criteria(warehouse, category)
+    if _wants_stream(request, stream):
+        return await _streamed_collection('inventory', InventoryItem, criteria, None, limit, after, fields)
+    if limit is None and after is None and fields is None and not include_total:
+        return await _cached_response(request, lambda repo: repo.page('inventory', None, None, criteria)[0],
+                                      List[InventoryItem])
+    return await _paged_response('inventory', InventoryItem, criteria, None, limit, after, fields, include_total)
 
 @app.get("/api/inventory/{item_id}", response_model=InventoryItem)
-def get_inventory_item(item_id: str):
+async def get_inventory_item(item_id: str):
     """Get a specific inventory item"""
-    item = next((item for item in inventory_items if item["id"] == item_id), None)
+    item = await _data().get('inventory', item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     return item
 
+@app.post("/api/inventory/batch", response_model=InventoryBatchResponse)
+async def get_inventory_batch(request: InventoryBatchRequest):
+    """Get many inventory items by id and/or SKU in one request"""
+    return await _batch_lookup('inventory', {"ids": ("id", request.ids), "skus": ("sku", request.skus)},
+                               InventoryBatchResponse)
+
+def _adjust_inventory(adjustments: List[Adjustment]) -> List[dict]:
+    """Apply a batch of stock adjustments, mapping its failures to HTTP errors"""
+    repo = repository
+    try:
+        return repo.adjust_inventory(adjustments)
+    except UnknownItemError as error:
+        raise HTTPException(status_code=404, detail=f"Item not found: {error.item_id}")
+    except InsufficientStockError as error:
+        raise HTTPException(status_code=409, detail=str(error))
+    except OSError:
+        raise HTTPException(status_code=503, detail="Adjustment log unavailable")
+
+@app.patch("/api/inventory/{item_id}", response_model=InventoryItem)
+def adjust_inventory_item(item_id: str, request: InventoryAdjustmentRequest):
+    """Add a signed delta to an item's quantity on hand"""
+    [item] = _adjust_inventory([(item_id, request.delta)])
+    return item
+
+@app.post("/api/inventory/adjustments", response_model=List[InventoryItem])
+def adjust_inventory(request: InventoryAdjustmentsRequest):
+    """Apply signed quantity deltas to many items at once, in order; if any fails, none is applied"""
+    return _adjust_inventory([(adjustment.id, adjustment.delta) for adjustment in request.adjustments])
+
 @app.get("/api/orders", response_model=List[Order])
-def get_orders(
+async def get_orders(
+    request: Request,
     warehouse: Optional[str] = None,
     category: Optional[str] = None,
     status: Optional[str] = None,
-    month: Optional[str] = None
+    month: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_total: bool = False,
+    stream: bool = False
 ):
-    """Get all orders with optional filtering"""
-    filtered_orders = apply_filters(orders, warehouse, category, status)
-    filtered_orders = filter_by_month(filtered_orders, month)
-    return filtered_orders
+    """Get all orders with optional filtering, pagination and field projection"""
+    criteria, date_contains = _filter_criteria(warehouse, category, status, month)
+    if _wants_stream(request, stream):
+        return await _streamed_collection('orders', Order, criteria, date_contains, limit, after, fields)
+    if limit is None and after is None and fields is None and not include_total:
+        repo = _data()
+        records, _ = await repo.page('orders', None, None, criteria, date_contains)
+        return await _validated_response(repo, records, List[Order])
+    return await _paged_response('orders', Order, criteria, date_contains, limit, after, fields, include_total)
+
+async def _import(request: Request, store: Callable[[Repository, List[Tuple[int, dict]]], List[dict]],
+                  model: Type[BaseModel], json_fields: Tuple[str, ...] = ()) -> Response:
+    """Stream the request body into the repository a batch at a time and report on every row.
+
+    store(repository, records) adds the validated (row number, record) pairs
+    it accepts and returns errors for the rest.
+    """
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    try:
+        rows = body_rows(media_type, request.stream(), json_fields)
+    except UploadError as error:
+        raise HTTPException(status_code=415, detail=str(error))
+    repo = _data()
+
+    def import_batch(batch):
+        records, errors = validate_rows(model, batch)
+        try:
+            rejected = store(repo.repository, records)
+        except OSError:
+            raise HTTPException(status_code=503, detail="Import log unavailable")
+        return len(records) - len({error["row"] for error in rejected}), errors + rejected
+
+    report = await import_rows(rows, lambda batch: repo.run(import_batch, batch))
+    return JSONResponse(ImportResult.model_validate(report.as_dict()).model_dump(),
+                        status_code=413 if report.aborted else 200)
+
+def _store_orders(repo: Repository, records: List[Tuple[int, dict]]) -> List[dict]:
+    """Add orders whose id and order number are new, reporting the rest"""
+    existing = {field: repo.get_many("orders", field, [order[field] for _, order in records])
+                for field in ("id", "order_number")}
+    seen = {"id": set(), "order_number": set()}
+    accepted, errors = [], []
+    for number, order in records:
+        duplicate = next((field for field in ("id", "order_number")
+                          if order[field] in existing[field] or order[field] in seen[field]), None)
+        if duplicate:
+            errors.append(row_error(number, f"An order with {duplicate} {order[duplicate]} already exists", duplicate))
+            continue
+        for field in seen:
+            seen[field].add(order[field])
+        accepted.append(order)
+    if accepted:
+        repo.add_orders(accepted)
+    return errors
+
+@app.post("/api/orders/import", response_model=ImportResult)
+async def import_orders(request: Request):
+    """Import orders from an NDJSON or CSV body (items as a JSON column), validated and stored in batches"""
+    return await _import(request, _store_orders, OrderImport, ("items",))
 
 @app.get("/api/orders/{order_id}", response_model=Order)
-def get_order(order_id: str):
+async def get_order(order_id: str):
     """Get a specific order"""
-    order = next((order for order in orders if order["id"] == order_id), None)
+    order = await _data().get('orders', order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return order
 
+@app.post("/api/orders/batch", response_model=OrderBatchResponse)
+async def get_orders_batch(request: OrderBatchRequest):
+    """Get many orders by id and/or order number in one request"""
+    return await _batch_lookup('orders', {"ids": ("id", request.ids),
+                                          "order_numbers": ("order_number", request.order_numbers)},
+                               OrderBatchResponse)
+
 @app.get("/api/demand", response_model=List[DemandForecast])
-def get_demand_forecasts():
+async def get_demand_forecasts(request: Request):
     """Get demand forecasts"""
-    return demand_forecasts
+    return await _cached_response(request, lambda repo: repo.demand_forecasts(), List[DemandForecast])
 
-@app.get("/api/backlog", response_model=List[BacklogItem])
-def get_backlog():
-    """Get backlog items with purchase order status"""
+def _backlog_with_purchase_orders(repo: Repository) -> List[dict]:
+    """Backlog items, each flagged with whether a purchase order exists for it"""
     # Add has_purchase_order flag to each backlog item
+    with_purchase_orders = repo.purchase_order_backlog_ids()
     result = []
-    for item in backlog_items:
+    for item in repo.backlog_items():
         item_dict = dict(item)
-        # Check if this backlog item has a purchase order
-        has_po = any(po["backlog_item_id"] == item["id"] for po in purchase_orders)
-        item_dict["has_purchase_order"] = has_po
+        item_dict["has_purchase_order"] = item["id"] in with_purchase_orders
         result.append(item_dict)
     return result
 
+@app.get("/api/backlog", response_model=List[BacklogItem])
+async def get_backlog():
+    """Get backlog items with purchase order status"""
+    repo = _data()
+    result = await repo.run(_backlog_with_purchase_orders, repo.repository, offload=False)
+    return await _validated_response(repo, result, List[BacklogItem])
+
+def _purchase_order_sequence(existing: Iterable[dict]) -> int:
+    """First free number after the highest PO-<n> id already loaded"""
+    numbers = [int(po["id"][3:]) for po in existing if po["id"].startswith("PO-") and po["id"][3:].isdigit()]
+    return max(numbers, default=0) + 1
+
+# Monotonic purchase order numbers, seeded past the ids in purchase_orders.json
+purchase_order_numbers = itertools.count(_purchase_order_sequence(repository.purchase_orders()))
+
+@app.post("/api/purchase-orders", response_model=PurchaseOrder)
+def create_purchase_order(request: CreatePurchaseOrderRequest):
+    """Create a purchase order for a backlog item"""
+    repo = repository
+    if not repo.get('backlog', request.backlog_item_id):
+        raise HTTPException(status_code=404, detail="Backlog item not found")
+
+    purchase_order_id = f"PO-{next(purchase_order_numbers):04d}"
+    while repo.has_purchase_order_id(purchase_order_id):
+        purchase_order_id = f"PO-{next(purchase_order_numbers):04d}"
+
+    purchase_order = {
+        "id": purchase_order_id,
+        **request.model_dump(),
+        "status": "Pending",
+        "created_date": datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+    }
+    repo.add_purchase_order(purchase_order)
+    return purchase_order
+
+@app.get("/api/purchase-orders/{backlog_item_id}", response_model=PurchaseOrder)
+async def get_purchase_order_by_backlog_item(backlog_item_id: str):
+    """Get the most recent purchase order for a backlog item"""
+    purchase_order = await _data().latest_purchase_order(backlog_item_id)
+    if not purchase_order:
+        raise HTTPException(status_code=404, detail="Purchase order not found")
+    return purchase_order
+
+@app.get("/api/replenishment/recommendations", response_model=List[ReplenishmentRecommendation])
+async def get_replenishment_recommendations(
+    request: Request,
+    warehouse: Optional[str] = None,
+    category: Optional[str] = None,
+    shortfall_only: bool = False
+):
+    """Get the projected stock and recommended reorder for each inventory item with optional filtering.
+
+    Joins inventory with demand forecasts, outstanding backlog and open
+    purchase orders by SKU; shortfall_only keeps the items that need ordering.
+    """
+    criteria = _inventory_criteria(warehouse, category)
+    return await _cached_response(request, lambda repo: repo.replenishment(criteria, shortfall_only),
+                                  List[ReplenishmentRecommendation])
+
+@app.get("/api/search", response_model=List[SearchResult])
+async def search(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_RESULTS),
+    types: Optional[str] = None
+):
+    """Search inventory items, orders, customers and order line items, best matches first.
+
+    q is matched as a prefix of SKUs and order numbers, and word by word
+    against inventory names, line item names and customer names. types is a
+    comma-separated subset of inventory, order, customer and order_item.
+    """
+    accepted = None
+    if types:
+        accepted = [name.strip() for name in types.split(',') if name.strip()]
+        unknown = sorted(set(accepted) - set(RESULT_TYPES))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown result types: {', '.join(unknown)}")
+    return JSONResponse(await _data().search(q, limit, accepted))
+
+def _dashboard_summary(repo: Repository, criteria: Criteria, date_contains: Optional[str],
+                       inventory_criteria: Criteria) -> dict:
+    """Dashboard headline figures for orders and inventory matching the filters"""
+    total_inventory_value, low_stock_items = repo.inventory_totals(inventory_criteria)
+    _, pending_orders, total_orders_value = repo.order_totals(criteria, date_contains)
+    return {
+        "total_inventory_value": round(total_inventory_value, 2),
+        "low_stock_items": low_stock_items,
+        "pending_orders": pending_orders,
+        "total_backlog_items": repo.size('backlog'),
+        "total_orders_value": total_orders_value
+    }
+
 @app.get("/api/dashboard/summary")
-def get_dashboard_summary(
+async def get_dashboard_summary(
     warehouse: Optional[str] = None,
     category: Optional[str] = None,
     status: Optional[str] = None,
     month: Optional[str] = None
 ):
     """Get summary statistics for dashboard with optional filtering"""
-    # Filter inventory
-    filtered_inventory = apply_filters(inventory_items, warehouse, category)
-
-    # Filter orders
-    filtered_orders = apply_filters(orders, warehouse, category, status)
-    filtered_orders = filter_by_month(filtered_orders, month)
-
-    total_inventory_value = sum(item["quantity_on_hand"] * item["unit_cost"] for item in filtered_inventory)
-    low_stock_items = len([item for item in filtered_inventory if item["quantity_on_hand"] <= item["reorder_point"]])
-    pending_orders = len([order for order in filtered_orders if order["status"] in ["Processing", "Backordered"]])
-    total_backlog_items = len(backlog_items)
+    repo = _data()
+    criteria, date_contains = _filter_criteria(warehouse, category, status, month)
+    # Only free-form month values make the order totals scan
+    summary = await repo.run(_dashboard_summary, repo.repository, criteria, date_contains,
+                             _inventory_criteria(warehouse, category), offload=date_contains is not None)
+    return JSONResponse(content=summary)
+
+# Sections /api/dashboard/bundle can return, in response order, with the type each is validated against
+DASHBOARD_SECTIONS = {
+    "summary": dict,
+    "orders": List[Order],
+    "inventory": List[InventoryItem],
+    "backlog": List[BacklogItem],
+    "demand": List[DemandForecast],
+    "monthly_trends": List[dict],
+}
 
-    return {
-        "total_inventory_value": round(total_inventory_value, 2),
-        "low_stock_items": low_stock_items,
-        "pending_orders": pending_orders,
-        "total_backlog_items": total_backlog_items,
-        "total_orders_value": sum(order["total_value"] for order in filtered_orders)
+def _dashboard_sections(include: Optional[str]) -> Tuple[str, ...]:
+    """Parse a comma-separated include= value into dashboard sections, in response order"""
+    if not include:
+        return tuple(DASHBOARD_SECTIONS)
+    names = {name.strip() for name in include.split(',') if name.strip()}
+    unknown = sorted(names - DASHBOARD_SECTIONS.keys())
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown sections: {', '.join(unknown)}")
+    return tuple(name for name in DASHBOARD_SECTIONS if name in names)
+
+@functools.lru_cache(maxsize=None)
+def _bundle_model(sections: Tuple[str, ...]) -> Type[BaseModel]:
+    """Response model holding exactly the given dashboard sections"""
+    return create_model("DashboardBundle", **{name: (DASHBOARD_SECTIONS[name], ...) for name in sections})
+
+def _dashboard_bundle(repo: Repository, sections: Tuple[str, ...], warehouse: Optional[str],
+                      category: Optional[str], status: Optional[str], month: Optional[str]) -> dict:
+    """Build the requested dashboard sections against one repository and one set of resolved filters"""
+    criteria, date_contains = _filter_criteria(warehouse, category, status, month)
+    inventory_criteria = _inventory_criteria(warehouse, category)
+    # Trends chart every month, so they ignore the month filter like /api/reports/monthly-trends
+    trend_criteria = {name: keys for name, keys in criteria.items() if name != 'month'}
+    builders = {
+        "summary": lambda: _dashboard_summary(repo, criteria, date_contains, inventory_criteria),
+        "orders": lambda: repo.page('orders', None, None, criteria, date_contains)[0],
+        "inventory": lambda: repo.page('inventory', None, None, inventory_criteria)[0],
+        "backlog": lambda: _backlog_with_purchase_orders(repo),
+        "demand": repo.demand_forecasts,
+        "monthly_trends": lambda: monthly_rows(repo.order_period_buckets(trend_criteria)),
     }
+    return {name: builders[name]() for name in sections}
+
+@app.get("/api/dashboard/bundle")
+async def get_dashboard_bundle(
+    request: Request,
+    warehouse: Optional[str] = None,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    month: Optional[str] = None,
+    include: Optional[str] = None
+):
+    """Get the dashboard sections named in include (default: all) in one response, for one set of filters"""
+    sections = _dashboard_sections(include)
+    return await _cached_response(
+        request, lambda repo: _dashboard_bundle(repo, sections, warehouse, category, status, month),
+        _bundle_model(sections)
+    )
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Per-route request counts, latency and response size histograms, filter and cache statistics"""
+    return Response(content=metrics_registry.render(response_cache), media_type=PROMETHEUS_MEDIA_TYPE)
+
+def _require_admin(request: Request):
+    """404 while profiling is off, so the debug endpoints don't exist; 403 without the admin token"""
+    if not PROFILING_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not token_matches(request.headers.get("X-Admin-Token"), PROFILING_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.get("/debug/profiles", include_in_schema=False)
+def list_profiles(request: Request):
+    """Summaries of the most recently profiled requests, newest first"""
+    _require_admin(request)
+    return profile_store.summaries()
+
+@app.get("/debug/profiles/{profile_id}", include_in_schema=False)
+def get_profile(
+    request: Request,
+    profile_id: int,
+    sort: Literal["cumulative", "tottime", "calls"] = "cumulative",
+    limit: int = Query(50, ge=1, le=1000),
+    output: Literal["text", "pstats"] = Query("text", alias="format")
+):
+    """One request profile, as a pstats listing or as a .pstats file to download"""
+    _require_admin(request)
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if output == "pstats":
+        return Response(content=profile.dump(), media_type="application/octet-stream",
+                        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.pstats"'})
+    return Response(content=profile.report(sort, limit), media_type="text/plain; charset=utf-8")
+
+@app.get("/api/data/status")
+async def get_data_status():
+    """Get the dataset version being served and statistics about data file reloads"""
+    return {"dataset_version": repository.version.value, **data_reloader.stats.as_dict()}
+
+def _spending_by_month(repo: Repository, warehouse: Optional[str], category: Optional[str],
+                       month: Optional[str]) -> Tuple[Dict[Tuple, Tuple[int, float]], Optional[set]]:
+    """(type, category, month) spending totals for the filters, and the month periods the month filter selects.
+
+    The totals cover every month, so changes can be taken against the month
+    before the selection; free-form month values are applied by the repository.
+    """
+    criteria, date_contains = _filter_criteria(warehouse, category, month=month)
+    months = criteria.pop('month', None)
+    totals = repo.spending_totals(('type', 'category', 'month'), criteria, date_contains)
+    return totals, set(months) if months is not None else None
 
 @app.get("/api/spending/summary")
-def get_spending_summary():
-    """Get spending summary statistics"""
-    return spending_summary
+async def get_spending_summary(
+    request: Request,
+    warehouse: Optional[str] = None,
+    category: Optional[str] = None,
+    month: Optional[str] = None
+):
+    """Get spending totals per cost bucket with optional filtering, and the latest month's change on the month before"""
+    return await _cached_response(
+        request, lambda repo: spending_summary(*_spending_by_month(repo, warehouse, category, month)))
 
 @app.get("/api/spending/monthly")
-def get_monthly_spending():
-    """Get monthly spending breakdown"""
-    return monthly_spending
+async def get_monthly_spending(
+    request: Request,
+    warehouse: Optional[str] = None,
+    category: Optional[str] = None,
+    month: Optional[str] = None
+):
+    """Get spending per cost bucket for each month with optional filtering"""
+    return await _cached_response(
+        request, lambda repo: monthly_spending(*_spending_by_month(repo, warehouse, category, month)))
 
 @app.get("/api/spending/categories")
-def get_category_spending():
-    """Get spending by category"""
-    return category_spending
+async def get_category_spending(
+    request: Request,
+    warehouse: Optional[str] = None,
+    category: Optional[str] = None,
+    month: Optional[str] = None
+):
+    """Get procurement spending per category with optional filtering"""
+    return await _cached_response(
+        request, lambda repo: category_spending(*_spending_by_month(repo, warehouse, category, month)))
+
+@app.get("/api/spending/breakdown")
+async def get_spending_breakdown(
+    request: Request,
+    by: Literal['warehouse', 'category', 'type', 'vendor', 'month'],
+    warehouse: Optional[str] = None,
+    category: Optional[str] = None,
+    month: Optional[str] = None
+):
+    """Get spending amount, transaction count and share per warehouse, category, type, vendor or month"""
+    criteria, date_contains = _filter_criteria(warehouse, category, month=month)
+    return await _cached_response(
+        request, lambda repo: spending_breakdown(by, repo.spending_totals((by,), criteria, date_contains)))
+
+def _store_transactions(repo: Repository, records: List[Tuple[int, dict]]) -> List[dict]:
+    if records:
+        repo.add_transactions([transaction for _, transaction in records])
+    return []
+
+@app.post("/api/spending/transactions/import", response_model=ImportResult)
+async def import_transactions(request: Request):
+    """Import transactions from an NDJSON or CSV body, validated and stored in batches"""
+    return await _import(request, _store_transactions, TransactionImport)
 
 @app.get("/api/spending/transactions")
-def get_recent_transactions():
+async def get_recent_transactions(request: Request, stream: bool = False):
     """Get recent transactions"""
-    return recent_transactions
+    if _wants_stream(request, stream):
+        return _ndjson_response(iter(await _data().transactions()))
+    return await _cached_response(request, lambda repo: repo.transactions())
 
 @app.get("/api/reports/quarterly")
-def get_quarterly_reports():
-    """Get quarterly performance reports"""
-    # Calculate quarterly statistics from orders
-    quarters = {}
-
-    for order in orders:
-        order_date = order.get('order_date', '')
-        # Determine quarter
-        if '2025-01' in order_date or '2025-02' in order_date or '2025-03' in order_date:
-            quarter = 'Q1-2025'
-        elif '2025-04' in order_date or '2025-05' in order_date or '2025-06' in order_date:
-            quarter = 'Q2-2025'
-        elif '2025-07' in order_date or '2025-08' in order_date or '2025-09' in order_date:
-            quarter = 'Q3-2025'
-        elif '2025-10' in order_date or '2025-11' in order_date or '2025-12' in order_date:
-            quarter = 'Q4-2025'
-        else:
-            continue
-
-        if quarter not in quarters:
-            quarters[quarter] = {
-                'quarter': quarter,
-                'total_orders': 0,
-                'total_revenue': 0,
-                'delivered_orders': 0,
-                'avg_order_value': 0
-            }
-
-        quarters[quarter]['total_orders'] += 1
-        quarters[quarter]['total_revenue'] += order.get('total_value', 0)
-        if order.get('status') == 'Delivered':
-            quarters[quarter]['delivered_orders'] += 1
-
-    # Calculate averages and fulfillment rate
-    result = []
-    for q, data in quarters.items():
-        if data['total_orders'] > 0:
-            data['avg_order_value'] = round(data['total_revenue'] / data['total_orders'], 2)
-            data['fulfillment_rate'] = round((data['delivered_orders'] / data['total_orders']) * 100, 1)
-        result.append(data)
-
-    # Sort by quarter
-    result.sort(key=lambda x: x['quarter'])
-    return result
+async def get_quarterly_reports(
+    warehouse: Optional[str] = None,
+    category: Optional[str] = None,
+    status: Optional[str] = None
+):
+    """Get quarterly performance reports with optional filtering"""
+    criteria, _ = _filter_criteria(warehouse, category, status)
+    return JSONResponse(content=quarterly_rows(await _data().order_period_buckets(criteria)))
 
 @app.get("/api/reports/monthly-trends")
-def get_monthly_trends():
-    """Get month-over-month trends"""
-    months = {}
-
-    for order in orders:
-        order_date = order.get('order_date', '')
-        if not order_date:
-            continue
-
-        # Extract month (format: YYYY-MM-DD)
-        month = order_date[:7]  # Gets YYYY-MM
-
-        if month not in months:
-            months[month] = {
-                'month': month,
-                'order_count': 0,
-                'revenue': 0,
-                'delivered_count': 0
-            }
-
-        months[month]['order_count'] += 1
-        months[month]['revenue'] += order.get('total_value', 0)
-        if order.get('status') == 'Delivered':
-            months[month]['delivered_count'] += 1
-
-    # Convert to list and sort
-    result = list(months.values())
-    result.sort(key=lambda x: x['month'])
-    return result
+async def get_monthly_trends(
+    warehouse: Optional[str] = None,
+    category: Optional[str] = None,
+    status: Optional[str] = None
+):
+    """Get month-over-month trends with optional filtering"""
+    criteria, _ = _filter_criteria(warehouse, category, status)
+    return JSONResponse(content=monthly_rows(await _data().order_period_buckets(criteria)))
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,199 @@
+"""
+Request metrics for the Factory Inventory Management System
+Counts requests and keeps latency and response size histograms per route,
+result count and selectivity histograms for filtered queries, and renders
+them with the response cache statistics in the Prometheus text exposition
+format. Recording is a few dict lookups and bisects per request.
+"""
+
+import bisect
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROMETHEUS_MEDIA_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+RESULT_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+SELECTIVITY_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0)
+
+# Route label of requests answered before routing, such as conditional GETs and unknown paths
+UNROUTED = '<unrouted>'
+
+
+def _labels(**labels: str) -> str:
+    """Format a label set, escaping values as the exposition format requires"""
+    return '{' + ','.join(
+        f'{name}="' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for name, value in labels.items()
+    ) + '}'
+
+
+class Histogram:
+    """Observation counts per bucket, with their sum; buckets are cumulated when rendered."""
+
+    __slots__ = ('bounds', 'counts', 'sum')
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def lines(self, name: str, **labels: str) -> Iterator[str]:
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{_labels(**labels, le=repr(float(bound)))} {cumulative}'
+        cumulative += self.counts[-1]
+        yield f'{name}_bucket{_labels(**labels, le="+Inf")} {cumulative}'
+        yield f'{name}_sum{_labels(**labels)} {self.sum!r}'
+        yield f'{name}_count{_labels(**labels)} {cumulative}'
+
+
+class _RouteStats:
+    __slots__ = ('responses', 'latency', 'size')
+
+    def __init__(self):
+        self.responses: Dict[int, int] = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+
+
+class Metrics:
+    """Per-route request metrics and filter statistics.
+
+    Requests are recorded on the event loop thread by MetricsMiddleware, so
+    they need no lock; filters are recorded from whichever thread runs the
+    query and take one.
+    """
+
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], _RouteStats] = {}
+        self.filters: Dict[Tuple[str, str], Tuple[Histogram, Histogram]] = {}
+        self.not_modified = 0
+        self._lock = threading.Lock()
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, size: int):
+        stats = self.routes.get((method, route))
+        if stats is None:
+            stats = self.routes[(method, route)] = _RouteStats()
+        stats.responses[status] = stats.responses.get(status, 0) + 1
+        stats.latency.observe(seconds)
+        stats.size.observe(size)
+
+    def observe_filter(self, collection: str, kind: str, matched: int, size: int):
+        """Record a filtered query over a collection of size records that matched matched of them.
+
+        kind is 'index' for filters answered from the indexes and 'date' for
+        free-form date values matched against every record.
+        """
+        with self._lock:
+            histograms = self.filters.get((collection, kind))
+            if histograms is None:
+                histograms = self.filters[(collection, kind)] = (
+                    Histogram(RESULT_BUCKETS), Histogram(SELECTIVITY_BUCKETS))
+            histograms[0].observe(matched)
+            histograms[1].observe(matched / size if size else 0.0)
+
+    def render(self, cache=None) -> str:
+        """All metrics in the Prometheus text format, with the hit statistics of a ResponseCache if given"""
+        lines: List[str] = []
+        routes = sorted(self.routes.items())
+
+        lines += ['# HELP inventory_http_requests_total Requests served, by route and status.',
+                  '# TYPE inventory_http_requests_total counter']
+        for (method, route), stats in routes:
+            for status, count in sorted(stats.responses.items()):
+                labels = _labels(method=method, route=route, status=str(status))
+                lines.append(f'inventory_http_requests_total{labels} {count}')
+
+        lines += ['# HELP inventory_http_request_duration_seconds Time to the end of the response body.',
+                  '# TYPE inventory_http_request_duration_seconds histogram']
+        for (method, route), stats in routes:
+            lines += stats.latency.lines('inventory_http_request_duration_seconds', method=method, route=route)
+
+        lines += ['# HELP inventory_http_response_size_bytes Response body size.',
+                  '# TYPE inventory_http_response_size_bytes histogram']
+        for (method, route), stats in routes:
+            lines += stats.size.lines('inventory_http_response_size_bytes', method=method, route=route)
+
+        with self._lock:
+            filters = sorted(self.filters.items())
+            lines += ['# HELP inventory_filter_results Records matched by a filtered query.',
+                      '# TYPE inventory_filter_results histogram']
+            for (collection, kind), (results, _) in filters:
+                lines += results.lines('inventory_filter_results', collection=collection, filter=kind)
+            lines += ['# HELP inventory_filter_selectivity Fraction of the collection matched by a filtered query.',
+                      '# TYPE inventory_filter_selectivity histogram']
+            for (collection, kind), (_, selectivity) in filters:
+                lines += selectivity.lines('inventory_filter_selectivity', collection=collection, filter=kind)
+
+        lines += ['# HELP inventory_not_modified_total Conditional GETs answered with 304 Not Modified.',
+                  '# TYPE inventory_not_modified_total counter',
+                  f'inventory_not_modified_total {self.not_modified}']
+
+        if cache is not None:
+            hits, misses = cache.hits, cache.misses
+            ratio = hits / (hits + misses) if hits + misses else 0.0
+            lines += ['# HELP inventory_response_cache_requests_total Response cache lookups, by result.',
+                      '# TYPE inventory_response_cache_requests_total counter',
+                      f'inventory_response_cache_requests_total{{result="hit"}} {hits}',
+                      f'inventory_response_cache_requests_total{{result="miss"}} {misses}',
+                      '# HELP inventory_response_cache_hit_ratio Share of response cache lookups that hit.',
+                      '# TYPE inventory_response_cache_hit_ratio gauge',
+                      f'inventory_response_cache_hit_ratio {ratio!r}',
+                      '# HELP inventory_response_cache_entries Entries held in the response cache.',
+                      '# TYPE inventory_response_cache_entries gauge',
+                      f'inventory_response_cache_entries {len(cache)}',
+                      '# HELP inventory_response_cache_bytes Bytes of response bodies held in the response cache.',
+                      '# TYPE inventory_response_cache_bytes gauge',
+                      f'inventory_response_cache_bytes {cache.size}']
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide metrics, recorded by the middleware and the repositories
+registry = Metrics()
+
+
+class MetricsMiddleware:
+    """Record the latency, status and body size of every HTTP request under its route template.
+
+    Plain ASGI, like the conditional GET middleware; the route is read from
+    the scope once the router has matched it, so path parameters never
+    become label values.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: Optional[Metrics] = None):
+        self.app = app
+        self.metrics = metrics or registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status, size = 500, 0
+
+        async def send_measured(message: Message):
+            nonlocal status, size
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif message['type'] == 'http.response.body':
+                size += len(message.get('body', b''))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_measured)
+        finally:
+            route = scope.get('route')
+            self.metrics.observe_request(scope['method'], route.path if route is not None else UNROUTED,
+                                         status, time.perf_counter() - start, size)
@@ -1,39 +1,147 @@
 """
 Mock data for the Factory Inventory Management System
-This module loads sample data from JSON files for inventory items, orders, demand forecasts, and backlog items.
+This module loads sample data from JSON files for inventory items, orders, demand forecasts, and backlog items,
+and exposes it through the repository selected by INVENTORY_BACKEND.
 All data is from September 2025 and includes warehouse, category, and date fields for filtering.
 """
 
-import json
+import logging
 import os
 
+from adjustments import AdjustmentLog
+from ingest import ImportLog
+from columnar import OrderColumns
+from compact import COMPACT_FORMAT, CompactRecords
+from repository import (SHARED_ORDER_KEYS, SQLITE_SCHEMA_VERSION, SQLITE_UPGRADABLE_VERSIONS, InMemoryRepository,
+                        SqliteRepository, build_sqlite_database, sqlite_has_local_writes, sqlite_schema_version,
+                        upgrade_sqlite_database)
+from shared_dataset import build_lock, load_shared
+from snapshot import load_json
+
+logger = logging.getLogger(__name__)
+
 # Get the directory where this file is located
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_DIR = os.path.join(BASE_DIR, 'data')
+# INVENTORY_DATA_DIR points the server at another dataset, e.g. one from generate_data.py
+DATA_DIR = os.environ.get('INVENTORY_DATA_DIR') or os.path.join(BASE_DIR, 'data')
+
+# Binary snapshots of the JSON files, rebuilt whenever a source file changes
+SNAPSHOT_DIR = os.environ.get('INVENTORY_SNAPSHOT_DIR') or os.path.join(DATA_DIR, '.snapshots')
+
+# Memory-mapped datasets shared by every worker process of the shared backend
+SHARED_DIR = os.environ.get('INVENTORY_SHARED_DIR') or os.path.join(DATA_DIR, '.shared')
+
+# Write-ahead log of stock adjustments made through the API, replayed onto inventory.json when it is loaded
+ADJUSTMENT_LOG_PATH = os.environ.get('INVENTORY_WAL_PATH') or os.path.join(DATA_DIR, 'inventory.wal')
+
+# Orders and transactions imported through the API, appended to their datasets when they are loaded
+IMPORT_LOG_DIR = os.environ.get('INVENTORY_IMPORT_LOG_DIR') or DATA_DIR
+
+# Data file behind each dataset a repository can ask for
+DATASET_FILES = {
+    'inventory_items': 'inventory.json',
+    'orders': 'orders.json',
+    'demand_forecasts': 'demand_forecasts.json',
+    'backlog_items': 'backlog_items.json',
+    'purchase_orders': 'purchase_orders.json',
+    'spending': 'spending.json',
+    'transactions': 'transactions.json',
+}
+
+# Datasets held as CompactRecords, with their interned fields and line item field
+COMPACT_DATASETS = {
+    'inventory_items': (('category', 'warehouse', 'location', 'last_updated'), None),
+    'orders': (('customer', 'status', 'warehouse', 'category'), 'items'),
+}
 
 def load_json_file(filename):
-    """Load data from a JSON file in the data directory"""
-    filepath = os.path.join(DATA_DIR, filename)
-    with open(filepath, 'r') as f:
-        return json.load(f)
-
-# Load all datasets from JSON files
-inventory_items = load_json_file('inventory.json')
-orders = load_json_file('orders.json')
-demand_forecasts = load_json_file('demand_forecasts.json')
-backlog_items = load_json_file('backlog_items.json')
-
-# Load spending data
-spending_data = load_json_file('spending.json')
-spending_summary = spending_data['spending_summary']
-monthly_spending = spending_data['monthly_spending']
-category_spending = spending_data['category_spending']
-
-# Load transactions
-recent_transactions = load_json_file('transactions.json')
-
-# Load purchase orders
-purchase_orders = load_json_file('purchase_orders.json')
+    """Load data from a JSON file in the data directory, through its binary snapshot"""
+    return load_json(os.path.join(DATA_DIR, filename), SNAPSHOT_DIR)
+
+def load_compact_file(filename, interned, items_field):
+    """Load a JSON file of records as CompactRecords, through a snapshot of the compact form"""
+    return load_json(os.path.join(DATA_DIR, filename), SNAPSHOT_DIR, variant=f'compact{COMPACT_FORMAT}',
+                     pack=lambda records: CompactRecords(records, interned, items_field).state(),
+                     unpack=CompactRecords.from_state)
+
+def load_dataset(name):
+    """Load one dataset by name; orders and inventory come back compacted"""
+    if name in COMPACT_DATASETS:
+        return load_compact_file(DATASET_FILES[name], *COMPACT_DATASETS[name])
+    return load_json_file(DATASET_FILES[name])
+
+def load_datasets() -> dict:
+    """Load every dataset, keyed by name"""
+    return {name: load_dataset(name) for name in DATASET_FILES}
+
+def load_shared_dataset(name):
+    """Map one dataset's shared file, built from the data file by the first worker to need it"""
+    source = os.path.join(DATA_DIR, DATASET_FILES[name])
+    build_columns, key_indexes = (OrderColumns.shared_columns, SHARED_ORDER_KEYS) if name == 'orders' else (None, None)
+    return load_shared(source, os.path.join(SHARED_DIR, name + '.shared'), lambda: load_dataset(name),
+                       build_columns, key_indexes)
+
+def adjustment_log() -> AdjustmentLog:
+    """The stock adjustment log kept against the inventory data file"""
+    return AdjustmentLog(ADJUSTMENT_LOG_PATH, os.path.join(DATA_DIR, DATASET_FILES['inventory_items']))
+
+def import_logs() -> dict:
+    """The logs of imported orders and transactions"""
+    return {name: ImportLog(os.path.join(IMPORT_LOG_DIR, name + '.imports')) for name in ('orders', 'transactions')}
+
+def load_memory_repository() -> InMemoryRepository:
+    """Hold the datasets in indexed in-memory lists, each loaded on first use"""
+    return InMemoryRepository(load_dataset, adjustment_log(), import_logs())
+
+def load_shared_repository() -> InMemoryRepository:
+    """Index the datasets in memory, with the records and order columns in files mapped by every worker"""
+    return InMemoryRepository(load_shared_dataset, adjustment_log(), import_logs())
+
+def load_sqlite_repository() -> SqliteRepository:
+    """Serve the datasets from SQLite, (re)building the database when the JSON files are newer or its schema is old.
+
+    Workers starting together build it once: the check and the build run
+    under a file lock. A database holding purchase orders, adjustments or
+    imports written through the API is not rebuilt when the JSON files
+    change, since those writes exist only in the database, and a database
+    of an upgradable older schema is upgraded in place rather than rebuilt.
+    """
+    path = os.environ.get('INVENTORY_SQLITE_PATH') or os.path.join(DATA_DIR, 'inventory.db')
+    sources = [os.path.join(DATA_DIR, name) for name in os.listdir(DATA_DIR) if name.endswith('.json')]
+    with build_lock(path):
+        version = sqlite_schema_version(path) if os.path.exists(path) else None
+        if version in SQLITE_UPGRADABLE_VERSIONS:
+            upgrade_sqlite_database(path)
+        elif version != SQLITE_SCHEMA_VERSION:
+            build_sqlite_database(path, **load_datasets())
+        elif any(os.path.getmtime(source) > os.path.getmtime(path) for source in sources):
+            if sqlite_has_local_writes(path):
+                logger.warning("Data files changed, but %s holds writes made through the API and is not rebuilt; "
+                               "delete it to rebuild from the data files", path)
+            else:
+                build_sqlite_database(path, **load_datasets())
+    return SqliteRepository(path)
+
+# INVENTORY_BACKEND selects where the endpoints read data from: memory (default), shared or sqlite
+BACKENDS = {
+    'memory': load_memory_repository,
+    'shared': load_shared_repository,
+    'sqlite': load_sqlite_repository,
+}
+
+def load_repository():
+    """Load the data files into a repository for the configured backend"""
+    return BACKENDS[os.environ.get('INVENTORY_BACKEND', 'memory')]()
+
+def data_signature() -> tuple:
+    """Size and mtime of every data file; any rewrite of a file changes it"""
+    signature = []
+    for filename in sorted(DATASET_FILES.values()):
+        stat = os.stat(os.path.join(DATA_DIR, filename))
+        signature.append((filename, stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+repository = load_repository()
 
 # All data is now loaded from JSON files in the data/ directory
 # This allows for easier maintenance and updates of the sample data
@@ -0,0 +1,148 @@
+"""
+On-demand request profiling for the Factory Inventory Management System
+When INVENTORY_PROFILING_TOKEN is set, a request carrying an X-Profile
+header and the token in X-Admin-Token is run under cProfile, one at a time,
+and its profile is kept in a ring buffer served at /debug/profiles. Without
+the variable the middleware is not installed at all, so ordinary traffic
+pays nothing.
+"""
+
+import asyncio
+import contextvars
+import cProfile
+import hmac
+import io
+import itertools
+import marshal
+import pstats
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, List, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROFILE_HEADER = b'x-profile'
+ADMIN_TOKEN_HEADER = b'x-admin-token'
+PROFILE_ID_HEADER = b'x-profile-id'
+
+# Set while a profiled request runs, so its work stays on the profiled thread instead of the analytics executor
+active: contextvars.ContextVar[bool] = contextvars.ContextVar('profiling_active', default=False)
+
+
+def token_matches(supplied: Optional[str], token: Optional[str]) -> bool:
+    """Constant-time check of a supplied admin token; never matches when profiling is disabled"""
+    return bool(token) and supplied is not None and hmac.compare_digest(supplied.encode(), token.encode())
+
+
+class RequestProfile:
+    """One profiled request: what was asked, how it went, and its cProfile data"""
+
+    def __init__(self, profile_id: int, method: str, path: str, query: str):
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.query = query
+        self.created = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+        self.status = 500
+        self.duration_ms = 0.0
+        self.profile = cProfile.Profile()
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "query": self.query,
+            "status": self.status,
+            "duration_ms": self.duration_ms,
+            "created": self.created,
+        }
+
+    def report(self, sort: str = 'cumulative', limit: int = 50) -> str:
+        """pstats listing of the most expensive functions"""
+        stream = io.StringIO()
+        pstats.Stats(self.profile, stream=stream).sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def dump(self) -> bytes:
+        """The profile in the marshal format pstats.Stats and python -m pstats load"""
+        self.profile.create_stats()
+        return marshal.dumps(self.profile.stats)
+
+
+class ProfileStore:
+    """Ring buffer of the most recent request profiles"""
+
+    def __init__(self, capacity: int = 20):
+        self._profiles: Deque[RequestProfile] = deque(maxlen=capacity)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def create(self, method: str, path: str, query: str) -> RequestProfile:
+        return RequestProfile(next(self._ids), method, path, query)
+
+    def add(self, profile: RequestProfile):
+        with self._lock:
+            self._profiles.append(profile)
+
+    def summaries(self) -> List[dict]:
+        """Summaries of the stored profiles, newest first"""
+        with self._lock:
+            return [profile.summary() for profile in reversed(self._profiles)]
+
+    def get(self, profile_id: int) -> Optional[RequestProfile]:
+        with self._lock:
+            return next((profile for profile in self._profiles if profile.id == profile_id), None)
+
+
+class ProfilingMiddleware:
+    """Profile requests that ask for it with a valid admin token.
+
+    Profiled requests are serialized, and for their duration repository
+    work runs on the event loop thread, where the profiler sees it. Other
+    requests served on the event loop meanwhile still show up in the
+    profile, so profile under light traffic where possible. The profile id
+    is returned in X-Profile-Id.
+    """
+
+    def __init__(self, app: ASGIApp, token: str, store: ProfileStore):
+        self.app = app
+        self.token = token
+        self.store = store
+        self._lock = asyncio.Lock()
+
+    def _requested(self, scope: Scope) -> bool:
+        if scope['path'].startswith('/debug/'):
+            return False
+        headers = dict(scope['headers'])
+        if PROFILE_HEADER not in headers:
+            return False
+        return token_matches(headers.get(ADMIN_TOKEN_HEADER, b'').decode('latin-1'), self.token)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http' or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        async with self._lock:
+            profile = self.store.create(scope['method'], scope['path'], scope['query_string'].decode('latin-1'))
+
+            async def send_tagged(message: Message):
+                if message['type'] == 'http.response.start':
+                    profile.status = message['status']
+                    message['headers'] = list(message.get('headers', [])) + [
+                        (PROFILE_ID_HEADER, str(profile.id).encode())]
+                await send(message)
+
+            context = active.set(True)
+            started = time.perf_counter()
+            profile.profile.enable()
+            try:
+                await self.app(scope, receive, send_tagged)
+            finally:
+                profile.profile.disable()
+                profile.duration_ms = round((time.perf_counter() - started) * 1000, 3)
+                active.reset(context)
+                self.store.add(profile)
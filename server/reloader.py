@@ -0,0 +1,123 @@
+"""
+Hot reload of the data files for the Factory Inventory Management System
+A background thread polls the data files and, once a change has settled,
+builds a complete new repository (datasets, indexes and aggregates) off the
+request path. The finished repository is published with a single reference
+swap, so requests either see the old dataset or the new one in full and
+never wait on a reload.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Hashable, Optional
+
+from repository import Repository
+
+logger = logging.getLogger(__name__)
+
+
+class ReloadStats:
+    """Counters describing reloads, for monitoring"""
+
+    def __init__(self):
+        self.generation = 0
+        self.reloads = 0
+        self.failures = 0
+        self.last_duration_seconds: Optional[float] = None
+        self.last_reload_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        return {
+            'generation': self.generation,
+            'reloads': self.reloads,
+            'failures': self.failures,
+            'last_duration_seconds': self.last_duration_seconds,
+            'last_reload_at': self.last_reload_at,
+            'last_error': self.last_error,
+        }
+
+
+class DataReloader:
+    """Watches the data files and swaps in a freshly built repository when they change.
+
+    signature() summarizes the files (e.g. their sizes and mtimes); a reload
+    starts once it differs from the loaded files and has stayed the same for
+    one polling interval, so files still being written are not picked up
+    half way. load() builds the new repository and publish() makes it
+    current. A failed load keeps the current repository and is counted.
+    """
+
+    def __init__(self, load: Callable[[], Repository], publish: Callable[[Repository], None],
+                 signature: Callable[[], Hashable], interval: float = 2.0):
+        self.load = load
+        self.publish = publish
+        self.signature = signature
+        self.interval = interval
+        self.stats = ReloadStats()
+        self._loaded = signature()
+        self._pending: Optional[Hashable] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check(self) -> bool:
+        """Reload if the files changed and have settled since the previous check"""
+        current = self.signature()
+        if current == self._loaded:
+            self._pending = None
+            return False
+        if current != self._pending:
+            self._pending = current
+            return False
+        return self.reload(current)
+
+    def reload(self, signature: Optional[Hashable] = None) -> bool:
+        """Build and publish a new repository now; returns whether it was published"""
+        with self._lock:
+            signature = self.signature() if signature is None else signature
+            started = time.perf_counter()
+            try:
+                repository = self.load()
+                repository.warm()
+            except Exception as error:
+                self.stats.failures += 1
+                self.stats.last_error = f"{type(error).__name__}: {error}"
+                logger.exception("Data reload failed; still serving generation %d", self.stats.generation)
+                return False
+
+            # Writes the current repository logged while this one was loading are applied before it goes live
+            repository.take_over(lambda: self.publish(repository))
+            self._loaded = signature
+            self._pending = None
+            self.stats.generation += 1
+            self.stats.reloads += 1
+            self.stats.last_duration_seconds = time.perf_counter() - started
+            self.stats.last_reload_at = time.time()
+            self.stats.last_error = None
+            logger.info("Reloaded data files as generation %d in %.3fs",
+                        self.stats.generation, self.stats.last_duration_seconds)
+            return True
+
+    def start(self):
+        """Start polling in a daemon thread; an interval of 0 or less disables watching"""
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="data-reloader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except OSError:
+                logger.exception("Could not check the data files")
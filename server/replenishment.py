@@ -0,0 +1,195 @@
+"""
+Reorder recommendations for the Factory Inventory Management System
+Joins inventory rows with demand forecasts, outstanding backlog and open
+purchase orders by SKU, and computes each row's projected stock, shortfall,
+recommended order quantity and cost as NumPy array expressions. Demand,
+backlog and on-order quantities are kept as per-SKU totals that are updated
+in place when a single record arrives, so a change never rebuilds the join.
+"""
+
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from columnar import Codes
+
+# Purchase orders in these statuses have not been received yet and count as stock on order
+OPEN_PURCHASE_ORDER_STATUSES = frozenset({'Pending', 'Approved', 'Shipped'})
+
+
+class ReplenishmentPlan:
+    """Inventory rows as NumPy columns, joined with per-SKU demand, backlog and on-order totals.
+
+    Forecasts, backlog and purchase orders are per SKU, while inventory is
+    held per SKU and warehouse; a SKU's totals are split evenly across the
+    warehouses that stock it. For each row:
+
+        projected   = on hand + on order - forecasted demand - backlog
+        shortfall   = max(reorder point - projected, 0)
+        recommended = shortfall rounded up to whole units, at the row's unit cost
+
+    Purchase orders reach a SKU through the backlog item they were raised for.
+    """
+
+    def __init__(self, inventory_items: Iterable[dict] = (), demand_forecasts: Iterable[dict] = (),
+                 backlog_items: Iterable[dict] = (), purchase_orders: Iterable[dict] = ()):
+        self.skus = Codes()
+        self.warehouses = Codes()
+        self.categories = Codes()
+        self._lock = threading.Lock()
+
+        items = list(inventory_items)
+        self.items: List[dict] = items
+        self.sku = np.fromiter((self.skus.encode(item.get('sku')) for item in items), dtype=np.int32,
+                               count=len(items))
+        self.warehouse = np.fromiter((self.warehouses.encode(item.get('warehouse')) for item in items),
+                                     dtype=np.int32, count=len(items))
+        self.category = np.fromiter(
+            (self.categories.encode((item.get('category') or '').lower()) for item in items),
+            dtype=np.int32, count=len(items))
+        self.on_hand = np.fromiter((item.get('quantity_on_hand', 0) for item in items), dtype=np.float64,
+                                   count=len(items))
+        self.reorder_point = np.fromiter((item.get('reorder_point', 0) for item in items), dtype=np.float64,
+                                         count=len(items))
+        self.unit_cost = np.fromiter((item.get('unit_cost', 0) for item in items), dtype=np.float64,
+                                     count=len(items))
+
+        # Per-SKU totals, summed with bincount over the coded SKU of each input record
+        forecasts = list(demand_forecasts)
+        forecast_sku = self._codes(forecast.get('item_sku') for forecast in forecasts)
+        backlog = list(backlog_items)
+        backlog_sku = self._codes(item.get('item_sku') for item in backlog)
+        self._backlog_skus: Dict[str, int] = {
+            item.get('id'): code for item, code in zip(backlog, backlog_sku.tolist())
+        }
+        orders = [po for po in purchase_orders if po.get('status') in OPEN_PURCHASE_ORDER_STATUSES
+                  and po.get('backlog_item_id') in self._backlog_skus]
+        order_sku = np.fromiter((self._backlog_skus[po.get('backlog_item_id')] for po in orders),
+                                dtype=np.int64, count=len(orders))
+
+        size = len(self.skus.values)
+        self.demand = np.bincount(forecast_sku, minlength=size, weights=np.fromiter(
+            (forecast.get('forecasted_demand', 0) for forecast in forecasts),
+            dtype=np.float64, count=len(forecasts)))
+        self.backlog = np.bincount(backlog_sku, minlength=size, weights=np.fromiter(
+            (max(item.get('quantity_needed', 0) - item.get('quantity_available', 0), 0) for item in backlog),
+            dtype=np.float64, count=len(backlog)))
+        self.on_order = np.bincount(order_sku, minlength=size, weights=np.fromiter(
+            (po.get('quantity', 0) for po in orders), dtype=np.float64, count=len(orders)))
+
+    def _codes(self, skus: Iterable[Optional[str]]) -> np.ndarray:
+        return np.fromiter((self.skus.encode(sku) for sku in skus), dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.sku)
+
+    def _sku_code(self, sku: Optional[str]) -> int:
+        """Code of a SKU, growing the per-SKU totals when it is new"""
+        code = self.skus.encode(sku)
+        if code >= len(self.demand):
+            grow = len(self.skus.values) - len(self.demand)
+            self.demand = np.concatenate([self.demand, np.zeros(grow)])
+            self.backlog = np.concatenate([self.backlog, np.zeros(grow)])
+            self.on_order = np.concatenate([self.on_order, np.zeros(grow)])
+        return code
+
+    def add_backlog_item(self, backlog_item: dict):
+        """Count a new backlog item towards its SKU"""
+        outstanding = backlog_item.get('quantity_needed', 0) - backlog_item.get('quantity_available', 0)
+        with self._lock:
+            code = self._sku_code(backlog_item.get('item_sku'))
+            self._backlog_skus[backlog_item.get('id')] = code
+            self.backlog[code] += max(outstanding, 0)
+
+    def add_purchase_order(self, purchase_order: dict):
+        """Count a new open purchase order as stock on order for its backlog item's SKU"""
+        if purchase_order.get('status') not in OPEN_PURCHASE_ORDER_STATUSES:
+            return
+        with self._lock:
+            code = self._backlog_skus.get(purchase_order.get('backlog_item_id'))
+            if code is not None:
+                self.on_order[code] += purchase_order.get('quantity', 0)
+
+    def add_inventory_item(self, item: dict):
+        """Append a new inventory row"""
+        with self._lock:
+            self.items.append(item)
+            self.sku = np.append(self.sku, np.int32(self._sku_code(item.get('sku'))))
+            self.warehouse = np.append(self.warehouse, np.int32(self.warehouses.encode(item.get('warehouse'))))
+            self.category = np.append(self.category, np.int32(
+                self.categories.encode((item.get('category') or '').lower())))
+            self.on_hand = np.append(self.on_hand, float(item.get('quantity_on_hand', 0)))
+            self.reorder_point = np.append(self.reorder_point, float(item.get('reorder_point', 0)))
+            self.unit_cost = np.append(self.unit_cost, float(item.get('unit_cost', 0)))
+
+    def update_inventory_item(self, position: int, previous: dict, item: dict):
+        """Take the stock level of the inventory row at position from its updated record"""
+        with self._lock:
+            self.items[position] = item
+            self.on_hand[position] = float(item.get('quantity_on_hand', 0))
+
+    def recommendations(self, warehouse: Optional[Iterable[str]] = None, category: Optional[Iterable[str]] = None,
+                        shortfall_only: bool = False) -> List[dict]:
+        """Projected position and recommended order for each inventory row matching the filters.
+
+        Filters take the same keys as the inventory indexes (exact warehouse,
+        lower-cased category). Rows come back in inventory order.
+        """
+        with self._lock:
+            sku, reorder_point, unit_cost = self.sku, self.reorder_point, self.unit_cost
+            # Per-SKU totals and stock levels are updated in place, so take copies; they are small
+            items, on_hand = list(self.items), self.on_hand.copy()
+            demand, backlog, on_order = self.demand.copy(), self.backlog.copy(), self.on_order.copy()
+            selected = np.ones(len(sku), dtype=bool)
+            if warehouse is not None:
+                selected &= np.isin(self.warehouse, self.warehouses.lookup(warehouse))
+            if category is not None:
+                selected &= np.isin(self.category, self.categories.lookup(category))
+
+        # Split each SKU's totals evenly across the rows that stock it
+        share = 1.0 / np.bincount(sku, minlength=len(demand))[sku]
+        return recommendation_rows(items, selected, on_hand, reorder_point, unit_cost, demand[sku] * share,
+                                   backlog[sku] * share, on_order[sku] * share, shortfall_only)
+
+
+def recommendation_rows(items: List[dict], selected: np.ndarray, on_hand: np.ndarray, reorder_point: np.ndarray,
+                        unit_cost: np.ndarray, row_demand: np.ndarray, row_backlog: np.ndarray,
+                        row_on_order: np.ndarray, shortfall_only: bool = False) -> List[dict]:
+    """Recommendation of each selected inventory row, given its share of its SKU's totals"""
+    projected = on_hand + row_on_order - row_demand - row_backlog
+    shortfall = np.maximum(reorder_point - projected, 0.0)
+    # Rounded first so splitting noise like 10.000000001 does not order a whole extra unit
+    quantity = np.ceil(np.round(shortfall, 6))
+    cost = quantity * unit_cost
+
+    if shortfall_only:
+        selected = selected & (quantity > 0)
+    rows = np.flatnonzero(selected)
+    columns = zip(
+        rows.tolist(), np.round(row_demand[rows], 2).tolist(), np.round(row_backlog[rows], 2).tolist(),
+        np.round(row_on_order[rows], 2).tolist(), np.round(projected[rows], 2).tolist(),
+        np.round(shortfall[rows], 2).tolist(), quantity[rows].astype(np.int64).tolist(),
+        np.round(cost[rows], 2).tolist()
+    )
+    return [
+        {
+            "id": items[row]["id"],
+            "sku": items[row]["sku"],
+            "name": items[row]["name"],
+            "category": items[row]["category"],
+            "warehouse": items[row]["warehouse"],
+            "quantity_on_hand": items[row]["quantity_on_hand"],
+            "reorder_point": items[row]["reorder_point"],
+            "unit_cost": items[row]["unit_cost"],
+            "forecasted_demand": row_demand_value,
+            "backlog_quantity": row_backlog_value,
+            "on_order_quantity": row_on_order_value,
+            "projected_quantity": projected_value,
+            "shortfall": shortfall_value,
+            "recommended_quantity": quantity_value,
+            "recommended_cost": cost_value,
+        }
+        for (row, row_demand_value, row_backlog_value, row_on_order_value, projected_value,
+             shortfall_value, quantity_value, cost_value) in columns
+    ]
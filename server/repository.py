@@ -0,0 +1,1296 @@
+"""
+Repository layer for the Factory Inventory Management System
+The API endpoints read and write data only through a Repository. Two
+implementations are provided: InMemoryRepository keeps the datasets as
+indexed lists with precomputed aggregates, and SqliteRepository serves them
+from a local SQLite database so the dataset does not have to fit in each
+worker's heap.
+
+Filters are passed as criteria dicts mapping an index name (warehouse,
+category, status, month) to the accepted keys, or None to skip it, using the
+same keys as the in-memory indexes: exact warehouse names, lower-cased
+category and status, and integer periods. date_contains matches a substring
+of order_date for month values the index cannot answer.
+"""
+
+import itertools
+import json
+import logging
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, nullcontext
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from adjustments import (Adjustment, AdjustmentLog, InsufficientStockError, KeyedLocks, UnknownItemError, adjusted,
+                         timestamp)
+from aggregates import DashboardCube, OrderPeriodRollup, PENDING_STATUSES, SpendingRollup
+from columnar import OrderColumns
+from data_store import DatasetVersion, IndexedCollection, field_key, lower_field_key, order_month_key
+from ingest import ImportLog
+import metrics
+from replenishment import OPEN_PURCHASE_ORDER_STATUSES, ReplenishmentPlan, recommendation_rows
+from search import RESULT_TYPES, SearchIndex, key_scores, merge_scores, ranked, term_scores, text_scores, words
+from shared_dataset import MappedRecords
+
+logger = logging.getLogger(__name__)
+
+Criteria = Dict[str, Optional[List[Hashable]]]
+
+# Fields besides id that identify a record, answered from an exact-match index
+LOOKUP_FIELDS = {'inventory': ('sku',), 'orders': ('order_number',)}
+
+# String key indexes saved in shared order files, which workers map instead of building: the order
+# store's id and order number indexes, and the lower-cased order numbers searched by prefix
+SHARED_ORDER_KEYS = {
+    'id': field_key('id'),
+    'order_number': field_key('order_number'),
+    'search': lambda order: (order.get('order_number') or '').lower() or None,
+}
+
+# Records fetched per round trip when a SQLite result set is iterated
+SQLITE_BATCH_SIZE = 512
+
+
+class Repository:
+    """Data access used by the API endpoints.
+
+    List collections ('inventory', 'orders', 'backlog') are paged by load
+    position: positions are unique, stable and ascending in load order, and
+    page() returns the position to resume after while more matches remain.
+    """
+
+    version: DatasetVersion
+
+    # Whether calls may block on I/O, so async callers should keep them off the event loop
+    blocking = True
+
+    def warm(self):
+        """Build anything otherwise built on first use, so the repository is ready to serve"""
+
+    def take_over(self, publish: Callable[[], None]):
+        """Make this freshly loaded repository current through publish, holding every write made before it"""
+        publish()
+
+    def _observe_filter(self, collection: str, criteria: Criteria, date_contains: Optional[str], matched: int):
+        """Record the result count and selectivity of a query that found every match of its filters"""
+        if date_contains is None and all(keys is None for keys in criteria.values()):
+            return
+        metrics.registry.observe_filter(collection, 'index' if date_contains is None else 'date', matched,
+                                        self.size(collection))
+
+    def size(self, collection: str) -> int:
+        """Number of records in a collection, i.e. one past the highest position"""
+        raise NotImplementedError
+
+    def get(self, collection: str, record_id: str) -> Optional[dict]:
+        """First record in load order with the given id"""
+        raise NotImplementedError
+
+    def get_many(self, collection: str, field: str, keys: Iterable[str]) -> Dict[str, dict]:
+        """First record in load order for each key of a lookup field; keys without a match are left out.
+
+        The lookup fields of a collection are 'id' and those in LOOKUP_FIELDS.
+        """
+        raise NotImplementedError
+
+    def page(self, collection: str, limit: Optional[int], after: Optional[int], criteria: Criteria,
+             date_contains: Optional[str] = None) -> Tuple[List[dict], Optional[int]]:
+        """Up to limit matching records after a position, plus the position to resume after"""
+        raise NotImplementedError
+
+    def iter_records(self, collection: str, after: Optional[int], criteria: Criteria,
+                     date_contains: Optional[str] = None) -> Iterator[dict]:
+        """Lazily yield matching records after a position, in load order"""
+        raise NotImplementedError
+
+    def count(self, collection: str, criteria: Criteria, date_contains: Optional[str] = None) -> int:
+        """Number of matching records"""
+        raise NotImplementedError
+
+    def inventory_totals(self, criteria: Criteria) -> Tuple[float, int]:
+        """(inventory value, low stock count) over the matching inventory"""
+        raise NotImplementedError
+
+    def order_totals(self, criteria: Criteria, date_contains: Optional[str] = None) -> Tuple[int, int, float]:
+        """(order count, pending count, total value) over the matching orders"""
+        raise NotImplementedError
+
+    def order_period_buckets(self, criteria: Criteria) -> Dict[int, list]:
+        """Per-period [order count, delivered count, revenue, compensation] over the matching orders"""
+        raise NotImplementedError
+
+    def demand_forecasts(self) -> List[dict]:
+        raise NotImplementedError
+
+    def backlog_items(self) -> List[dict]:
+        raise NotImplementedError
+
+    def purchase_orders(self) -> List[dict]:
+        raise NotImplementedError
+
+    def purchase_order_backlog_ids(self) -> set:
+        """Ids of backlog items that have at least one purchase order"""
+        raise NotImplementedError
+
+    def latest_purchase_order(self, backlog_item_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def has_purchase_order_id(self, purchase_order_id: str) -> bool:
+        raise NotImplementedError
+
+    def add_purchase_order(self, purchase_order: dict):
+        raise NotImplementedError
+
+    def add_orders(self, orders: List[dict]):
+        """Append a batch of orders, bringing indexes and aggregates up to date once for the whole batch"""
+        raise NotImplementedError
+
+    def adjust_inventory(self, adjustments: List[Adjustment]) -> List[dict]:
+        """Apply signed quantity_on_hand deltas by item id, in order, all or none.
+
+        Returns the updated items, one per distinct id in order of first
+        appearance. Raises UnknownItemError for an id with no item and
+        InsufficientStockError when a delta would take an item below zero;
+        neither applies any of the adjustments.
+        """
+        raise NotImplementedError
+
+    def transactions(self) -> List[dict]:
+        raise NotImplementedError
+
+    def add_transaction(self, transaction: dict):
+        raise NotImplementedError
+
+    def add_transactions(self, transactions: List[dict]):
+        """Append a batch of transactions, bringing the spending rollups up to date once for the whole batch"""
+        raise NotImplementedError
+
+    def spending_totals(self, by: Tuple[str, ...], criteria: Criteria,
+                        date_contains: Optional[str] = None) -> Dict[Tuple, Tuple[int, float]]:
+        """(transaction count, amount) of the matching transactions, grouped by the named spending dimensions.
+
+        criteria may filter on warehouse, category and month, as for orders.
+        """
+        raise NotImplementedError
+
+    def replenishment(self, criteria: Criteria, shortfall_only: bool = False) -> List[dict]:
+        """Reorder recommendation for each inventory row matching the inventory criteria"""
+        raise NotImplementedError
+
+    def search(self, query: str, limit: int, types: Optional[List[str]] = None) -> List[dict]:
+        """Inventory items, orders, customers and order line items matching a query, best first"""
+        raise NotImplementedError
+
+
+def _date_predicate(date_contains: Optional[str]) -> Optional[Callable[[dict], bool]]:
+    if date_contains is None:
+        return None
+    return lambda record: date_contains in record.get('order_date', '')
+
+
+def _as_set(keys: Optional[List[Hashable]]) -> Optional[set]:
+    return set(keys) if keys is not None else None
+
+
+def _spending_filters(criteria: Criteria) -> Dict[str, Optional[set]]:
+    """SpendingRollup filters for the warehouse, category and month criteria"""
+    return {name: _as_set(criteria.get(name)) for name in ('warehouse', 'category', 'month')}
+
+
+def _apply_logged(store: IndexedCollection, batches: Iterable[Tuple[str, List[Adjustment]]]):
+    """Apply logged adjustment batches to the inventory, each whole or not at all.
+
+    Ids missing from an edited data file are skipped, and so is a batch that
+    would now take an item below zero, since the file it was checked
+    against has changed under it.
+    """
+    for at, adjustments in batches:
+        updated: Dict[int, dict] = {}
+        for item_id, delta in adjustments:
+            position = store.id_positions.get(item_id)
+            if position is None:
+                continue
+            item = updated.get(position) or store.records[position]
+            if item['quantity_on_hand'] + delta < 0:
+                logger.warning("Skipping logged adjustment batch of %s: item %s would go below zero", at, item_id)
+                break
+            updated[position] = adjusted(item, delta, at)
+        else:
+            for position, item in updated.items():
+                store.replace(position, item)
+
+
+class _Lazy:
+    """Attribute built on first access from the repository's datasets, at most once.
+
+    The value is stored in the instance dict, which shadows this descriptor
+    on later reads, so built attributes cost a plain attribute lookup. Each
+    attribute has its own lock, so building one never waits for another
+    unless it reads it.
+    """
+
+    def __init__(self, build: Callable):
+        self.build = build
+        self.name = build.__name__
+        self.__doc__ = build.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        with instance._locks[self.name]:
+            if self.name not in instance.__dict__:
+                instance.__dict__[self.name] = self.build(instance)
+        return instance.__dict__[self.name]
+
+
+def _mapped_search_keys(orders) -> tuple:
+    """SearchIndex mapped_keys and mapped_orders for the order number keys saved in a shared file, if any"""
+    keys = orders.key_index('search') if isinstance(orders, MappedRecords) else None
+    ids = orders.key_index('id') if keys is not None else None
+    if ids is None:
+        return None, 0
+
+    def prefixed(prefix: str) -> Iterator[Tuple[str, List[Tuple[str, str]]]]:
+        for key, positions in keys.prefixed(prefix):
+            yield key, [('order', ids.key_at(position)) for position in positions]
+    return prefixed, keys.count
+
+
+class InMemoryRepository(Repository):
+    """Datasets held in memory as indexed record sequences.
+
+    Each dataset is loaded on first use through load(name), so an endpoint
+    only waits for the datasets it reads. Dashboard totals come from a
+    DashboardCube, unfiltered reports from an OrderPeriodRollup and anything
+    else the indexes cannot answer from NumPy order columns; each is built
+    from the current records on first use and kept in step with the stores
+    from then on.
+
+    Stock adjustments are logged to adjustment_log, when given, and the log
+    is replayed onto the inventory as it is loaded. Likewise orders and
+    transactions added in batches are logged to import_logs['orders'] and
+    import_logs['transactions'] and appended to the datasets as they load.
+    Without logs these writes only last as long as the repository.
+    """
+
+    _stores = {'inventory': 'inventory_store', 'orders': 'order_store', 'backlog': 'backlog_store'}
+
+    # Store of each dataset with an import log, and the fields besides id identifying its records
+    _imported = {'orders': ('order_store', ('order_number',)), 'transactions': ('transaction_store', ())}
+
+    def __init__(self, load: Callable[[str], object], adjustment_log: Optional[AdjustmentLog] = None,
+                 import_logs: Optional[Dict[str, ImportLog]] = None):
+        self.load = load
+        self.adjustment_log = adjustment_log
+        self.import_logs = import_logs or {}
+        self._sku_locks = KeyedLocks()
+        self._locks = {name: threading.RLock() for name in self._lazy_names}
+        # Bumped on every change to a store; cached responses built from an older version are discarded
+        self.version = DatasetVersion()
+        self._loading = True
+
+    @property
+    def blocking(self) -> bool:
+        """Calls only block while some dataset has yet to be loaded on first use"""
+        if self._loading:
+            self._loading = not self._lazy_names.issubset(self.__dict__)
+        return self._loading
+
+    def warm(self):
+        for name in self._lazy_names:
+            getattr(self, name)
+
+    def _watched(self, store: IndexedCollection) -> IndexedCollection:
+        # Bumped after the aggregates and indexes subscribed later have taken the change, so a response
+        # cached under the new version never comes from structures that have yet to see it
+        store.subscribe_changes(self.version.bump)
+        return store
+
+    @_Lazy
+    def inventory_store(self) -> IndexedCollection:
+        store = IndexedCollection(self.load('inventory_items'), {
+            'warehouse': field_key('warehouse'),
+            'category': lower_field_key('category'),
+            'sku': field_key('sku'),
+        })
+        if self.adjustment_log is not None:
+            _apply_logged(store, self.adjustment_log.replay())
+        return self._watched(store)
+
+    def _unseen(self, name: str, store: IndexedCollection, records: List[dict]) -> List[dict]:
+        """Logged records the store does not hold yet, as an edited data file may have taken them in"""
+        fields = self._imported[name][1]
+        return [record for record in records if record.get('id') not in store.id_positions
+                and not any(store.lookup(field, record.get(field)) for field in fields)]
+
+    def _with_imports(self, name: str, store: IndexedCollection) -> IndexedCollection:
+        """Append the records logged by earlier imports into a dataset, then watch it"""
+        log = self.import_logs.get(name)
+        if log is not None:
+            store.extend(self._unseen(name, store, log.replay()))
+        return self._watched(store)
+
+    def _add_imported(self, name: str, records: List[dict]):
+        """Log a batch of imported records, then store it after those other processes logged meanwhile"""
+        # Loaded first, so the replay of the log cannot pick up this batch as well
+        store = getattr(self, self._imported[name][0])
+        log = self.import_logs.get(name)
+        if log is None:
+            store.extend(records)
+            return
+        with log.locked() as logged:
+            log.append(records)
+            store.extend(self._unseen(name, store, logged) + records)
+
+    @_Lazy
+    def order_store(self) -> IndexedCollection:
+        records = self.load('orders')
+        mapped = records.mapped_indexes(('id', 'order_number')) if isinstance(records, MappedRecords) else None
+        return self._with_imports('orders', IndexedCollection(records, {
+            'warehouse': field_key('warehouse'),
+            'category': lower_field_key('category'),
+            'status': lower_field_key('status'),
+            'month': order_month_key,
+            'order_number': field_key('order_number'),
+        }, mapped))
+
+    @_Lazy
+    def backlog_store(self) -> IndexedCollection:
+        return self._watched(IndexedCollection(self.load('backlog_items'), {}))
+
+    @_Lazy
+    def purchase_order_store(self) -> IndexedCollection:
+        return self._watched(IndexedCollection(self.load('purchase_orders'), {
+            'backlog_item_id': field_key('backlog_item_id'),
+        }))
+
+    @_Lazy
+    def demand_forecast_list(self) -> List[dict]:
+        return list(self.load('demand_forecasts'))
+
+    @_Lazy
+    def transaction_store(self) -> IndexedCollection:
+        return self._with_imports('transactions', IndexedCollection(self.load('transactions'), {}))
+
+    @_Lazy
+    def dashboard_cube(self) -> DashboardCube:
+        """Dashboard totals per (warehouse, category, status, month)"""
+        cube = DashboardCube(self.inventory_store.records, self.order_store.records)
+        self.inventory_store.subscribe(cube.add_inventory_item)
+        self.inventory_store.subscribe_updates(lambda _, previous, item: cube.update_inventory_item(previous, item))
+        self.order_store.subscribe(cube.add_order)
+        return cube
+
+    @_Lazy
+    def order_rollup(self) -> OrderPeriodRollup:
+        """Per-month order rollups behind the unfiltered reports"""
+        rollup = OrderPeriodRollup(self.order_store.records)
+        self.order_store.subscribe(rollup.add_order)
+        return rollup
+
+    @_Lazy
+    def spending_rollup(self) -> SpendingRollup:
+        """Transaction amounts per (warehouse, category, type, vendor, month) behind the spending endpoints"""
+        rollup = SpendingRollup(self.transaction_store.records)
+        self.transaction_store.subscribe(rollup.add_transaction)
+        return rollup
+
+    @_Lazy
+    def order_columns(self) -> OrderColumns:
+        """NumPy columns over the orders for vectorized analytics on arbitrary filters"""
+        records = self.order_store.records
+        if isinstance(records, MappedRecords) and records.columns:
+            # Shared datasets carry the order columns; use them in place
+            columns = OrderColumns.attach(records.columns, records.meta, records.appended)
+        else:
+            columns = OrderColumns(records)
+        self.order_store.subscribe_batches(columns.add_orders)
+        return columns
+
+    @_Lazy
+    def replenishment_plan(self) -> ReplenishmentPlan:
+        """Inventory joined with per-SKU demand, backlog and on-order totals for reorder recommendations"""
+        plan = ReplenishmentPlan(self.inventory_store.records, self.demand_forecast_list,
+                                 self.backlog_store.records, self.purchase_order_store.records)
+        self.inventory_store.subscribe(plan.add_inventory_item)
+        self.inventory_store.subscribe_updates(plan.update_inventory_item)
+        self.backlog_store.subscribe(plan.add_backlog_item)
+        self.purchase_order_store.subscribe(plan.add_purchase_order)
+        return plan
+
+    @_Lazy
+    def search_index(self) -> SearchIndex:
+        """Prefix and text indexes over inventory and orders behind /api/search"""
+        orders = self.order_store.records
+        # Orders decoded on access are fetched by id rather than kept alive by the index
+        index = SearchIndex(self.inventory_store.records, orders,
+                            None if isinstance(orders, list) else self.order_store.get,
+                            *_mapped_search_keys(orders))
+        self.inventory_store.subscribe(index.add_inventory_item)
+        self.order_store.subscribe_batches(index.add_orders)
+        return index
+
+    def _store(self, collection: str) -> IndexedCollection:
+        return getattr(self, self._stores[collection])
+
+    def size(self, collection: str) -> int:
+        return len(self._store(collection))
+
+    def get(self, collection: str, record_id: str) -> Optional[dict]:
+        return self._store(collection).get(record_id)
+
+    def get_many(self, collection: str, field: str, keys: Iterable[str]) -> Dict[str, dict]:
+        store = self._store(collection)
+        found = {}
+        for key in keys:
+            if field == 'id':
+                record = store.get(key)
+            else:
+                matches = store.lookup(field, key)
+                record = matches[0] if matches else None
+            if record is not None:
+                found[key] = record
+        return found
+
+    def page(self, collection: str, limit: Optional[int], after: Optional[int], criteria: Criteria,
+             date_contains: Optional[str] = None) -> Tuple[List[dict], Optional[int]]:
+        if limit is None and after is None:
+            records = self.query(collection, criteria, date_contains)
+            self._observe_filter(collection, criteria, date_contains, len(records))
+            return records, None
+        return self._store(collection).page(limit, after=after, predicate=_date_predicate(date_contains),
+                                            **criteria)
+
+    def iter_records(self, collection: str, after: Optional[int], criteria: Criteria,
+                     date_contains: Optional[str] = None) -> Iterator[dict]:
+        return self._store(collection).iter_query(after=after, predicate=_date_predicate(date_contains),
+                                                  **criteria)
+
+    def count(self, collection: str, criteria: Criteria, date_contains: Optional[str] = None) -> int:
+        count = self._store(collection).count(predicate=_date_predicate(date_contains), **criteria)
+        self._observe_filter(collection, criteria, date_contains, count)
+        return count
+
+    def query(self, collection: str, criteria: Criteria, date_contains: Optional[str] = None) -> List[dict]:
+        """Every matching record as a list, without paging"""
+        return self._store(collection).query(predicate=_date_predicate(date_contains), **criteria)
+
+    def order_mask(self, criteria: Criteria, date_contains: Optional[str] = None):
+        """Vectorized order selection for the given filters"""
+        return self.order_columns.mask(date_contains=date_contains, **criteria)
+
+    def inventory_totals(self, criteria: Criteria) -> Tuple[float, int]:
+        return self.dashboard_cube.inventory_totals(
+            warehouse=_as_set(criteria.get('warehouse')),
+            category=_as_set(criteria.get('category'))
+        )
+
+    def order_totals(self, criteria: Criteria, date_contains: Optional[str] = None) -> Tuple[int, int, float]:
+        if date_contains is not None:
+            return self.order_columns.order_totals(self.order_mask(criteria, date_contains))
+        return self.dashboard_cube.order_totals(**{name: _as_set(keys) for name, keys in criteria.items()})
+
+    def order_period_buckets(self, criteria: Criteria) -> Dict[int, list]:
+        if all(keys is None for keys in criteria.values()):
+            return self.order_rollup.snapshot()
+        return self.order_columns.period_buckets(self.order_mask(criteria))
+
+    def demand_forecasts(self) -> List[dict]:
+        return self.demand_forecast_list
+
+    def backlog_items(self) -> List[dict]:
+        return self.backlog_store.query()
+
+    def purchase_orders(self) -> List[dict]:
+        return self.purchase_order_store.query()
+
+    def purchase_order_backlog_ids(self) -> set:
+        return set(self.purchase_order_store.keys('backlog_item_id'))
+
+    def latest_purchase_order(self, backlog_item_id: str) -> Optional[dict]:
+        matches = self.purchase_order_store.lookup('backlog_item_id', backlog_item_id)
+        return matches[-1] if matches else None
+
+    def has_purchase_order_id(self, purchase_order_id: str) -> bool:
+        return self.purchase_order_store.get(purchase_order_id) is not None
+
+    def add_purchase_order(self, purchase_order: dict):
+        self.purchase_order_store.add(purchase_order)
+
+    def add_orders(self, orders: List[dict]):
+        self._add_imported('orders', orders)
+
+    def adjust_inventory(self, adjustments: List[Adjustment]) -> List[dict]:
+        """Check and apply the batch under the locks of its SKUs and, when logging, the log's lock.
+
+        The log's lock is shared with every worker process logging to the same
+        file, whose batches are applied before the check. The batch is logged
+        before it is applied and the call returns once the log is on disk,
+        outside the locks, so concurrent batches share fsyncs.
+        """
+        if not adjustments:
+            return []
+        store = self.inventory_store
+        positions = []
+        for item_id, _ in adjustments:
+            position = store.id_positions.get(item_id)
+            if position is None:
+                raise UnknownItemError(item_id)
+            positions.append(position)
+
+        at = timestamp()
+        ticket = None
+        log = self.adjustment_log
+        with self._sku_locks.hold(store.records[position]['sku'] for position in set(positions)), \
+                (log.locked() if log is not None else nullcontext([])) as logged:
+            # Batches other workers logged meanwhile come first, so the check sees the stock they left
+            _apply_logged(store, logged)
+            updated: Dict[int, dict] = {}
+            for position, (item_id, delta) in zip(positions, adjustments):
+                item = updated.get(position) or store.records[position]
+                if item['quantity_on_hand'] + delta < 0:
+                    raise InsufficientStockError(item_id, item['quantity_on_hand'], delta)
+                updated[position] = adjusted(item, delta, at)
+            if log is not None:
+                ticket = log.append(at, adjustments)
+            for position, item in updated.items():
+                store.replace(position, item)
+        if ticket is not None:
+            log.wait(ticket)
+        return list(updated.values())
+
+    def take_over(self, publish: Callable[[], None]):
+        """Take in the imports and adjustment batches logged since the datasets were loaded, then publish.
+
+        The logs are held while publishing, so a write through the previous
+        repository either lands before and is taken in here, or waits and is
+        taken in by the next write through this one. A log that does not
+        exist yet is left alone; its first writer creates it.
+        """
+        with ExitStack() as held:
+            for name, log in self.import_logs.items():
+                attribute = self._imported[name][0]
+                # A store not loaded yet replays the whole log when it is
+                if attribute in self.__dict__ and os.path.exists(log.path):
+                    store = self.__dict__[attribute]
+                    unseen = self._unseen(name, store, held.enter_context(log.locked()))
+                    if unseen:
+                        store.extend(unseen)
+            if self.adjustment_log is not None and os.path.exists(self.adjustment_log.path):
+                _apply_logged(self.inventory_store, held.enter_context(self.adjustment_log.locked()))
+            publish()
+
+    def transactions(self) -> List[dict]:
+        return self.transaction_store.query()
+
+    def add_transaction(self, transaction: dict):
+        self.transaction_store.add(transaction)
+
+    def add_transactions(self, transactions: List[dict]):
+        self._add_imported('transactions', transactions)
+
+    def spending_totals(self, by: Tuple[str, ...], criteria: Criteria,
+                        date_contains: Optional[str] = None) -> Dict[Tuple, Tuple[int, float]]:
+        rollup = self.spending_rollup
+        if date_contains is not None:
+            # Free-form date filters cannot be answered from month cells; roll up the matching transactions
+            rollup = SpendingRollup(transaction for transaction in self.transaction_store
+                                    if date_contains in (transaction.get('date') or ''))
+        return rollup.totals(by, **_spending_filters(criteria))
+
+    def replenishment(self, criteria: Criteria, shortfall_only: bool = False) -> List[dict]:
+        return self.replenishment_plan.recommendations(shortfall_only=shortfall_only, **criteria)
+
+    def search(self, query: str, limit: int, types: Optional[List[str]] = None) -> List[dict]:
+        return self.search_index.search(query, limit, types)
+
+
+InMemoryRepository._lazy_names = frozenset(
+    name for name, attribute in vars(InMemoryRepository).items() if isinstance(attribute, _Lazy))
+
+
+class _ExactSum:
+    """SQLite aggregate summing floats exactly, like math.fsum.
+
+    Keeps non-overlapping partial sums (Shewchuk's algorithm), so totals are
+    correctly rounded and agree with the in-memory aggregates to the last bit.
+    """
+
+    def __init__(self):
+        self.partials: List[float] = []
+
+    def step(self, value):
+        if value is None:
+            return
+        x = float(value)
+        i = 0
+        for y in self.partials:
+            if abs(x) < abs(y):
+                x, y = y, x
+            hi = x + y
+            lo = y - (hi - x)
+            if lo:
+                self.partials[i] = lo
+                i += 1
+            x = hi
+        self.partials[i:] = [x]
+
+    def finalize(self) -> float:
+        return math.fsum(self.partials)
+
+
+# Stored as the database's user_version; a database built with another schema is rebuilt
+SQLITE_SCHEMA_VERSION = 3
+# Older schema versions upgraded in place instead, so writes made through the API survive
+SQLITE_UPGRADABLE_VERSIONS = (2,)
+
+# Search tables, maintained as inventory and orders are written: the lower-cased SKUs and order numbers
+# searched by prefix, the words of inventory, line item and customer names, and an order count per
+# distinct line item and customer. Refs are record ids, customer names and SKU-NUL-name line item keys.
+SQLITE_SEARCH_SCHEMA = """
+CREATE TABLE search_keys (key TEXT NOT NULL, type TEXT NOT NULL, ref TEXT);
+CREATE INDEX search_keys_key ON search_keys (key);
+CREATE TABLE search_words (word TEXT NOT NULL, type TEXT NOT NULL, ref TEXT, UNIQUE (word, type, ref));
+CREATE TABLE search_summaries (
+    type TEXT NOT NULL,
+    ref TEXT NOT NULL,
+    sku TEXT,
+    name TEXT,
+    order_count INTEGER NOT NULL,
+    PRIMARY KEY (type, ref)
+);
+"""
+
+SQLITE_SCHEMA = f"""
+PRAGMA user_version = {SQLITE_SCHEMA_VERSION};
+
+CREATE TABLE inventory (
+    position INTEGER PRIMARY KEY,
+    id TEXT,
+    sku TEXT,
+    warehouse TEXT,
+    category_key TEXT,
+    quantity_on_hand INTEGER,
+    reorder_point INTEGER,
+    unit_cost REAL,
+    record TEXT NOT NULL
+);
+CREATE INDEX inventory_id ON inventory (id);
+CREATE INDEX inventory_sku ON inventory (sku);
+CREATE INDEX inventory_warehouse ON inventory (warehouse);
+CREATE INDEX inventory_category ON inventory (category_key);
+
+CREATE TABLE orders (
+    position INTEGER PRIMARY KEY,
+    id TEXT,
+    order_number TEXT,
+    warehouse TEXT,
+    category_key TEXT,
+    status TEXT,
+    status_key TEXT,
+    order_date TEXT,
+    period INTEGER,
+    total_value REAL,
+    record TEXT NOT NULL
+);
+CREATE INDEX orders_id ON orders (id);
+CREATE INDEX orders_order_number ON orders (order_number);
+CREATE INDEX orders_warehouse ON orders (warehouse);
+CREATE INDEX orders_category ON orders (category_key);
+CREATE INDEX orders_status ON orders (status_key);
+CREATE INDEX orders_order_date ON orders (order_date);
+
+CREATE TABLE backlog (position INTEGER PRIMARY KEY, id TEXT, record TEXT NOT NULL);
+CREATE INDEX backlog_id ON backlog (id);
+
+CREATE TABLE purchase_orders (position INTEGER PRIMARY KEY, id TEXT, backlog_item_id TEXT, record TEXT NOT NULL);
+CREATE INDEX purchase_orders_id ON purchase_orders (id);
+CREATE INDEX purchase_orders_backlog_item_id ON purchase_orders (backlog_item_id);
+
+CREATE TABLE demand_forecasts (position INTEGER PRIMARY KEY, record TEXT NOT NULL);
+CREATE TABLE transactions (position INTEGER PRIMARY KEY, record TEXT NOT NULL);
+CREATE TABLE documents (name TEXT PRIMARY KEY, record TEXT NOT NULL);
+CREATE TABLE meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+""" + SQLITE_SEARCH_SCHEMA
+
+# Per-row replenishment inputs: each SKU's forecast demand, outstanding backlog and stock on order from
+# open purchase orders (reaching a SKU through the last backlog item with the PO's backlog_item_id), and
+# the number of inventory rows the totals are split across. The filters are added to the WHERE clause.
+SQLITE_REPLENISHMENT_QUERY = """
+WITH demand AS (
+    SELECT json_extract(record, '$.item_sku') AS sku,
+           SUM(COALESCE(json_extract(record, '$.forecasted_demand'), 0)) AS quantity
+    FROM demand_forecasts GROUP BY 1
+), outstanding AS (
+    SELECT json_extract(record, '$.item_sku') AS sku,
+           SUM(MAX(COALESCE(json_extract(record, '$.quantity_needed'), 0)
+                   - COALESCE(json_extract(record, '$.quantity_available'), 0), 0)) AS quantity
+    FROM backlog GROUP BY 1
+), on_order AS (
+    SELECT json_extract(backlog.record, '$.item_sku') AS sku,
+           SUM(COALESCE(json_extract(purchase_orders.record, '$.quantity'), 0)) AS quantity
+    FROM purchase_orders
+    JOIN backlog ON backlog.position = (
+        SELECT MAX(position) FROM backlog WHERE backlog.id = purchase_orders.backlog_item_id)
+    WHERE json_extract(purchase_orders.record, '$.status') IN ({statuses})
+    GROUP BY 1
+), stocked AS (
+    SELECT sku, COUNT(*) AS items FROM inventory GROUP BY sku
+)
+SELECT inventory.record, stocked.items, COALESCE(demand.quantity, 0), COALESCE(outstanding.quantity, 0),
+       COALESCE(on_order.quantity, 0)
+FROM inventory
+JOIN stocked ON stocked.sku IS inventory.sku
+LEFT JOIN demand ON demand.sku IS inventory.sku
+LEFT JOIN outstanding ON outstanding.sku IS inventory.sku
+LEFT JOIN on_order ON on_order.sku IS inventory.sku
+WHERE {where}
+ORDER BY inventory.position
+"""
+
+
+def _lower(value: Optional[str]) -> str:
+    return (value or '').lower()
+
+
+def _order_row(position: int, order: dict) -> tuple:
+    """Values of an orders table row"""
+    return (position, order.get('id'), order.get('order_number'), order.get('warehouse'), _lower(order.get('category')),
+            order.get('status'), _lower(order.get('status')), order.get('order_date', ''), order_month_key(order),
+            order.get('total_value', 0), json.dumps(order))
+
+
+def _index_for_search(connection: sqlite3.Connection, inventory_items: Iterable[dict] = (),
+                      orders: Iterable[dict] = ()):
+    """Add the search keys, name words and line item and customer order counts of new records"""
+    keys, text = [], []
+    for item in inventory_items:
+        if item.get('sku'):
+            keys.append((item['sku'].lower(), 'inventory', item.get('id')))
+        text += [(word, 'inventory', item.get('id')) for word in words(item.get('name'))]
+    counts = Counter()
+    for order in orders:
+        if order.get('order_number'):
+            keys.append((order['order_number'].lower(), 'order', order.get('id')))
+        customer = order.get('customer')
+        if customer:
+            counts['customer', customer, None, customer] += 1
+        for item in order.get('items') or []:
+            sku, name = item.get('sku'), item.get('name')
+            counts['order_item', f"{sku}\x00{name}", sku, name] += 1
+    for kind, ref, _, name in counts:
+        text += [(word, kind, ref) for word in words(name)]
+
+    connection.executemany("INSERT INTO search_keys VALUES (?, ?, ?)", keys)
+    connection.executemany("INSERT OR IGNORE INTO search_words VALUES (?, ?, ?)", text)
+    connection.executemany(
+        "INSERT INTO search_summaries VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT (type, ref) DO UPDATE SET order_count = order_count + excluded.order_count",
+        (entry + (count,) for entry, count in counts.items())
+    )
+
+
+def build_sqlite_database(path: str, inventory_items: Iterable[dict], orders: Iterable[dict],
+                          demand_forecasts: Iterable[dict], backlog_items: Iterable[dict],
+                          purchase_orders: Iterable[dict], spending: dict, transactions: Iterable[dict]):
+    """Write the datasets to a new SQLite database at path.
+
+    The database is built under a temporary name of its own and moved into
+    place, so a server never opens a half-written file and builds running at
+    the same time never write into each other's file.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    descriptor, building = tempfile.mkstemp(prefix=f"{name}.", suffix=".building", dir=directory)
+    os.close(descriptor)
+    try:
+        _write_sqlite_database(building, inventory_items, orders, demand_forecasts, backlog_items,
+                               purchase_orders, spending, transactions)
+        os.replace(building, path)
+    except BaseException:
+        os.remove(building)
+        raise
+
+
+def _write_sqlite_database(building: str, inventory_items: Iterable[dict], orders: Iterable[dict],
+                           demand_forecasts: Iterable[dict], backlog_items: Iterable[dict],
+                           purchase_orders: Iterable[dict], spending: dict, transactions: Iterable[dict]):
+    inventory_items, orders = list(inventory_items), list(orders)
+    connection = sqlite3.connect(building)
+    try:
+        connection.executescript(SQLITE_SCHEMA)
+        _index_for_search(connection, inventory_items, orders)
+        connection.executemany(
+            "INSERT INTO inventory VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((position, item.get('id'), item.get('sku'), item.get('warehouse'), _lower(item.get('category')),
+              item.get('quantity_on_hand'), item.get('reorder_point'), item.get('unit_cost'), json.dumps(item))
+             for position, item in enumerate(inventory_items))
+        )
+        connection.executemany(
+            "INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (_order_row(position, order) for position, order in enumerate(orders))
+        )
+        connection.executemany(
+            "INSERT INTO backlog VALUES (?, ?, ?)",
+            ((position, item.get('id'), json.dumps(item)) for position, item in enumerate(backlog_items))
+        )
+        connection.executemany(
+            "INSERT INTO purchase_orders VALUES (?, ?, ?, ?)",
+            ((position, po.get('id'), po.get('backlog_item_id'), json.dumps(po))
+             for position, po in enumerate(purchase_orders))
+        )
+        connection.executemany(
+            "INSERT INTO demand_forecasts VALUES (?, ?)",
+            ((position, json.dumps(forecast)) for position, forecast in enumerate(demand_forecasts))
+        )
+        connection.executemany(
+            "INSERT INTO transactions VALUES (?, ?)",
+            ((position, json.dumps(transaction)) for position, transaction in enumerate(transactions))
+        )
+        connection.executemany(
+            "INSERT INTO documents VALUES (?, ?)",
+            ((name, json.dumps(document)) for name, document in spending.items())
+        )
+        version = _initial_version()
+        connection.executemany("INSERT INTO meta VALUES (?, ?)", [('version', version), ('built_version', version)])
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def sqlite_schema_version(path: str) -> int:
+    """Schema version a database was built with (0 for one that predates versioning)"""
+    connection = sqlite3.connect(path)
+    try:
+        (version,), = connection.execute("PRAGMA user_version")
+        return version
+    finally:
+        connection.close()
+
+
+def upgrade_sqlite_database(path: str):
+    """Bring a database built with an upgradable older schema up to the current one, keeping its records"""
+    connection = sqlite3.connect(path)
+    try:
+        with connection:
+            connection.executescript(f"BEGIN; {SQLITE_SEARCH_SCHEMA}")
+            _index_for_search(connection, *(
+                [json.loads(record) for record, in connection.execute(f"SELECT record FROM {table} ORDER BY position")]
+                for table in ('inventory', 'orders')
+            ))
+            connection.execute(f"PRAGMA user_version = {SQLITE_SCHEMA_VERSION}")
+    finally:
+        connection.close()
+
+
+def sqlite_has_local_writes(path: str) -> bool:
+    """Whether records were written to a database through the API since it was built from the JSON files.
+
+    Such writes exist nowhere else. A database that predates the record of
+    its build version counts as written, since that cannot be ruled out.
+    """
+    connection = sqlite3.connect(path)
+    try:
+        versions = dict(connection.execute("SELECT name, value FROM meta"))
+    except sqlite3.OperationalError:
+        return True
+    finally:
+        connection.close()
+    return 'built_version' not in versions or versions['version'] != versions['built_version']
+
+
+def _initial_version() -> int:
+    """First dataset version of a database: its creation time, so rebuilt databases never repeat a version"""
+    return time.time_ns()
+
+
+def _bump_version(connection: sqlite3.Connection):
+    """Move the stored dataset version on, inside the transaction making the change"""
+    connection.execute("UPDATE meta SET value = value + 1 WHERE name = 'version'")
+
+
+class SqliteVersion:
+    """Dataset version kept in the database rather than the process.
+
+    Every write transaction bumps it, so a write in one worker invalidates
+    the cached bodies and ETags of every worker serving the same file.
+    """
+
+    def __init__(self, repository: 'SqliteRepository'):
+        self._repository = repository
+
+    @property
+    def value(self) -> int:
+        (value,), = self._repository._select("SELECT value FROM meta WHERE name = 'version'")
+        return value
+
+
+def _grouped(rows: Iterable[tuple]) -> Iterator[Tuple[str, List[Tuple[str, str]]]]:
+    """(value, [(type, ref), ...]) for runs of (value, type, ref) rows sharing a value"""
+    for value, group in itertools.groupby(rows, key=lambda row: row[0]):
+        yield value, [(kind, ref) for _, kind, ref in group]
+
+
+def _month_clause(periods: List[int]) -> Tuple[str, list]:
+    """order_date range conditions for integer periods, answered from the order_date index.
+
+    A YYYY-MM prefix matches exactly the dates in [YYYY-MM, YYYY-(MM+1)),
+    which is the same set the month index selects.
+    """
+    clauses, params = [], []
+    for period in sorted(set(periods)):
+        year, month = divmod(period, 100)
+        clauses.append("(order_date >= ? AND order_date < ?)")
+        params += [f"{year:04d}-{month:02d}", f"{year:04d}-{month + 1:02d}"]
+    return "(" + " OR ".join(clauses) + ")" if clauses else "0", params
+
+
+class SqliteRepository(Repository):
+    """Datasets served from a local SQLite database.
+
+    Filters and aggregates are pushed down into SQL against indexed columns,
+    and only the JSON bodies of the returned rows are decoded. Each thread
+    keeps its own connection, whose statement cache reuses the prepared
+    statements: SQL text depends only on which filters are present, so the
+    set of distinct statements stays small. Money totals use an exact sum
+    aggregate so they match InMemoryRepository. The dataset version lives in
+    the database and is bumped by every write transaction, so workers sharing
+    the file invalidate each other's cached responses. Search runs against
+    search tables that every write keeps current, and replenishment against
+    per-SKU aggregates, so neither is rebuilt in memory after a write.
+    """
+
+    _tables = {'inventory': 'inventory', 'orders': 'orders', 'backlog': 'backlog'}
+    _columns = {'warehouse': 'warehouse', 'category': 'category_key', 'status': 'status_key'}
+
+    def __init__(self, path: str):
+        self.path = path
+        self.version = SqliteVersion(self)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._derived: Dict[str, Tuple[int, object]] = {}
+        with self._connection() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            # Databases built before the version was stored start counting from now
+            connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            connection.execute("INSERT OR IGNORE INTO meta VALUES ('version', ?)", [_initial_version()])
+
+    def _connection(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, cached_statements=256)
+            connection.execute("PRAGMA busy_timeout=5000")
+            connection.create_aggregate('exact_sum', 1, _ExactSum)
+            self._local.connection = connection
+        return connection
+
+    def _where(self, criteria: Criteria, date_contains: Optional[str] = None) -> Tuple[List[str], list]:
+        clauses, params = [], []
+        for name, keys in criteria.items():
+            if keys is None:
+                continue
+            if name == 'month':
+                clause, month_params = _month_clause(keys)
+                clauses.append(clause)
+                params += month_params
+            else:
+                clauses.append(f"{self._columns[name]} IN ({', '.join('?' * len(keys))})" if keys else "0")
+                params += keys
+        if date_contains is not None:
+            clauses.append("instr(order_date, ?) > 0")
+            params.append(date_contains)
+        return clauses, params
+
+    def _select(self, sql: str, params: Iterable = ()) -> list:
+        return self._connection().execute(sql, list(params)).fetchall()
+
+    def _records(self, sql: str, params: Iterable = ()) -> List[dict]:
+        return [json.loads(record) for record, in self._select(sql, params)]
+
+    def size(self, collection: str) -> int:
+        (size,), = self._select(f"SELECT COALESCE(MAX(position) + 1, 0) FROM {self._tables[collection]}")
+        return size
+
+    def get(self, collection: str, record_id: str) -> Optional[dict]:
+        records = self._records(
+            f"SELECT record FROM {self._tables[collection]} WHERE id = ? ORDER BY position LIMIT 1", [record_id]
+        )
+        return records[0] if records else None
+
+    def get_many(self, collection: str, field: str, keys: Iterable[str]) -> Dict[str, dict]:
+        if field != 'id' and field not in LOOKUP_FIELDS.get(collection, ()):
+            raise KeyError(field)
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        for start in range(0, len(keys), SQLITE_BATCH_SIZE):
+            batch = keys[start:start + SQLITE_BATCH_SIZE]
+            rows = self._select(
+                f"SELECT {field}, record FROM {self._tables[collection]} "
+                f"WHERE {field} IN ({', '.join('?' * len(batch))}) ORDER BY position", batch
+            )
+            for key, record in rows:
+                if key not in found:
+                    found[key] = json.loads(record)
+        return {key: found[key] for key in keys if key in found}
+
+    def _page_rows(self, collection: str, limit: Optional[int], after: Optional[int], criteria: Criteria,
+                   date_contains: Optional[str]) -> list:
+        clauses, params = self._where(criteria, date_contains)
+        clauses.append("position > ?")
+        params.append(-1 if after is None else after)
+        sql = (f"SELECT position, record FROM {self._tables[collection]} WHERE {' AND '.join(clauses)} "
+               f"ORDER BY position LIMIT ?")
+        return self._select(sql, params + [-1 if limit is None else limit + 1])
+
+    def page(self, collection: str, limit: Optional[int], after: Optional[int], criteria: Criteria,
+             date_contains: Optional[str] = None) -> Tuple[List[dict], Optional[int]]:
+        rows = self._page_rows(collection, limit, after, criteria, date_contains)
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            return [json.loads(record) for _, record in rows], rows[-1][0]
+        if after is None:
+            self._observe_filter(collection, criteria, date_contains, len(rows))
+        return [json.loads(record) for _, record in rows], None
+
+    def iter_records(self, collection: str, after: Optional[int], criteria: Criteria,
+                     date_contains: Optional[str] = None) -> Iterator[dict]:
+        """Fetch in keyset batches, so no cursor stays open between the thread hops of a stream"""
+        while True:
+            rows = self._page_rows(collection, SQLITE_BATCH_SIZE - 1, after, criteria, date_contains)
+            for _, record in rows:
+                yield json.loads(record)
+            if len(rows) < SQLITE_BATCH_SIZE:
+                return
+            after = rows[-1][0]
+
+    def count(self, collection: str, criteria: Criteria, date_contains: Optional[str] = None) -> int:
+        clauses, params = self._where(criteria, date_contains)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        (count,), = self._select(f"SELECT COUNT(*) FROM {self._tables[collection]}{where}", params)
+        self._observe_filter(collection, criteria, date_contains, count)
+        return count
+
+    def inventory_totals(self, criteria: Criteria) -> Tuple[float, int]:
+        clauses, params = self._where(criteria)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        (value, low_stock), = self._select(
+            "SELECT exact_sum(quantity_on_hand * unit_cost), COALESCE(SUM(quantity_on_hand <= reorder_point), 0) "
+            f"FROM inventory{where}", params
+        )
+        return value, low_stock
+
+    def order_totals(self, criteria: Criteria, date_contains: Optional[str] = None) -> Tuple[int, int, float]:
+        clauses, params = self._where(criteria, date_contains)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        pending = ', '.join('?' * len(PENDING_STATUSES))
+        (count, pending_count, value), = self._select(
+            f"SELECT COUNT(*), COALESCE(SUM(status IN ({pending})), 0), exact_sum(total_value) FROM orders{where}",
+            list(PENDING_STATUSES) + params
+        )
+        return count, pending_count, value
+
+    def order_period_buckets(self, criteria: Criteria) -> Dict[int, list]:
+        clauses, params = self._where(criteria)
+        clauses.append("period IS NOT NULL")
+        rows = self._select(
+            "SELECT period, COUNT(*), SUM(status = 'Delivered'), exact_sum(total_value) "
+            f"FROM orders WHERE {' AND '.join(clauses)} GROUP BY period", params
+        )
+        return {period: [count, delivered, revenue, 0.0] for period, count, delivered, revenue in rows}
+
+    def demand_forecasts(self) -> List[dict]:
+        return self._records("SELECT record FROM demand_forecasts ORDER BY position")
+
+    def backlog_items(self) -> List[dict]:
+        return self._records("SELECT record FROM backlog ORDER BY position")
+
+    def purchase_orders(self) -> List[dict]:
+        return self._records("SELECT record FROM purchase_orders ORDER BY position")
+
+    def purchase_order_backlog_ids(self) -> set:
+        return {backlog_item_id for backlog_item_id, in self._select(
+            "SELECT DISTINCT backlog_item_id FROM purchase_orders")}
+
+    def latest_purchase_order(self, backlog_item_id: str) -> Optional[dict]:
+        records = self._records(
+            "SELECT record FROM purchase_orders WHERE backlog_item_id = ? ORDER BY position DESC LIMIT 1",
+            [backlog_item_id]
+        )
+        return records[0] if records else None
+
+    def has_purchase_order_id(self, purchase_order_id: str) -> bool:
+        return bool(self._select("SELECT 1 FROM purchase_orders WHERE id = ? LIMIT 1", [purchase_order_id]))
+
+    def add_purchase_order(self, purchase_order: dict):
+        connection = self._connection()
+        with self._write_lock, connection:
+            connection.execute(
+                "INSERT INTO purchase_orders (position, id, backlog_item_id, record) "
+                "SELECT COALESCE(MAX(position) + 1, 0), ?, ?, ? FROM purchase_orders",
+                [purchase_order['id'], purchase_order.get('backlog_item_id'), json.dumps(purchase_order)]
+            )
+            _bump_version(connection)
+
+    def adjust_inventory(self, adjustments: List[Adjustment]) -> List[dict]:
+        """Apply the batch in one transaction; SQLite's own write lock orders it against other workers.
+
+        Each delta is added in SQL, so no worker can overwrite another's
+        adjustment with a stale quantity, and a failed check rolls the whole
+        batch back.
+        """
+        if not adjustments:
+            return []
+        at = timestamp()
+        connection = self._connection()
+        positions: Dict[str, int] = {}
+        with self._write_lock, connection:
+            for item_id, delta in adjustments:
+                if item_id not in positions:
+                    rows = self._select("SELECT position FROM inventory WHERE id = ? ORDER BY position LIMIT 1",
+                                        [item_id])
+                    if not rows:
+                        raise UnknownItemError(item_id)
+                    positions[item_id] = rows[0][0]
+                updated = connection.execute(
+                    "UPDATE inventory SET quantity_on_hand = quantity_on_hand + ?1, record = json_set(record, "
+                    "'$.quantity_on_hand', quantity_on_hand + ?1, '$.last_updated', ?2) "
+                    "WHERE position = ?3 AND quantity_on_hand + ?1 >= 0", [delta, at, positions[item_id]]
+                ).rowcount
+                if not updated:
+                    (quantity,), = self._select("SELECT quantity_on_hand FROM inventory WHERE position = ?",
+                                                [positions[item_id]])
+                    raise InsufficientStockError(item_id, quantity, delta)
+            records = dict(self._select(
+                f"SELECT position, record FROM inventory WHERE position IN ({', '.join('?' * len(positions))})",
+                list(positions.values())
+            ))
+            _bump_version(connection)
+        return [json.loads(records[position]) for position in positions.values()]
+
+    def add_orders(self, orders: List[dict]):
+        connection = self._connection()
+        with self._write_lock, connection:
+            (start,), = connection.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM orders").fetchall()
+            connection.executemany(
+                "INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (_order_row(position, order) for position, order in enumerate(orders, start))
+            )
+            _index_for_search(connection, orders=orders)
+            _bump_version(connection)
+
+    def transactions(self) -> List[dict]:
+        return self._records("SELECT record FROM transactions ORDER BY position")
+
+    def add_transaction(self, transaction: dict):
+        connection = self._connection()
+        with self._write_lock, connection:
+            connection.execute(
+                "INSERT INTO transactions (position, record) "
+                "SELECT COALESCE(MAX(position) + 1, 0), ? FROM transactions",
+                [json.dumps(transaction)]
+            )
+            _bump_version(connection)
+
+    def add_transactions(self, transactions: List[dict]):
+        connection = self._connection()
+        with self._write_lock, connection:
+            (start,), = connection.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM transactions").fetchall()
+            connection.executemany(
+                "INSERT INTO transactions (position, record) VALUES (?, ?)",
+                ((position, json.dumps(transaction)) for position, transaction in enumerate(transactions, start))
+            )
+            _bump_version(connection)
+
+    def _derived_structure(self, name: str, build: Callable[[], object]):
+        """An in-memory structure built from the tables, rebuilt once per dataset version"""
+        version = self.version.value
+        cached = self._derived.get(name)
+        if cached is None or cached[0] != version:
+            cached = self._derived[name] = (version, build())
+        return cached[1]
+
+    def replenishment(self, criteria: Criteria, shortfall_only: bool = False) -> List[dict]:
+        """Per-SKU totals are aggregated in SQL for the selected rows; the row arithmetic is ReplenishmentPlan's"""
+        clauses, params = self._where(criteria)
+        statuses = sorted(OPEN_PURCHASE_ORDER_STATUSES)
+        rows = self._select(SQLITE_REPLENISHMENT_QUERY.format(
+            statuses=', '.join('?' * len(statuses)), where=' AND '.join(clauses) or '1'
+        ), statuses + params)
+        items = [json.loads(record) for record, *_ in rows]
+        items_per_sku, demand, backlog, on_order = np.array([row[1:] for row in rows], dtype=np.float64).reshape(
+            len(rows), 4).T
+
+        def column(field: str) -> np.ndarray:
+            return np.fromiter((item.get(field, 0) for item in items), dtype=np.float64, count=len(items))
+
+        # Split each SKU's totals evenly across the rows that stock it
+        share = 1.0 / items_per_sku
+        return recommendation_rows(items, np.ones(len(items), dtype=bool), column('quantity_on_hand'),
+                                   column('reorder_point'), column('unit_cost'), demand * share, backlog * share,
+                                   on_order * share, shortfall_only)
+
+    def search(self, query: str, limit: int, types: Optional[List[str]] = None) -> List[dict]:
+        """Answered from the search tables and ranked as SearchIndex ranks.
+
+        Keys and name words are matched by range scans of the tables' indexes
+        and word infixes by a scan of search_words, which grows with the
+        catalogue and customer base rather than the order history.
+        """
+        accepted = set(types) if types is not None else set(RESULT_TYPES)
+        normalized = query.strip().lower()
+
+        def match_term(term: str) -> Dict[Tuple[str, str], int]:
+            prefixed = self._prefixed("search_words", "word", term)
+            infixed = _grouped(self._connection().execute(
+                "SELECT word, type, ref FROM search_words WHERE instr(word, ?) > 1 ORDER BY word", [term]
+            )) if len(term) >= 3 else ()
+            return term_scores(term, prefixed, infixed)
+
+        scores = key_scores(normalized, self._prefixed("search_keys", "key", normalized) if normalized else (),
+                            accepted, limit)
+        merge_scores(scores, text_scores(words(normalized), match_term), accepted)
+        records = self._search_records(scores)
+        return ranked(scores, limit, lambda entry: records.get(entry, {}))
+
+    def _prefixed(self, table: str, column: str, prefix: str) -> Iterator[Tuple[str, List[Tuple[str, str]]]]:
+        """(value, entries) of a search table's values starting with prefix, in order, read as consumed"""
+        return _grouped(self._connection().execute(
+            f"SELECT {column}, type, ref FROM {table} WHERE {column} >= ? AND {column} < ? ORDER BY {column}",
+            [prefix, prefix + '\U0010ffff']
+        ))
+
+    def _search_records(self, scores: Dict[Tuple[str, str], int]) -> Dict[Tuple[str, str], dict]:
+        """The record or summary of each scored entry"""
+        refs: Dict[str, List[str]] = {}
+        for kind, ref in scores:
+            refs.setdefault(kind, []).append(ref)
+        records = {}
+        for kind, collection in (('inventory', 'inventory'), ('order', 'orders')):
+            for ref, record in self.get_many(collection, 'id', refs.get(kind, [])).items():
+                records[kind, ref] = record
+        summaries = refs.get('customer', []) + refs.get('order_item', [])
+        for start in range(0, len(summaries), SQLITE_BATCH_SIZE):
+            batch = summaries[start:start + SQLITE_BATCH_SIZE]
+            for kind, ref, sku, name, order_count in self._select(
+                f"SELECT type, ref, sku, name, order_count FROM search_summaries "
+                f"WHERE type IN ('customer', 'order_item') AND ref IN ({', '.join('?' * len(batch))})", batch
+            ):
+                records[kind, ref] = ({'name': name, 'order_count': order_count} if kind == 'customer' else
+                                      {'sku': sku, 'name': name, 'order_count': order_count})
+        return records
+    def spending_totals(self, by: Tuple[str, ...], criteria: Criteria,
+                        date_contains: Optional[str] = None) -> Dict[Tuple, Tuple[int, float]]:
+        if date_contains is not None:
+            rollup = SpendingRollup(self._records(
+                "SELECT record FROM transactions WHERE instr(json_extract(record, '$.date'), ?) > 0 "
+                "ORDER BY position", [date_contains]))
+        else:
+            rollup = self._derived_structure('spending', lambda: SpendingRollup(self.transactions()))
+        return rollup.totals(by, **_spending_filters(criteria))
@@ -0,0 +1,85 @@
+"""
+Pre-serialized response cache for the Factory Inventory Management System
+Stores encoded JSON bodies keyed by endpoint and normalized query parameters,
+so repeated reads of unchanged data skip validation and encoding entirely.
+Entries are tagged with the dataset version they were built from and are
+discarded once the data moves on. The same version and key make up the
+ETags used for conditional GETs.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+# Filter values that mean "no filter" and are dropped from cache keys
+NEUTRAL_PARAM_VALUES = ('', 'all')
+
+
+def cache_key(path: str, params: Iterable[Tuple[str, str]]) -> Tuple:
+    """Normalized key for an endpoint and its query parameters"""
+    return (path, tuple(sorted((name, value) for name, value in params if value not in NEUTRAL_PARAM_VALUES)))
+
+
+def entity_tag(version: int, key: Tuple) -> str:
+    """Strong ETag for a cache key at a dataset version"""
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=8).hexdigest()
+    return f'"v{version}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches etag, using the weak comparison RFC 9110 specifies"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in candidates or any(tag.removeprefix('W/') == etag for tag in candidates)
+
+
+class ResponseCache:
+    """LRU cache of encoded response bodies, bounded by entry count and total bytes."""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Tuple, Tuple[int, bytes]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Tuple, version: int) -> Optional[bytes]:
+        """Return the cached body for key if it was built from this dataset version"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                if entry is not None:
+                    self._discard(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Tuple, version: int, body: bytes):
+        """Store a body, evicting least recently used entries to stay within bounds"""
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+            self._entries[key] = (version, body)
+            self.size += len(body)
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _discard(self, key: Tuple):
+        _, body = self._entries.pop(key)
+        self.size -= len(body)
@@ -0,0 +1,277 @@
+"""
+Search index for the Factory Inventory Management System
+Answers /api/search from memory. SKUs and order numbers go into a sorted key
+list searched by prefix with bisect. Inventory names, line item names and
+customer names go into a word index with a trigram index over the words, so
+a query term matches whole words, word prefixes and word infixes. Line items
+and customers are indexed once per distinct name with an order count, so the
+text side grows with the catalogue and customer base rather than the order
+history. Records are indexed as they are added to the stores.
+"""
+
+import bisect
+import heapq
+import re
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# Scores for a query term matching a SKU or order number, and a word of a name
+EXACT_KEY_SCORE = 10
+KEY_PREFIX_SCORE = 5
+EXACT_WORD_SCORE = 3
+WORD_PREFIX_SCORE = 2
+WORD_INFIX_SCORE = 1
+
+# Result types in the order they are listed when scores tie
+RESULT_TYPES = ('inventory', 'order', 'customer', 'order_item')
+
+_WORD = re.compile(r'[0-9a-z]+')
+
+# A result: (type, key), the key being a record id, customer name or line item SKU and name
+Entry = Tuple[str, str]
+
+
+def words(text: Optional[str]) -> List[str]:
+    """Lower-cased alphanumeric words of a text"""
+    return _WORD.findall((text or '').lower())
+
+
+def trigrams(word: str) -> Set[str]:
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def _prefixed(keys: List[str], prefix: str) -> Iterable[str]:
+    """Keys of a sorted list starting with prefix, in order"""
+    for position in range(bisect.bisect_left(keys, prefix), len(keys)):
+        key = keys[position]
+        if not key.startswith(prefix):
+            return
+        yield key
+
+
+class SearchIndex:
+    """Prefix index over SKUs and order numbers plus a word and trigram index over names.
+
+    Every result is an entry with a type and a key; text entries are the
+    inventory records, and one entry per distinct line item (SKU and name)
+    and customer name counting the orders they appear in. Given
+    order_lookup, orders are fetched by id when results are ranked instead
+    of being held by the index, for orders decoded on access. Given
+    mapped_keys, the order number keys of the first mapped_orders orders
+    are not held either: mapped_keys(prefix) yields them with their entries
+    in key order, as a key index saved in a mapped file does.
+    """
+
+    def __init__(self, inventory_items: Iterable[dict] = (), orders: Iterable[dict] = (),
+                 order_lookup: Optional[Callable[[str], Optional[dict]]] = None,
+                 mapped_keys: Optional[Callable[[str], Iterable[Tuple[str, List[Entry]]]]] = None,
+                 mapped_orders: int = 0):
+        self._lock = threading.Lock()
+        self._order_lookup = order_lookup
+        self._mapped_keys = mapped_keys
+        # Prefix index: sorted lower-cased keys, each with the entries it identifies
+        self._keys: List[str] = []
+        self._key_entries: Dict[str, List[Entry]] = {}
+        # Text index: word -> entries containing it, trigram -> words containing it, sorted words
+        self._word_entries: Dict[str, Set[Entry]] = {}
+        self._trigram_words: Dict[str, Set[str]] = {}
+        self._words: List[str] = []
+        # Entry (type, key) -> the record or summary returned for it
+        self._entries: Dict[Entry, dict] = {}
+
+        for item in inventory_items:
+            self._add_inventory_item(item)
+        for position, order in enumerate(orders):
+            self._add_order(order, keyed=position >= mapped_orders)
+        self._keys.sort()
+        self._words.sort()
+        self._sorted = True
+
+    def _add_key(self, key: Optional[str], entry: Entry):
+        if not key:
+            return
+        key = key.lower()
+        entries = self._key_entries.get(key)
+        if entries is None:
+            entries = self._key_entries[key] = []
+            if getattr(self, '_sorted', False):
+                bisect.insort(self._keys, key)
+            else:
+                self._keys.append(key)
+        entries.append(entry)
+
+    def _add_text(self, text: Optional[str], entry: Entry):
+        for word in words(text):
+            entries = self._word_entries.get(word)
+            if entries is None:
+                entries = self._word_entries[word] = set()
+                for gram in trigrams(word):
+                    self._trigram_words.setdefault(gram, set()).add(word)
+                if getattr(self, '_sorted', False):
+                    bisect.insort(self._words, word)
+                else:
+                    self._words.append(word)
+            entries.add(entry)
+
+    def _add_inventory_item(self, item: dict):
+        entry = ('inventory', item.get('id'))
+        self._entries[entry] = item
+        self._add_key(item.get('sku'), entry)
+        self._add_text(item.get('name'), entry)
+
+    def _add_order(self, order: dict, keyed: bool = True):
+        entry = ('order', order.get('id'))
+        if self._order_lookup is None:
+            self._entries[entry] = order
+        if keyed:
+            self._add_key(order.get('order_number'), entry)
+
+        customer = order.get('customer')
+        if customer:
+            self._count(('customer', customer), {'name': customer}, customer)
+        for item in order.get('items') or []:
+            sku, name = item.get('sku'), item.get('name')
+            self._count(('order_item', f"{sku}\x00{name}"), {'sku': sku, 'name': name}, name)
+
+    def _count(self, entry: Entry, summary: dict, text: Optional[str]):
+        """Count one more order for a summary entry, indexing its text when the entry is new"""
+        existing = self._entries.get(entry)
+        if existing is None:
+            existing = self._entries[entry] = dict(summary, order_count=0)
+            self._add_text(text, entry)
+        existing['order_count'] += 1
+
+    def add_inventory_item(self, item: dict):
+        with self._lock:
+            self._add_inventory_item(item)
+
+    def add_order(self, order: dict):
+        with self._lock:
+            self._add_order(order)
+
+    def add_orders(self, orders: List[dict]):
+        with self._lock:
+            for order in orders:
+                self._add_order(order)
+
+    def _keyed(self, prefix: str) -> Iterable[Tuple[str, Iterable[Entry]]]:
+        """(key, entries) of the keys starting with prefix, in key order"""
+        keyed = ((key, self._key_entries[key]) for key in _prefixed(self._keys, prefix))
+        if self._mapped_keys is None:
+            return keyed
+        return heapq.merge(keyed, self._mapped_keys(prefix), key=lambda pair: pair[0])
+
+    def _match_term(self, term: str) -> Dict[Entry, int]:
+        """Best score of each entry with a name word matching term"""
+        prefixed = ((word, self._word_entries[word]) for word in _prefixed(self._words, term))
+        infixed: Iterable[Tuple[str, Iterable[Entry]]] = ()
+        if len(term) >= 3:
+            grams = sorted((self._trigram_words.get(gram, set()) for gram in trigrams(term)), key=len)
+            infixed = ((word, self._word_entries[word]) for word in (set.intersection(*grams) if grams else ()))
+        return term_scores(term, prefixed, infixed)
+
+    def search(self, query: str, limit: int = 20, types: Optional[Iterable[str]] = None) -> List[dict]:
+        """Entries matching the query, best first.
+
+        The whole query is matched as a SKU or order number prefix; each of
+        its words must also match a word of an entry's name for the entry to
+        count as a text match. An entry's score is the better of the two.
+        """
+        accepted = set(types) if types is not None else set(RESULT_TYPES)
+        normalized = query.strip().lower()
+
+        with self._lock:
+            keyed = self._keyed(normalized) if normalized else ()
+            scores = key_scores(normalized, keyed, accepted, limit)
+            merge_scores(scores, text_scores(words(normalized), self._match_term), accepted)
+            return ranked(scores, limit, self._record)
+
+    def _record(self, entry: Entry) -> dict:
+        if entry[0] == 'order' and self._order_lookup is not None:
+            return self._order_lookup(entry[1]) or {}
+        return self._entries[entry]
+
+
+def key_scores(normalized: str, keyed: Iterable[Tuple[str, Iterable[Entry]]], accepted: Set[str],
+               limit: int) -> Dict[Entry, int]:
+    """Scores of the entries of keys prefixed by the query, given in key order.
+
+    Keys past the limit-th match are not read unless they equal the query.
+    """
+    scores: Dict[Entry, int] = {}
+    for key, entries in keyed:
+        score = EXACT_KEY_SCORE if key == normalized else KEY_PREFIX_SCORE
+        for entry in entries:
+            if entry[0] in accepted:
+                scores[entry] = max(scores.get(entry, 0), score)
+        if len(scores) >= limit and key != normalized:
+            break
+    return scores
+
+
+def term_scores(term: str, prefixed: Iterable[Tuple[str, Iterable[Entry]]],
+                infixed: Iterable[Tuple[str, Iterable[Entry]]]) -> Dict[Entry, int]:
+    """Best score of each entry for one query term, given the words starting with it and candidate infix words"""
+    scores: Dict[Entry, int] = {}
+
+    def credit(entries: Iterable[Entry], score: int):
+        for entry in entries:
+            if scores.get(entry, 0) < score:
+                scores[entry] = score
+
+    for word, entries in prefixed:
+        credit(entries, EXACT_WORD_SCORE if word == term else WORD_PREFIX_SCORE)
+    for word, entries in infixed:
+        if term in word and not word.startswith(term):
+            credit(entries, WORD_INFIX_SCORE)
+    return scores
+
+
+def text_scores(terms: List[str], match_term: Callable[[str], Dict[Entry, int]]) -> Dict[Entry, int]:
+    """Summed term scores of the entries matching every term"""
+    scores: Optional[Dict[Entry, int]] = None
+    for term in terms:
+        matches = match_term(term)
+        if scores is None:
+            scores = matches
+        else:
+            scores = {entry: score + matches[entry] for entry, score in scores.items() if entry in matches}
+    return scores or {}
+
+
+def merge_scores(scores: Dict[Entry, int], matches: Dict[Entry, int], accepted: Set[str]):
+    """Raise scores to the matches of accepted types that beat them"""
+    for entry, score in matches.items():
+        if entry[0] in accepted:
+            scores[entry] = max(scores.get(entry, 0), score)
+
+
+def ranked(scores: Dict[Entry, int], limit: int, record: Callable[[Entry], dict]) -> List[dict]:
+    """The limit best results, given the record or summary of each entry"""
+    # Only entries scoring at least the limit-th best score can make the cut
+    cutoff = heapq.nlargest(limit, scores.values())[-1] if len(scores) > limit else 0
+    # Best score first, then by type, most ordered, and key
+    best = heapq.nsmallest(limit, (
+        (-score, RESULT_TYPES.index(entry[0]), -record(entry).get('order_count', 0), _label(entry, record(entry)),
+         entry)
+        for entry, score in scores.items() if score >= cutoff
+    ))
+    return [_result(entry, record(entry), -negative_score) for negative_score, _, _, _, entry in best]
+
+
+def _label(entry: Entry, record: dict) -> Tuple[str, str]:
+    return (record.get('order_number') or record.get('sku') or record.get('name') or '', entry[1] or '')
+
+
+def _result(entry: Entry, record: dict, score: int) -> dict:
+    kind, _ = entry
+    if kind == 'inventory':
+        fields = {'id': record.get('id'), 'sku': record.get('sku'), 'name': record.get('name'),
+                  'warehouse': record.get('warehouse'), 'category': record.get('category')}
+    elif kind == 'order':
+        fields = {'id': record.get('id'), 'order_number': record.get('order_number'),
+                  'customer': record.get('customer'), 'status': record.get('status'),
+                  'order_date': record.get('order_date')}
+    else:
+        fields = dict(record)
+    return {'type': kind, **fields, 'score': score}
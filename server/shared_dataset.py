@@ -0,0 +1,374 @@
+"""
+Memory-mapped shared datasets for the Factory Inventory Management System
+Each dataset is written once to a read-only file of offset-indexed marshal
+record blobs plus optional NumPy columns. Every worker process maps the
+file instead of holding its own lists of dicts, so the pages are shared
+through the OS page cache and attaching costs no copy. Records are decoded
+on access; records added or replaced at runtime live in a per-process
+overlay. Files may also carry sorted string key indexes, such as order ids
+and order numbers, so workers look keys up in the mapping instead of each
+building its own dict of them.
+"""
+
+import marshal
+import mmap
+import os
+import sys
+from collections.abc import Sequence
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent workers may each build the file; the atomic replace keeps it consistent
+    fcntl = None
+
+# Bump when the file layout changes so old files are rebuilt
+SHARED_FORMAT = 2
+
+MAGIC = b'INVSHR01'
+ALIGNMENT = 64
+
+# Builds (columns, metadata) from the records when a file is written
+ColumnBuilder = Callable[[List[dict]], Tuple[Dict[str, np.ndarray], object]]
+
+# Key of a record in a key index, None leaving the record out
+KeyFunc = Callable[[dict], Optional[str]]
+
+
+def _stamp(source: str) -> tuple:
+    stat = os.stat(source)
+    return (SHARED_FORMAT, sys.implementation.cache_tag, sys.byteorder, stat.st_size, stat.st_mtime_ns)
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+class MappedKeys:
+    """Posting lists of a string key index saved in a mapped file, with an in-process overlay.
+
+    Keys are stored UTF-8 encoded and sorted, each beside the position of a
+    record holding it, so the positions of a key are one ascending run and
+    the keys starting with a prefix are contiguous; ranks gives each
+    position's place in that order, or -1 for records left out. Posting
+    lists extended at runtime are copied into the overlay, which is read
+    first. Reads and setdefault behave like the dict of posting lists the
+    index stands in for.
+    """
+
+    def __init__(self, keys: np.ndarray, positions: np.ndarray, ranks: np.ndarray, complete: bool):
+        self._keys = keys
+        self._positions = positions
+        self._ranks = ranks
+        # Whether every record of the file has a key in the index
+        self.complete = complete
+        self._overlay: Dict[str, List[int]] = {}
+
+    @property
+    def count(self) -> int:
+        """Number of records in the file"""
+        return len(self._ranks)
+
+    def _mapped(self, key) -> List[int]:
+        if type(key) is not str:
+            return []
+        encoded = key.encode()
+        keys = self._keys
+        start = end = int(keys.searchsorted(encoded))
+        # Keys are mostly unique, so walking the run is cheaper than a second search
+        while end < len(keys) and keys[end] == encoded:
+            end += 1
+        return self._positions[start:end].tolist()
+
+    def get(self, key, default=None) -> Optional[List[int]]:
+        positions = self._overlay.get(key)
+        if positions is None:
+            positions = self._mapped(key)
+        return positions or default
+
+    def setdefault(self, key, default: List[int]) -> List[int]:
+        positions = self._overlay.get(key)
+        if positions is None:
+            positions = self._overlay[key] = self._mapped(key) or default
+        return positions
+
+    def __contains__(self, key) -> bool:
+        return key in self._overlay or bool(self._mapped(key))
+
+    def __iter__(self) -> Iterator[str]:
+        keys = dict.fromkeys(key.decode() for key in self._keys)
+        keys.update(dict.fromkeys(self._overlay))
+        return iter(keys)
+
+    def key_at(self, position: int) -> Optional[str]:
+        """Key of the record at a position of the file"""
+        rank = int(self._ranks[position])
+        return self._keys[rank].decode() if rank >= 0 else None
+
+    def prefixed(self, prefix: str) -> Iterator[Tuple[str, List[int]]]:
+        """(key, positions) of the keys in the file starting with prefix, in key order"""
+        encoded = prefix.encode()
+        # No UTF-8 sequence contains the byte 0xff, so it bounds every key with the prefix
+        start, end = (int(at) for at in self._keys.searchsorted([encoded, encoded + b'\xff']))
+        position = start
+        while position < end:
+            key = self._keys[position]
+            run = int(self._keys.searchsorted(key, side='right'))
+            yield key.decode(), self._positions[position:run].tolist()
+            position = run
+
+    def column(self) -> 'MappedKeyColumn':
+        """The key of each record by position, as an index key column"""
+        return MappedKeyColumn(self)
+
+
+class MappedKeyColumn:
+    """Index keys by record position: keys of the file's records from the mapping, later ones from a list"""
+
+    def __init__(self, keys: MappedKeys):
+        self._keys = keys
+        self._appended: List[Optional[str]] = []
+
+    def __getitem__(self, position: int) -> Optional[str]:
+        if position < self._keys.count:
+            return self._keys.key_at(position)
+        return self._appended[position - self._keys.count]
+
+    def append(self, key: Optional[str]):
+        self._appended.append(key)
+
+
+class MappedPositions:
+    """Record id -> first position, over a mapped key index, standing in for the dict it replaces"""
+
+    def __init__(self, keys: MappedKeys):
+        self._keys = keys
+
+    def get(self, key, default=None) -> Optional[int]:
+        positions = self._keys.get(key)
+        return positions[0] if positions else default
+
+    def __contains__(self, key) -> bool:
+        return key in self._keys
+
+    def setdefault(self, key, position: int) -> int:
+        return self._keys.setdefault(key, [position])[0]
+
+
+class MappedRecords(Sequence):
+    """Read-only records in a mapped file, decoded on access, with an in-process overlay of changes.
+
+    The file is the magic, an 8-byte header length and the marshalled
+    header, then at aligned offsets the record offsets (count + 1 unsigned
+    64-bit integers), the record blobs, each column's raw array data and the
+    arrays of each key index. Columns and key indexes are read-only NumPy
+    views of the mapping.
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        if bytes(view[:8]) != MAGIC:
+            raise ValueError(f"{path} is not a shared dataset")
+        header_size = int.from_bytes(view[8:16], 'little')
+        self.header = marshal.loads(view[16:16 + header_size])
+
+        self._count = self.header['count']
+        offsets_at, blobs_at = self.header['offsets'], self.header['blobs']
+        self._offsets = view[offsets_at:offsets_at + (self._count + 1) * 8].cast('Q')
+        self._blobs = view[blobs_at:]
+        self.columns: Dict[str, np.ndarray] = {
+            name: self._array(*placed) for name, placed in self.header['columns'].items()
+        }
+        self.meta = self.header['meta']
+        self.appended: List[dict] = []
+        self.replaced: Dict[int, dict] = {}
+
+    def _array(self, dtype: str, length: int, offset: int) -> np.ndarray:
+        return np.frombuffer(self._map, dtype=np.dtype(dtype), count=length, offset=offset)
+
+    def key_index(self, name: str) -> Optional[MappedKeys]:
+        """A fresh view of the named key index saved with the records, None if the file has none"""
+        saved = self.header['keys'].get(name)
+        if saved is None:
+            return None
+        complete, arrays = saved
+        return MappedKeys(*(self._array(*arrays[part]) for part in ('keys', 'positions', 'ranks')), complete)
+
+    def mapped_indexes(self, names: Iterable[str]) -> Dict[str, object]:
+        """The key indexes among names covering every record, as IndexedCollection takes them as mapped.
+
+        Nothing is returned once records have been appended, since the
+        indexes would not cover them.
+        """
+        if self.appended:
+            return {}
+        indexes = {name: self.key_index(name) for name in names}
+        mapped = {name: index for name, index in indexes.items() if index is not None and index.complete}
+        if 'id' in mapped:
+            mapped['id'] = MappedPositions(mapped['id'])
+        return mapped
+
+    @property
+    def stamp(self) -> tuple:
+        return self.header['stamp']
+
+    def __len__(self) -> int:
+        return self._count + len(self.appended)
+
+    def _decode(self, position: int) -> dict:
+        replaced = self.replaced.get(position)
+        if replaced is not None:
+            return replaced
+        return marshal.loads(self._blobs[self._offsets[position]:self._offsets[position + 1]])
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if 0 <= position < self._count:
+            return self._decode(position)
+        return self.appended[position - self._count]
+
+    def __iter__(self) -> Iterator[dict]:
+        for position in range(self._count):
+            yield self._decode(position)
+        yield from list(self.appended)
+
+    def append(self, record: dict):
+        self.appended.append(record)
+
+    def __setitem__(self, position: int, record: dict):
+        if position < 0:
+            position += len(self)
+        if 0 <= position < self._count:
+            self.replaced[position] = record
+        else:
+            self.appended[position - self._count] = record
+
+
+def _key_arrays(keys: List[Optional[str]]) -> Tuple[bool, Dict[str, np.ndarray]]:
+    """Whether every record has a key, and the arrays of a MappedKeys over the keys"""
+    present = [position for position, key in enumerate(keys) if type(key) is str]
+    encoded = np.array([keys[position].encode() for position in present], dtype=bytes)
+    order = np.argsort(encoded, kind='stable')
+    positions = np.asarray(present, dtype='<i8')[order]
+    ranks = np.full(len(keys), -1, dtype='<i8')
+    ranks[positions] = np.arange(len(positions))
+    return len(present) == len(keys), {'keys': encoded[order], 'positions': positions, 'ranks': ranks}
+
+
+def write_shared_dataset(path: str, stamp: tuple, records: List[dict],
+                         build_columns: Optional[ColumnBuilder] = None,
+                         key_indexes: Optional[Dict[str, KeyFunc]] = None):
+    """Write records, the columns built from them and their key indexes to path atomically"""
+    columns, meta = build_columns(records) if build_columns else ({}, None)
+    keys = {name: _key_arrays([key_func(record) for record in records])
+            for name, key_func in (key_indexes or {}).items()}
+    blobs = [marshal.dumps(record) for record in records]
+    offsets = np.zeros(len(blobs) + 1, dtype='<u8')
+    np.cumsum([len(blob) for blob in blobs], out=offsets[1:])
+
+    def layout(header_space: int) -> dict:
+        offsets_at = _aligned(16 + header_space)
+        blobs_at = _aligned(offsets_at + offsets.nbytes)
+        position = blobs_at + int(offsets[-1])
+
+        def place(arrays: Dict[str, np.ndarray]) -> Dict[str, tuple]:
+            nonlocal position
+            placed = {}
+            for name, array in arrays.items():
+                position = _aligned(position)
+                placed[name] = (array.dtype.str, len(array), position)
+                position += array.nbytes
+            return placed
+
+        placed = place(columns)
+        placed_keys = {name: (complete, place(arrays)) for name, (complete, arrays) in keys.items()}
+        return {'stamp': stamp, 'count': len(records), 'offsets': offsets_at, 'blobs': blobs_at,
+                'columns': placed, 'keys': placed_keys, 'meta': meta}
+
+    # The header holds offsets that depend on the space reserved for it; grow the space until it fits
+    header_space = 0
+    fields = layout(header_space)
+    header = marshal.dumps(fields)
+    while len(header) > header_space:
+        header_space = len(header)
+        fields = layout(header_space)
+        header = marshal.dumps(fields)
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, 'wb') as f:
+            f.write(MAGIC)
+            f.write(len(header).to_bytes(8, 'little'))
+            f.write(header)
+            f.seek(fields['offsets'])
+            f.write(offsets.tobytes())
+            f.seek(fields['blobs'])
+            for blob in blobs:
+                f.write(blob)
+            arrays = [(fields['columns'][name], array) for name, array in columns.items()]
+            arrays += [(fields['keys'][name][1][part], array)
+                       for name, (_, parts) in keys.items() for part, array in parts.items()]
+            for (_, _, offset), array in arrays:
+                f.seek(offset)
+                f.write(np.ascontiguousarray(array).tobytes())
+        os.replace(temporary, path)
+    except OSError:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def _attach(path: str, stamp: tuple) -> Optional[MappedRecords]:
+    try:
+        records = MappedRecords(path)
+    except (OSError, ValueError, EOFError, TypeError, KeyError):
+        return None
+    return records if records.stamp == stamp else None
+
+
+@contextmanager
+def build_lock(path: str):
+    """Hold an exclusive lock next to path, so one process builds while the others wait to attach"""
+    if fcntl is None:
+        yield
+        return
+    with open(path + '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def load_shared(source: str, path: str, load: Callable[[], List[dict]],
+                build_columns: Optional[ColumnBuilder] = None, key_indexes: Optional[Dict[str, KeyFunc]] = None):
+    """Map the shared file for source, building it from load() first when missing or stale.
+
+    The first process to find it stale builds it under a file lock; the rest
+    wait and attach to the result. Where the file cannot be written, the
+    loaded records are returned as a plain list instead.
+    """
+    stamp = _stamp(source)
+    records = _attach(path, stamp)
+    if records is not None:
+        return records
+    loaded = None
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with build_lock(path):
+            records = _attach(path, stamp)
+            if records is not None:
+                return records
+            loaded = load()
+            write_shared_dataset(path, stamp, loaded, build_columns, key_indexes)
+    except OSError:
+        return loaded if loaded is not None else load()
+    return _attach(path, stamp) or loaded
@@ -0,0 +1,96 @@
+"""
+Binary snapshot cache for the JSON data files of the Factory Inventory Management System
+Parsing large JSON files dominates startup, so each file is also kept as a
+marshal snapshot that loads several times faster. A snapshot records the
+format version, the interpreter it was written by and the size and mtime of
+its source; any mismatch, or an unreadable snapshot, falls back to the JSON
+and rewrites the snapshot.
+"""
+
+import gc
+import json
+import marshal
+import os
+import sys
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+# Bump when the snapshot layout changes so old snapshots are ignored
+SNAPSHOT_FORMAT = 1
+
+
+@contextmanager
+def _gc_paused():
+    """Suspend the cyclic garbage collector while building many containers that cannot form cycles"""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _stamp(source: str) -> tuple:
+    stat = os.stat(source)
+    return (SNAPSHOT_FORMAT, sys.implementation.cache_tag, stat.st_size, stat.st_mtime_ns)
+
+
+def snapshot_path(source: str, snapshot_dir: str, variant: str = '') -> str:
+    return os.path.join(snapshot_dir, os.path.basename(source) + (f'.{variant}' if variant else '') + '.snapshot')
+
+
+def _read_snapshot(path: str, stamp: tuple):
+    """Return (True, data) when the snapshot at path matches stamp, else (False, None).
+
+    A snapshot is a 4-byte header length, the marshalled stamp and the
+    marshalled data. The stamp is checked before the data is read, and the
+    data is read in one call: marshal.load on a file object reads piecemeal
+    and is much slower than marshal.loads on bytes.
+    """
+    try:
+        with open(path, 'rb') as f:
+            header_size = int.from_bytes(f.read(4), 'little')
+            if marshal.loads(f.read(header_size)) != stamp:
+                return False, None
+            return True, marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return False, None
+
+
+def _write_snapshot(path: str, stamp: tuple, data):
+    """Write a snapshot atomically; a read-only data directory just means no snapshot"""
+    temporary = f"{path}.{os.getpid()}.tmp"
+    header = marshal.dumps(stamp)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(temporary, 'wb') as f:
+            f.write(len(header).to_bytes(4, 'little'))
+            f.write(header)
+            f.write(marshal.dumps(data))
+        os.replace(temporary, path)
+    except (OSError, ValueError):
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def load_json(source: str, snapshot_dir: str, variant: str = '', pack: Optional[Callable] = None,
+              unpack: Optional[Callable] = None):
+    """Load a JSON file through its snapshot, rebuilding the snapshot when the source has changed.
+
+    With pack and unpack, the snapshot (named after variant) holds
+    pack(data) and the result is unpack() of that, so a derived
+    representation can be restored without building the parsed data first.
+    """
+    stamp = _stamp(source)
+    path = snapshot_path(source, snapshot_dir, variant)
+    with _gc_paused():
+        found, data = _read_snapshot(path, stamp)
+        if not found:
+            with open(source, 'r') as f:
+                data = json.load(f)
+            if pack is not None:
+                data = pack(data)
+    if not found:
+        _write_snapshot(path, stamp, data)
+    return unpack(data) if unpack is not None else data
@@ -0,0 +1,260 @@
+"""
+Tests for stock adjustments and their write-ahead log.
+"""
+import json
+import os
+import threading
+
+import pytest
+
+from adjustments import AdjustmentLog, InsufficientStockError, UnknownItemError
+from aggregates import DashboardCube
+from replenishment import ReplenishmentPlan
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    return str(tmp_path / "inventory.wal")
+
+
+@pytest.fixture
+def make_repository(log_path):
+    """Return a function building a memory repository over the sample data, logging to a temporary file."""
+    import mock_data
+    from repository import InMemoryRepository
+
+    def make():
+        return InMemoryRepository(mock_data.load_dataset, AdjustmentLog(
+            log_path, os.path.join(mock_data.DATA_DIR, mock_data.DATASET_FILES['inventory_items'])))
+    return make
+
+
+@pytest.fixture
+def adjusted_client(client, make_repository, monkeypatch):
+    """The test client serving a repository of its own, so adjustments do not leak into other tests."""
+    import main
+
+    monkeypatch.setattr(main, "repository", make_repository())
+    main.response_cache.clear()
+    yield client
+    main.response_cache.clear()
+
+
+class TestAdjustmentLog:
+    """Test suite for logging and replaying adjustment batches."""
+
+    def test_replay(self, tmp_path, log_path):
+        """Test that logged batches replay in order, a torn last line is cut off, and a changed source resets the log."""
+        source = tmp_path / "inventory.json"
+        source.write_text("[]")
+        log = AdjustmentLog(log_path, str(source))
+        assert log.replay() == [] and not os.path.exists(log_path)
+        log.wait(log.append("2025-09-30T10:00:00", [("1", -2), ("2", 5)]))
+        log.wait(log.append("2025-09-30T10:00:01", [("1", 1)]))
+        log.close()
+        with open(log_path, "ab") as f:
+            f.write(b'{"at":"2025-09-30T10:00:02","adjust')
+
+        assert AdjustmentLog(log_path, str(source)).replay() == [
+            ("2025-09-30T10:00:00", [("1", -2), ("2", 5)]), ("2025-09-30T10:00:01", [("1", 1)])]
+        with open(log_path, "rb") as f:
+            assert f.read().endswith(b"]]}\n")
+
+        source.write_text("[{}]")
+        assert AdjustmentLog(log_path, str(source)).replay() == []
+        assert os.path.exists(log_path + ".stale") and not os.path.exists(log_path)
+
+    def test_concurrent_waiters_share_fsyncs(self, tmp_path, log_path, monkeypatch):
+        """Test that every waiter returns with its batch on disk, with fewer fsyncs than batches."""
+        source = tmp_path / "inventory.json"
+        source.write_text("[]")
+        log = AdjustmentLog(log_path, str(source))
+        fsyncs = []
+        real_fsync = os.fsync
+        monkeypatch.setattr(os, "fsync", lambda fd: (fsyncs.append(fd), real_fsync(fd)))
+
+        def write(n):
+            for i in range(50):
+                log.wait(log.append("2025-09-30T10:00:00", [(str(n), i)]))
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(AdjustmentLog(log_path, str(source)).replay()) == 400
+        assert 0 < len(fsyncs) < 400
+
+
+class TestInMemoryAdjustments:
+    """Test suite for adjusting stock in the memory repository."""
+
+    def test_aggregates_follow_adjustments(self, make_repository):
+        """Test that the dashboard cube and replenishment plan match ones rebuilt from the adjusted records."""
+        repository = make_repository()
+        repository.warm()
+        version = repository.version.value
+        items = list(repository.inventory_store.records)
+        # Push one item below its reorder point and lift another above it
+        low, high = items[0], next(item for item in items if item["quantity_on_hand"] <= item["reorder_point"])
+        updated = repository.adjust_inventory([
+            (low["id"], low["reorder_point"] - low["quantity_on_hand"]),
+            (high["id"], high["reorder_point"] - high["quantity_on_hand"] + 1),
+        ])
+
+        assert [item["quantity_on_hand"] for item in updated] == [low["reorder_point"], high["reorder_point"] + 1]
+        assert repository.get("inventory", low["id"]) == updated[0]
+        assert repository.version.value != version
+        records = list(repository.inventory_store.records)
+        fresh = DashboardCube(records)
+        for criteria in ({}, {"warehouse": {low["warehouse"]}}, {"category": {high["category"].lower()}}):
+            value, low_stock = repository.dashboard_cube.inventory_totals(**criteria)
+            expected_value, expected_low_stock = fresh.inventory_totals(**criteria)
+            assert low_stock == expected_low_stock and value == pytest.approx(expected_value, abs=1e-6)
+        plan = ReplenishmentPlan(records, repository.demand_forecast_list, repository.backlog_store.records,
+                                 repository.purchase_order_store.records)
+        assert repository.replenishment({}) == plan.recommendations()
+
+    def test_batches_are_all_or_nothing(self, make_repository):
+        """Test that a batch with an unknown id or a delta going below zero changes nothing."""
+        repository = make_repository()
+        before = list(repository.inventory_store.records)
+        item = before[0]
+
+        with pytest.raises(UnknownItemError):
+            repository.adjust_inventory([(item["id"], 1), ("missing", 1)])
+        with pytest.raises(InsufficientStockError):
+            repository.adjust_inventory([(item["id"], 1), (item["id"], -item["quantity_on_hand"] - 2)])
+        assert list(repository.inventory_store.records) == before
+
+    def test_concurrent_adjustments_and_replay(self, make_repository):
+        """Test that concurrent adjustments lose no update and a new repository replays them from the log."""
+        repository = make_repository()
+        items = list(repository.inventory_store.records)[:4]
+
+        def adjust(delta):
+            for i in range(100):
+                item = items[i % len(items)]
+                repository.adjust_inventory([(item["id"], delta)])
+        threads = [threading.Thread(target=adjust, args=(delta,)) for delta in (1, 1, 2, -1)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        expected = {item["id"]: item["quantity_on_hand"] + 75 for item in items}
+        assert {item["id"]: repository.get("inventory", item["id"])["quantity_on_hand"] for item in items} == expected
+        replayed = make_repository()
+        assert {item["id"]: replayed.get("inventory", item["id"])["quantity_on_hand"] for item in items} == expected
+        assert list(replayed.inventory_store.records) == list(repository.inventory_store.records)
+
+    def test_workers_sharing_a_log_check_against_each_other(self, make_repository):
+        """Test that workers logging to one file never take an item below zero between them."""
+        workers = [make_repository(), make_repository()]
+        item = workers[0].inventory_store.records[0]
+        accepted = []
+
+        def drain(worker):
+            for _ in range(item["quantity_on_hand"]):
+                try:
+                    worker.adjust_inventory([(item["id"], -1)])
+                    accepted.append(1)
+                except InsufficientStockError:
+                    pass
+        threads = [threading.Thread(target=drain, args=(worker,)) for worker in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(accepted) == item["quantity_on_hand"]
+        with pytest.raises(InsufficientStockError):
+            workers[0].adjust_inventory([(item["id"], -1)])
+        assert workers[0].get("inventory", item["id"])["quantity_on_hand"] == 0
+        assert make_repository().get("inventory", item["id"])["quantity_on_hand"] == 0
+
+    def test_replay_skips_batches_going_below_zero(self, make_repository, log_path):
+        """Test that a logged batch that no longer fits the stock is skipped whole on replay."""
+        repository = make_repository()
+        first, second = list(repository.inventory_store.records)[:2]
+        repository.adjust_inventory([(first["id"], 1)])
+        repository.adjustment_log.close()
+        with open(log_path, "a") as f:
+            for adjustments in ([[first["id"], 5], [second["id"], -second["quantity_on_hand"] - 1]],
+                                [[second["id"], 2]]):
+                f.write(json.dumps({"at": "2025-09-30T10:00:00", "adjustments": adjustments}) + "\n")
+
+        replayed = make_repository()
+        assert replayed.get("inventory", first["id"])["quantity_on_hand"] == first["quantity_on_hand"] + 1
+        assert replayed.get("inventory", second["id"])["quantity_on_hand"] == second["quantity_on_hand"] + 2
+
+    def test_take_over_applies_batches_logged_while_loading(self, make_repository):
+        """Test that a reloaded repository holds the adjustments made through the old one since it loaded."""
+        current, reloaded = make_repository(), make_repository()
+        reloaded.warm()
+        item = current.inventory_store.records[0]
+        current.adjust_inventory([(item["id"], 3)])
+        published = []
+
+        reloaded.take_over(lambda: published.append(reloaded.get("inventory", item["id"])["quantity_on_hand"]))
+        assert published == [item["quantity_on_hand"] + 3]
+
+
+class TestAdjustmentEndpoints:
+    """Test suite for PATCH /api/inventory/{id} and POST /api/inventory/adjustments."""
+
+    def test_patch_item(self, adjusted_client, log_path):
+        """Test that a PATCH adjusts one item, is logged and shows up in reads and the dashboard."""
+        before = adjusted_client.get("/api/inventory/1").json()
+        summary = adjusted_client.get("/api/dashboard/summary").json()
+
+        response = adjusted_client.patch("/api/inventory/1", json={"delta": -10})
+        assert response.status_code == 200
+        assert response.json()["quantity_on_hand"] == before["quantity_on_hand"] - 10
+        assert adjusted_client.get("/api/inventory/1").json() == response.json()
+        assert adjusted_client.get("/api/dashboard/summary").json()["total_inventory_value"] == pytest.approx(
+            summary["total_inventory_value"] - 10 * before["unit_cost"])
+        with open(log_path) as f:
+            assert json.loads(f.readlines()[-1])["adjustments"] == [["1", -10]]
+
+    def test_bulk_adjustments(self, adjusted_client):
+        """Test that a bulk request returns each item once, in order, with its final quantity."""
+        first, second = (adjusted_client.get(f"/api/inventory/{item_id}").json() for item_id in ("1", "2"))
+        response = adjusted_client.post("/api/inventory/adjustments", json={"adjustments": [
+            {"id": "2", "delta": 5}, {"id": "1", "delta": -1}, {"id": "2", "delta": -2}]})
+
+        assert response.status_code == 200
+        assert [(item["id"], item["quantity_on_hand"]) for item in response.json()] == [
+            ("2", second["quantity_on_hand"] + 3), ("1", first["quantity_on_hand"] - 1)]
+
+    def test_errors(self, adjusted_client):
+        """Test that unknown items are 404, going below zero is 409 and empty or malformed batches are 422."""
+        quantity = adjusted_client.get("/api/inventory/1").json()["quantity_on_hand"]
+
+        assert adjusted_client.patch("/api/inventory/missing", json={"delta": 1}).status_code == 404
+        assert adjusted_client.patch("/api/inventory/1", json={"delta": -quantity - 1}).status_code == 409
+        response = adjusted_client.post("/api/inventory/adjustments", json={"adjustments": [
+            {"id": "1", "delta": 1}, {"id": "missing", "delta": 1}]})
+        assert response.status_code == 404
+        assert adjusted_client.post("/api/inventory/adjustments", json={"adjustments": []}).status_code == 422
+        assert adjusted_client.patch("/api/inventory/1", json={"delta": "many"}).status_code == 422
+        assert adjusted_client.get("/api/inventory/1").json()["quantity_on_hand"] == quantity
+
+    def test_sqlite_matches_memory(self, adjusted_client, tmp_path, monkeypatch):
+        """Test that the SQLite backend applies the same batch to the same result."""
+        import main
+        from mock_data import load_datasets
+        from repository import SqliteRepository, build_sqlite_database
+
+        batch = {"adjustments": [{"id": "3", "delta": -4}, {"id": "1", "delta": 7}]}
+        expected = adjusted_client.post("/api/inventory/adjustments", json=batch).json()
+        path = str(tmp_path / "inventory.db")
+        build_sqlite_database(path, **load_datasets())
+        monkeypatch.setattr(main, "repository", SqliteRepository(path))
+        actual = adjusted_client.post("/api/inventory/adjustments", json=batch).json()
+
+        strip = lambda items: [dict(item, last_updated=None) for item in items]
+        assert strip(actual) == strip(expected)
+        too_many = {"adjustments": [{"id": "3", "delta": 1}, {"id": "1", "delta": -10 ** 6}]}
+        assert adjusted_client.post("/api/inventory/adjustments", json=too_many).status_code == 409
+        assert adjusted_client.get("/api/inventory/3").json()["quantity_on_hand"] == expected[0]["quantity_on_hand"]
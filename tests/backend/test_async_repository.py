@@ -0,0 +1,133 @@
+"""
+Tests for the async data access layer used by the request handlers.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from async_repository import AsyncRepository
+from mock_data import repository
+
+
+class RecordingRepository:
+    """Records which thread each repository call ran on."""
+
+    def __init__(self, blocking=False):
+        self.blocking = blocking
+        self.threads = []
+
+    def _record(self, result):
+        self.threads.append(threading.current_thread().name)
+        return result
+
+    def get(self, collection, record_id):
+        return self._record({"id": record_id})
+
+    def count(self, collection, criteria, date_contains=None):
+        return self._record(0)
+
+    def order_period_buckets(self, criteria):
+        return self._record({})
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix='test-analytics') as pool:
+        yield pool
+
+
+class TestAsyncRepository:
+    """Test suite for AsyncRepository dispatch."""
+
+    def test_cheap_calls_run_inline(self, executor):
+        """Test that id lookups and single-index counts stay on the event loop thread."""
+        recording = RecordingRepository()
+        data = AsyncRepository(recording, executor)
+
+        async def calls():
+            await data.get('orders', '1')
+            await data.count('orders', {'status': ['delivered'], 'warehouse': None})
+            await data.order_period_buckets({'status': None})
+            return threading.current_thread().name
+
+        loop_thread = asyncio.run(calls())
+        assert recording.threads == [loop_thread] * 3
+
+    def test_filtered_aggregations_are_offloaded(self, executor):
+        """Test that multi-filter counts, date scans and filtered buckets run on the executor."""
+        recording = RecordingRepository()
+        data = AsyncRepository(recording, executor)
+
+        async def calls():
+            await data.count('orders', {'status': ['delivered'], 'warehouse': ['Tokyo']})
+            await data.count('orders', {}, 'T10')
+            await data.order_period_buckets({'status': ['delivered']})
+
+        asyncio.run(calls())
+        assert len(recording.threads) == 3
+        assert all(name.startswith('test-analytics') for name in recording.threads)
+
+    def test_blocking_repository_always_offloads(self, executor):
+        """Test that every call on a repository doing blocking I/O leaves the event loop."""
+        recording = RecordingRepository(blocking=True)
+        asyncio.run(AsyncRepository(recording, executor).get('orders', '1'))
+        assert recording.threads[0].startswith('test-analytics')
+
+    def test_offloaded_work_is_bounded_by_the_executor(self, executor):
+        """Test that concurrent offloaded calls never use more threads than the executor has."""
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def work():
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            threading.Event().wait(0.01)
+            with lock:
+                active[0] -= 1
+
+        async def calls():
+            data = AsyncRepository(RecordingRepository(), executor)
+            await asyncio.gather(*(data.run(work) for _ in range(20)))
+
+        asyncio.run(calls())
+        assert peak[0] <= 2
+
+    def test_results_match_the_repository(self):
+        """Test that the async view returns what the wrapped repository does."""
+        criteria = {'status': ['delivered'], 'warehouse': ['Tokyo']}
+
+        async def calls():
+            data = AsyncRepository(repository)
+            return (await data.count('orders', criteria), await data.order_period_buckets(criteria),
+                    await data.get('orders', '1'))
+
+        assert asyncio.run(calls()) == (repository.count('orders', criteria),
+                                        repository.order_period_buckets(criteria),
+                                        repository.get('orders', '1'))
+
+
+class TestStartupWarmup:
+    """Test suite for loading the datasets in the background at startup."""
+
+    def test_startup_warms_repository(self, monkeypatch):
+        """Test that the app loads every dataset in the background once it starts."""
+        import time
+
+        from fastapi.testclient import TestClient
+
+        import main
+        from mock_data import load_dataset
+        from repository import InMemoryRepository
+
+        cold = InMemoryRepository(load_dataset)
+        monkeypatch.setattr(main, "repository", cold)
+        assert cold.blocking
+
+        with TestClient(main.app):
+            deadline = time.monotonic() + 10
+            while cold.blocking and time.monotonic() < deadline:
+                time.sleep(0.01)
+        assert not cold.blocking
@@ -0,0 +1,55 @@
+"""
+Tests for the batch lookup endpoints.
+"""
+import pytest
+
+
+class TestBatchLookup:
+    """Test suite for POST /api/inventory/batch and /api/orders/batch."""
+
+    def test_inventory_by_id_and_sku(self, client):
+        """Test that items are found by id and by SKU, with unknown keys reported as missing."""
+        inventory = client.get("/api/inventory").json()
+        response = client.post("/api/inventory/batch", json={
+            "ids": [inventory[2]["id"], "no-such-id"],
+            "skus": [inventory[5]["sku"], "NO-SKU"],
+        })
+        assert response.status_code == 200
+
+        data = response.json()
+        assert data["found"] == [inventory[2], inventory[5]]
+        assert data["missing"] == {"ids": ["no-such-id"], "skus": ["NO-SKU"]}
+
+    def test_orders_by_id_and_order_number(self, client):
+        """Test that orders resolve like the single-order endpoint, in request order."""
+        orders = client.get("/api/orders").json()
+        ids = [order["id"] for order in orders[:20]][::-1]
+        response = client.post("/api/orders/batch", json={
+            "ids": ids,
+            "order_numbers": [orders[30]["order_number"], "ORD-0000"],
+        })
+        assert response.status_code == 200
+
+        data = response.json()
+        assert data["found"] == [client.get(f"/api/orders/{order_id}").json() for order_id in ids] + [orders[30]]
+        assert data["missing"] == {"ids": [], "order_numbers": ["ORD-0000"]}
+
+    def test_duplicate_keys_listed_once(self, client):
+        """Test that a key repeated in the request yields one record."""
+        response = client.post("/api/orders/batch", json={"ids": ["1", "1", "1"]})
+        assert [order["id"] for order in response.json()["found"]] == ["1"]
+
+    def test_empty_request(self, client):
+        """Test that a batch without keys returns nothing found and nothing missing."""
+        response = client.post("/api/inventory/batch", json={})
+        assert response.status_code == 200
+        assert response.json() == {"found": [], "missing": {"ids": [], "skus": []}}
+
+    @pytest.mark.parametrize("path,field", [
+        ("/api/inventory/batch", "skus"),
+        ("/api/orders/batch", "ids"),
+    ])
+    def test_batch_size_limit(self, client, path, field):
+        """Test that oversized batches are rejected."""
+        response = client.post(path, json={field: [str(n) for n in range(5001)]})
+        assert response.status_code == 422
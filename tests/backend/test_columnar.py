@@ -0,0 +1,96 @@
+"""
+Tests for the columnar NumPy order store and the analytics built on it.
+"""
+import pytest
+
+from columnar import OrderColumns
+from mock_data import repository
+
+orders = repository.order_store.records
+
+
+class TestOrderColumns:
+    """Test suite for OrderColumns."""
+
+    def test_mask_matches_filtered_orders(self, client):
+        """Test that a vectorized mask selects the same orders as the index."""
+        from main import _filter_criteria
+
+        expected = client.get("/api/orders?warehouse=Tokyo&category=sensors&month=Q2-2025").json()
+        selected = repository.order_mask(*_filter_criteria("Tokyo", "sensors", None, "Q2-2025"))
+        assert [orders[i]["order_number"] for i in selected.nonzero()[0]] == [o["order_number"] for o in expected]
+
+    def test_appended_orders_are_visible(self):
+        """Test that buffered orders are folded into the columns on read."""
+        columns = OrderColumns([
+            {"warehouse": "A", "category": "Gears", "status": "Delivered", "order_date": "2026-01-02T00:00:00",
+             "total_value": 10.0, "items": [{"sku": "G-1", "quantity": 4, "unit_price": 2.5}]},
+        ])
+        columns.add_order(
+            {"warehouse": "B", "category": "gears", "status": "Processing", "order_date": "2026-02-03T00:00:00",
+             "total_value": 5.5, "items": [{"sku": "G-1", "quantity": 1, "unit_price": 5.5},
+                                           {"sku": "G-2", "quantity": 2, "unit_price": 0.0}]},
+        )
+
+        selected = columns.mask(category=["gears"])
+        assert columns.order_totals(selected) == (2, 1, 15.5)
+        assert columns.sku_quantities(selected) == {"G-1": 5, "G-2": 2}
+        assert columns.period_buckets(columns.mask(warehouse=["B"])) == {202602: [1, 0, 5.5, 0.0]}
+
+    def test_failed_flush_keeps_columns_aligned(self):
+        """Test that a batch failing part way changes no column and unparseable dates read as NaT."""
+        columns = OrderColumns(orders[:3])
+        columns.add_order({"order_date": "2026-01-02T00:00:00", "expected_delivery": "tbd", "total_value": 1.0,
+                           "items": [{"sku": "G-1", "quantity": "lots"}]})
+        with pytest.raises(ValueError):
+            columns.mask()
+        assert {len(getattr(columns, name)) for name in ("total_value", "period", "expected_delivery")} == {3}
+        assert len(columns.item_offsets) == 4
+
+        columns._pending[0]["items"] = []
+        assert columns.mask().sum() == 4
+        assert str(columns.expected_delivery[3]) == "NaT"
+
+    def test_order_dates_are_not_truncated(self):
+        """Test that free-form date filters see the whole timestamp, fractions and offsets included."""
+        columns = OrderColumns([{"order_date": "2026-01-02T00:00:00.250000+09:00", "total_value": 1.0}])
+        assert columns.mask(date_contains="+09:00").sum() == 1
+
+    def test_period_revenue_is_correctly_rounded(self):
+        """Test that filtered per-period revenue is the math.fsum of the selected values."""
+        import math
+
+        values = [0.1] * 10 + [1e16, 1.0, -1e16]
+        columns = OrderColumns([{"order_date": "2026-01-02T00:00:00", "total_value": v} for v in values])
+        assert columns.period_buckets(columns.mask())[202601][2] == math.fsum(values)
+
+    def test_unknown_filter_value_matches_nothing(self):
+        """Test that filter values never seen select no orders."""
+        columns = OrderColumns(orders)
+        assert not columns.mask(warehouse=["Atlantis"]).any()
+
+
+class TestFilteredReports:
+    """Test suite for filtered report endpoints."""
+
+    @pytest.mark.parametrize("query", ["warehouse=London", "category=Sensors&status=Delivered"])
+    def test_filtered_monthly_trends(self, client, query):
+        """Test that filtered trends agree with the filtered orders."""
+        rows = client.get(f"/api/reports/monthly-trends?{query}").json()
+        filtered = client.get(f"/api/orders?{query}").json()
+
+        assert sum(row["order_count"] for row in rows) == len(filtered)
+        for row in rows:
+            month_orders = [o for o in filtered if o["order_date"].startswith(row["month"])]
+            assert row["order_count"] == len(month_orders)
+            assert row["delivered_count"] == sum(o["status"] == "Delivered" for o in month_orders)
+            assert abs(row["revenue"] - sum(o["total_value"] for o in month_orders)) < 0.01
+
+    def test_filtered_quarterly_reports(self, client):
+        """Test that filtered quarters add up to the filtered orders."""
+        rows = client.get("/api/reports/quarterly?warehouse=Tokyo").json()
+        assert sum(row["total_orders"] for row in rows) == len(client.get("/api/orders?warehouse=Tokyo").json())
+
+    def test_all_filter_uses_rollup(self, client):
+        """Test that 'all' filters return the unfiltered report."""
+        assert client.get("/api/reports/quarterly?warehouse=all").json() == client.get("/api/reports/quarterly").json()
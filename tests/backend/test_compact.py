@@ -0,0 +1,61 @@
+"""
+Tests for compact record storage.
+"""
+import pytest
+
+from compact import CompactRecords
+
+ORDERS = [
+    {"id": "1", "customer": "Acme", "items": [{"sku": "A-1", "name": "Gear", "quantity": 2, "unit_price": 1.5},
+                                             {"sku": "B-2", "name": "Valve", "quantity": 1, "unit_price": 9.0}],
+     "status": "Delivered", "total_value": 12.0},
+    {"id": "2", "customer": "Acme", "items": [], "status": "Delivered", "total_value": 0},
+    # Line items of another shape are kept as they are
+    {"id": "3", "customer": "Zenith", "items": [{"sku": "A-1", "quantity": 2, "unit_price": 3}],
+     "status": "Processing", "total_value": 6.0, "actual_delivery": None},
+    {"status": "Shipped", "id": "4", "items": None},
+]
+
+
+class TestCompactRecords:
+    """Test suite for CompactRecords."""
+
+    def test_records_round_trip(self):
+        """Test that records read back equal to what was stored, key order and value types included."""
+        records = CompactRecords(ORDERS, ("customer", "status"), "items")
+
+        assert len(records) == 4
+        assert list(records) == ORDERS
+        assert [list(record) for record in records] == [list(order) for order in ORDERS]
+        assert type(records[0]["items"][0]["quantity"]) is int
+        assert type(records[2]["items"][0]["unit_price"]) is int
+        assert records[-1] == ORDERS[-1] and records[1:3] == ORDERS[1:3]
+
+    def test_packed_storage(self):
+        """Test that regular line items go to the item arrays and repeated strings are shared."""
+        records = CompactRecords([dict(order, customer="".join(["Ac", "me"])) for order in ORDERS[:2]],
+                                 ("customer",), "items")
+
+        assert list(records.item_offsets) == [0, 2, 2]
+        assert list(records.item_quantity) == [2, 1]
+        assert records[0]["customer"] is records[1]["customer"]
+        assert records[0]["items"] is not records[0]["items"]
+
+    def test_append(self):
+        """Test that appended records are stored the same way and visible to reads."""
+        records = CompactRecords([], ("customer", "status"), "items")
+        for order in ORDERS:
+            records.append(order)
+
+        assert list(records) == ORDERS
+        assert records[0] is not ORDERS[0]
+
+    def test_replace(self):
+        """Test that a record can be replaced by one with the same keys, and only by such a record."""
+        records = CompactRecords(ORDERS, ("customer", "status"), "items")
+        records[0] = dict(ORDERS[0], status="Shipped")
+
+        assert records[0] == dict(ORDERS[0], status="Shipped")
+        assert list(records)[1:] == ORDERS[1:]
+        with pytest.raises(ValueError):
+            records[1] = {"id": "2"}
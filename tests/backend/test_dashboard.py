@@ -171,3 +171,150 @@ class TestDashboardEndpoints:
 
         # Allow small floating point differences
         assert abs(dashboard_data["total_inventory_value"] - expected_value) < 0.01
+
+
+class TestDashboardCube:
+    """Test suite for the precomputed dashboard aggregates."""
+
+    @pytest.mark.parametrize("query", [
+        "",
+        "?warehouse=Tokyo",
+        "?category=sensors&status=Delivered",
+        "?warehouse=London&month=Q2-2025",
+        "?status=backordered&month=2025-11",
+        "?month=2025",
+    ])
+    def test_cube_matches_scan(self, client, query):
+        """Test that cube-backed summaries match a scan of the filtered records."""
+        import math
+        from main import _filter_criteria, _inventory_criteria
+        from mock_data import repository
+
+        params = dict(part.split("=") for part in query.lstrip("?").split("&") if part)
+        inventory = repository.query('inventory', _inventory_criteria(params.get("warehouse"), params.get("category")))
+        orders = repository.query('orders', *_filter_criteria(
+            params.get("warehouse"), params.get("category"), params.get("status"), params.get("month")
+        ))
+
+        data = client.get(f"/api/dashboard/summary{query}").json()
+        assert data["total_inventory_value"] == round(
+            math.fsum(item["quantity_on_hand"] * item["unit_cost"] for item in inventory), 2)
+        assert data["low_stock_items"] == len(
+            [item for item in inventory if item["quantity_on_hand"] <= item["reorder_point"]])
+        assert data["pending_orders"] == len(
+            [order for order in orders if order["status"] in ("Processing", "Backordered")])
+        assert data["total_orders_value"] == math.fsum(order["total_value"] for order in orders)
+
+    @pytest.mark.parametrize("query", ["", "?warehouse=Tokyo", "?category=sensors&status=Delivered",
+                                       "?warehouse=London&month=Q2-2025"])
+    def test_summary_matches_baseline(self, client, query):
+        """Test that on the shipped data the summary is identical to the original list-scanning computation."""
+        from main import _filter_criteria, _inventory_criteria
+        from mock_data import repository
+
+        params = dict(part.split("=") for part in query.lstrip("?").split("&") if part)
+        inventory = repository.query('inventory', _inventory_criteria(params.get("warehouse"), params.get("category")))
+        orders = repository.query('orders', *_filter_criteria(
+            params.get("warehouse"), params.get("category"), params.get("status"), params.get("month")
+        ))
+
+        data = client.get(f"/api/dashboard/summary{query}").json()
+        # Left-to-right sums, exactly as the endpoint computed them before the cube
+        assert data["total_inventory_value"] == round(sum(item["quantity_on_hand"] * item["unit_cost"]
+                                                          for item in inventory), 2)
+        assert data["total_orders_value"] == sum(order["total_value"] for order in orders)
+
+    def test_cube_tracks_added_and_removed_records(self):
+        """Test that cells update as records are added and removed."""
+        from aggregates import DashboardCube
+
+        order = {
+            "warehouse": "Tokyo", "category": "Sensors", "status": "Processing",
+            "order_date": "2026-01-05T09:00:00", "total_value": 100.1
+        }
+        item = {
+            "warehouse": "Tokyo", "category": "Sensors",
+            "quantity_on_hand": 5, "reorder_point": 10, "unit_cost": 2.5
+        }
+        cube = DashboardCube()
+        cube.add_order(order)
+        cube.add_inventory_item(item)
+
+        assert cube.order_totals(month={202601}) == (1, 1, 100.1)
+        assert cube.order_totals(status={"delivered"}) == (0, 0, 0.0)
+        assert cube.inventory_totals(category={"sensors"}) == (12.5, 1)
+
+        cube.remove_order(order)
+        cube.remove_inventory_item(item)
+        assert cube.order_cells == {}
+        assert cube.inventory_cells == {}
+
+    def test_cube_readers_never_see_half_an_update(self):
+        """Test that totals read during updates always count the moved item exactly once."""
+        import sys
+        import threading
+        from aggregates import DashboardCube
+
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        items = [{"warehouse": warehouse, "category": "Sensors", "quantity_on_hand": 5,
+                  "reorder_point": 10, "unit_cost": 2.5} for warehouse in ("Tokyo", "London")]
+        cube = DashboardCube(items[:1])
+        seen, errors, stop = set(), [], threading.Event()
+
+        def read():
+            while not stop.is_set():
+                try:
+                    seen.add(cube.inventory_totals())
+                except RuntimeError as error:
+                    errors.append(error)
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        try:
+            for step in range(20000):
+                cube.update_inventory_item(items[step % 2], items[(step + 1) % 2])
+        finally:
+            stop.set()
+            reader.join()
+            sys.setswitchinterval(interval)
+
+        assert errors == [] and seen == {(12.5, 1)}
+
+
+class TestDashboardBundle:
+    """Test suite for the composite dashboard endpoint."""
+
+    @pytest.mark.parametrize("query", [
+        "",
+        "warehouse=Tokyo&category=Sensors",
+        "status=Delivered&month=2025-03",
+        "warehouse=London&month=Q2-2025",
+        "month=2025-0",
+    ])
+    def test_sections_match_individual_endpoints(self, client, query):
+        """Test that every section equals the response of its own endpoint for the same filters."""
+        response = client.get(f"/api/dashboard/bundle?{query}")
+        assert response.status_code == 200
+        bundle = response.json()
+
+        trend_query = "&".join(part for part in query.split("&") if part and not part.startswith("month="))
+        assert list(bundle) == ["summary", "orders", "inventory", "backlog", "demand", "monthly_trends"]
+        assert bundle["summary"] == client.get(f"/api/dashboard/summary?{query}").json()
+        assert bundle["orders"] == client.get(f"/api/orders?{query}").json()
+        assert bundle["inventory"] == client.get(f"/api/inventory?{query}").json()
+        assert bundle["backlog"] == client.get("/api/backlog").json()
+        assert bundle["demand"] == client.get("/api/demand").json()
+        assert bundle["monthly_trends"] == client.get(f"/api/reports/monthly-trends?{trend_query}").json()
+
+    def test_include_selects_sections(self, client):
+        """Test that include= returns only the named sections, in the standard order."""
+        response = client.get("/api/dashboard/bundle?include=monthly_trends,%20summary&warehouse=Tokyo")
+        assert response.status_code == 200
+        assert list(response.json()) == ["summary", "monthly_trends"]
+
+    def test_unknown_section(self, client):
+        """Test that unknown section names are rejected."""
+        response = client.get("/api/dashboard/bundle?include=summary,charts")
+        assert response.status_code == 400
+        assert "charts" in response.json()["detail"]
@@ -0,0 +1,85 @@
+"""
+Tests for the indexed in-memory data store.
+"""
+import pytest
+
+from data_store import IndexedCollection, field_key, lower_field_key, month_keys, order_month_key
+from main import _filter_criteria
+from mock_data import repository
+
+orders = repository.order_store.records
+order_store = repository.order_store
+
+
+def scan_month(items, month):
+    """Reference month/quarter filter using a full list scan."""
+    if not month:
+        return items
+    periods = month_keys(month)
+    if periods is not None:
+        return [item for item in items if order_month_key(item) in periods]
+    if month.startswith('Q'):
+        return items
+    return [item for item in items if month in item.get('order_date', '')]
+
+
+def scan_filters(items, warehouse=None, category=None, status=None, month=None):
+    """Reference implementation using full list scans."""
+    filtered = [item for item in items if not warehouse or item.get('warehouse') == warehouse]
+    filtered = [item for item in filtered if not category or item.get('category', '').lower() == category.lower()]
+    filtered = [item for item in filtered if not status or item.get('status', '').lower() == status.lower()]
+    return scan_month(filtered, month)
+
+
+class TestIndexedCollection:
+    """Test suite for IndexedCollection."""
+
+    @pytest.mark.parametrize("warehouse,category,status,month", [
+        ("London", None, None, None),
+        (None, "SENSORS", None, None),
+        (None, None, "delivered", "2025-03"),
+        ("Tokyo", "Sensors", "Delivered", "Q2-2025"),
+        (None, None, None, "Q9-2025"),
+        (None, None, None, "2025"),
+        ("Nowhere", None, None, None),
+    ])
+    def test_query_matches_scan(self, warehouse, category, status, month):
+        """Test that indexed filtering returns the same records, in order, as a scan."""
+        expected = scan_filters(orders, warehouse, category, status, month)
+        assert repository.query('orders', *_filter_criteria(warehouse, category, status, month)) == expected
+
+    def test_get_by_id(self):
+        """Test by-id lookup returns the matching record."""
+        assert order_store.get(orders[-1]["id"]) == orders[-1]
+        assert order_store.get("missing") is None
+
+    def test_add_updates_indexes(self):
+        """Test that added records are visible to lookups and queries."""
+        collection = IndexedCollection([], {
+            'warehouse': field_key('warehouse'),
+            'category': lower_field_key('category'),
+            'month': order_month_key,
+        })
+        collection.add({"id": "1", "warehouse": "A", "category": "Gears", "order_date": "2026-02-01T00:00:00"})
+        collection.add({"id": "2", "warehouse": "B", "category": "gears", "order_date": "2026-03-01T00:00:00"})
+
+        assert collection.get("2")["warehouse"] == "B"
+        assert [r["id"] for r in collection.query(category=["gears"])] == ["1", "2"]
+        assert [r["id"] for r in collection.query(category=["gears"], month=[202603])] == ["2"]
+
+    def test_readers_never_see_a_half_indexed_record(self):
+        """Test that a query running while a record is indexed never finds it in one index and not another."""
+        seen = []
+
+        def category_key(record):
+            # Runs in the middle of indexing, the moment a concurrent reader could get in
+            if record["warehouse"] == "A":
+                seen.append(collection.query(warehouse=["A"], category=["gears"]))
+            return record["category"].lower()
+
+        collection = IndexedCollection([], {'warehouse': field_key('warehouse'), 'category': category_key})
+        collection.extend([{"id": str(i), "warehouse": "B", "category": "Gears"} for i in range(2)])
+        collection.add({"id": "2", "warehouse": "A", "category": "Gears"})
+        collection.add({"id": "3", "warehouse": "A", "category": "Gears"})
+
+        assert [[r["id"] for r in result] for result in seen] == [[], ["2"]]
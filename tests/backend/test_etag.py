@@ -0,0 +1,64 @@
+"""
+Tests for ETag / If-None-Match handling on read endpoints.
+"""
+import pytest
+
+
+class TestConditionalGet:
+    """Test suite for conditional GET support."""
+
+    @pytest.mark.parametrize("path", [
+        "/api/inventory?warehouse=London",
+        "/api/orders?status=Delivered",
+        "/api/dashboard/summary",
+        "/api/backlog",
+        "/api/demand",
+        "/api/spending/monthly",
+        "/api/reports/quarterly",
+    ])
+    def test_matching_etag_returns_304(self, client, path):
+        """Test that a request carrying the current ETag gets an empty 304."""
+        etag = client.get(path).headers["ETag"]
+
+        response = client.get(path, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+
+    def test_etag_is_strong_and_query_specific(self, client):
+        """Test that different queries produce different strong ETags."""
+        london = client.get("/api/orders?warehouse=London").headers["ETag"]
+        tokyo = client.get("/api/orders?warehouse=Tokyo").headers["ETag"]
+
+        assert not london.startswith("W/")
+        assert london != tokyo
+
+    def test_stale_etag_returns_full_response(self, client):
+        """Test that a dataset change invalidates previously issued ETags."""
+        from mock_data import repository
+
+        etag = client.get("/api/inventory").headers["ETag"]
+        repository.version.bump()
+
+        response = client.get("/api/inventory", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+    def test_handler_skipped_on_match(self, client, monkeypatch):
+        """Test that a 304 is answered without running the handler."""
+        import main
+
+        etag = client.get("/api/backlog").headers["ETag"]
+
+        def fail(*args, **kwargs):
+            raise AssertionError("handler should not run")
+
+        monkeypatch.setattr(main.repository, "purchase_order_backlog_ids", fail)
+        response = client.get("/api/backlog", headers={"If-None-Match": f'W/{etag}, "other"'})
+        assert response.status_code == 304
+
+    def test_errors_are_not_tagged(self, client):
+        """Test that error responses carry no ETag."""
+        response = client.get("/api/orders/nonexistent-id-999")
+        assert response.status_code == 404
+        assert "ETag" not in response.headers
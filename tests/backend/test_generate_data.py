@@ -0,0 +1,24 @@
+"""
+Tests for the seeded dataset generator.
+"""
+import json
+
+from generate_data import generate
+
+
+class TestGenerateData:
+    """Test suite for generate()."""
+
+    def test_multi_year_dataset_is_consistent(self, tmp_path):
+        """Test that backlog items name real orders and spending keeps the years apart."""
+        generate(str(tmp_path), orders=48, backlog_items=20, transactions=96, years=2)
+        load = lambda name: json.loads((tmp_path / name).read_text())
+
+        order_numbers = {order["order_number"] for order in load("orders.json")}
+        assert {item["order_id"] for item in load("backlog_items.json")} <= order_numbers
+        monthly = load("spending.json")["monthly_spending"]
+        assert [row["period"] for row in monthly] == [f"{year}-{month:02d}" for year in (2025, 2026)
+                                                      for month in range(1, 13)]
+        procurement = sum(t["amount"] for t in load("transactions.json")
+                          if t["type"] == "Purchase" and t["date"].startswith("2026-03"))
+        assert next(row for row in monthly if row["period"] == "2026-03")["procurement"] == round(procurement, 2)
@@ -0,0 +1,247 @@
+"""
+Tests for streaming bulk import of orders and transactions.
+"""
+import asyncio
+import csv
+import io
+import json
+
+import pytest
+
+import ingest
+from ingest import csv_rows, ndjson_rows
+
+NDJSON = {"content-type": "application/x-ndjson"}
+CSV = {"content-type": "text/csv; charset=utf-8"}
+
+TRANSACTION_FIELDS = ["id", "date", "description", "category", "warehouse", "amount", "vendor", "type"]
+
+
+@pytest.fixture
+def repository(monkeypatch):
+    """A memory repository of the endpoints' own, so imported records do not leak into other tests."""
+    import main
+    import mock_data
+    from repository import InMemoryRepository
+
+    repository = InMemoryRepository(mock_data.load_dataset)
+    monkeypatch.setattr(main, "repository", repository)
+    main.response_cache.clear()
+    yield repository
+    main.response_cache.clear()
+
+
+def order(number, **fields):
+    return {"id": f"IMP-{number}", "order_number": f"ORD-IMP-{number:04d}", "customer": "Importer Ltd",
+            "items": [{"sku": "PCB-001", "name": "Single Layer PCB Assembly", "quantity": 2, "unit_price": 10.0}],
+            "status": "Processing", "order_date": "2025-11-03T09:00:00", "expected_delivery": "2025-11-20T09:00:00",
+            "total_value": 20.0, "warehouse": "Tokyo", "category": "Circuit Boards", **fields}
+
+
+def chunked(body: str, size: int = 7):
+    """The body split into small chunks, so lines and records straddle chunk boundaries."""
+    data = body.encode()
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def parse(rows_of, body: bytes, *args):
+    async def chunks():
+        for chunk in chunked(body.decode(), 5):
+            yield chunk
+
+    async def collect():
+        return [row async for row in rows_of(chunks(), *args)]
+    return asyncio.run(collect())
+
+
+class TestParsing:
+    """Test suite for reading rows from chunked bodies."""
+
+    def test_ndjson_rows(self):
+        """Test that lines are numbered, blank lines skipped and bad JSON reported without stopping."""
+        rows = parse(ndjson_rows, b'{"a": 1}\r\n\n[2]\n{oops\n{"b": "\xc3\xa9"}')
+        assert [(number, row) for number, row, _ in rows] == [(1, {"a": 1}), (3, [2]), (4, None), (5, {"b": "é"})]
+        assert rows[2][2].startswith("Invalid JSON")
+
+    def test_csv_rows(self):
+        """Test that quoted values may hold commas and newlines, blanks are left out and JSON columns decoded."""
+        body = ('\ufeffid,note,items\n'
+                '1,"a, b",[]\n'
+                '2,"line one\nline two",\n'
+                '3,x\n'
+                '4,y,{bad\n').encode()
+        rows = parse(csv_rows, body, ("items",))
+        assert rows[:2] == [(2, {"id": "1", "note": "a, b", "items": []}, None),
+                            (3, {"id": "2", "note": "line one\nline two"}, None)]
+        assert [(number, row) for number, row, _ in rows[2:]] == [(5, None), (6, None)]
+        assert rows[2][2] == "Expected 3 fields, found 2" and rows[3][2].startswith("Invalid JSON in items")
+
+
+class TestOrderImport:
+    """Test suite for POST /api/orders/import."""
+
+    def test_ndjson_import(self, client, repository):
+        """Test that valid rows are stored and show up in lookups, search, dashboards and reports."""
+        summary = client.get("/api/dashboard/summary").json()
+        orders = [order(i) for i in range(3)]
+        body = "".join(json.dumps(row) + "\n" for row in orders)
+
+        response = client.post("/api/orders/import", content=chunked(body), headers=NDJSON)
+        assert response.status_code == 200
+        assert response.json() == {"imported": 3, "failed": 0, "errors": [], "errors_truncated": False,
+                                   "aborted": None}
+        assert client.get("/api/orders/IMP-1").json() == dict(orders[1], actual_delivery=None)
+        updated = client.get("/api/dashboard/summary").json()
+        assert updated["pending_orders"] == summary["pending_orders"] + 3
+        assert updated["total_orders_value"] == pytest.approx(summary["total_orders_value"] + 60.0)
+        trends = client.get("/api/reports/monthly-trends?warehouse=Tokyo").json()
+        assert any(row["month"] == "2025-11" and row["revenue"] >= 60.0 for row in trends)
+        assert client.get("/api/search?q=ORD-IMP-0002").json()[0]["id"] == "IMP-2"
+
+    def test_row_errors(self, client, repository):
+        """Test that invalid, duplicate and unparsable rows are reported by row while the rest are imported."""
+        rows = [json.dumps(order(1)), json.dumps(order(2, total_value="lots")), "{", json.dumps(order(3, id="1")),
+                json.dumps(order(4, id="IMP-1")), json.dumps({"id": "IMP-5"}), json.dumps(order(6))]
+
+        report = client.post("/api/orders/import", content="\n".join(rows), headers=NDJSON).json()
+        assert (report["imported"], report["failed"]) == (2, 5)
+        errors = {(error["row"], error["field"]) for error in report["errors"]}
+        assert {(2, "total_value"), (3, None), (4, "id"), (5, "id"), (6, "customer")} <= errors
+        assert client.get("/api/orders/IMP-6").status_code == 200
+        assert client.get("/api/orders/IMP-2").status_code == 404
+
+    def test_unreadable_dates(self, client, repository):
+        """Test that rows with dates the reports cannot read are rejected by row and the reports keep working."""
+        rows = [order(1, order_date="tbd"), order(2, expected_delivery="2025-02-30"),
+                order(3, actual_delivery="next week"), order(4, order_date="2025-11-03")]
+
+        report = client.post("/api/orders/import", content="\n".join(map(json.dumps, rows)), headers=NDJSON).json()
+        assert report["imported"] == 1
+        assert [(error["row"], error["field"]) for error in report["errors"]] == [
+            (1, "order_date"), (2, "expected_delivery"), (3, "actual_delivery")]
+        assert "YYYY-MM-DD" in report["errors"][0]["message"]
+        assert client.get("/api/reports/monthly-trends").status_code == 200
+
+    def test_csv_import(self, client, repository):
+        """Test that a CSV body with line items as a JSON column imports like the same rows as NDJSON."""
+        imported = order(7, actual_delivery=None)
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(list(imported))
+        writer.writerow([json.dumps(value) if key == "items" else "" if value is None else value
+                         for key, value in imported.items()])
+
+        report = client.post("/api/orders/import", content=chunked(out.getvalue()), headers=CSV).json()
+        assert report["imported"] == 1
+        assert client.get("/api/orders/IMP-7").json() == imported
+
+    def test_batches(self, client, repository, monkeypatch):
+        """Test that rows are stored, and listeners notified, once per batch rather than once per row."""
+        monkeypatch.setattr(ingest, "IMPORT_BATCH_SIZE", 4)
+        batches = []
+        repository.order_store.subscribe_batches(lambda orders: batches.append(len(orders)))
+        body = "\n".join(json.dumps(order(i)) for i in range(10))
+
+        assert client.post("/api/orders/import", content=body, headers=NDJSON).json()["imported"] == 10
+        assert batches == [4, 4, 2]
+
+    def test_unreadable_bodies(self, client, repository, monkeypatch):
+        """Test that other media types are refused and an overlong line stops the import after what was stored."""
+        assert client.post("/api/orders/import", content="{}", headers={"content-type": "text/plain"}).status_code == 415
+
+        monkeypatch.setattr(ingest, "IMPORT_BATCH_SIZE", 1)
+        monkeypatch.setattr(ingest, "MAX_LINE_BYTES", 1000)
+        body = json.dumps(order(1)) + "\n" + "x" * 2000
+        response = client.post("/api/orders/import", content=chunked(body, 500), headers=NDJSON)
+        assert response.status_code == 413
+        assert response.json()["imported"] == 1 and "longer than 1000 bytes" in response.json()["aborted"]
+
+    def test_sqlite_matches_memory(self, client, repository, monkeypatch, tmp_path):
+        """Test that importing into the SQLite backend gives the same records and totals."""
+        import main
+        from mock_data import load_datasets
+        from repository import SqliteRepository, build_sqlite_database
+
+        body = "\n".join(json.dumps(order(i, status="Delivered")) for i in range(5))
+        client.post("/api/orders/import", content=body, headers=NDJSON)
+        expected = [client.get(path).json() for path in ("/api/orders/IMP-3", "/api/dashboard/summary")]
+
+        path = str(tmp_path / "inventory.db")
+        build_sqlite_database(path, **load_datasets())
+        monkeypatch.setattr(main, "repository", SqliteRepository(path))
+        main.response_cache.clear()
+        assert client.post("/api/orders/import", content=body, headers=NDJSON).json()["imported"] == 5
+        assert [client.get(path).json() for path in ("/api/orders/IMP-3", "/api/dashboard/summary")] == expected
+
+    def test_imports_outlive_the_repository(self, client, monkeypatch, tmp_path):
+        """Test that imported rows are logged and appended again to a reloaded dataset, once."""
+        import main
+        import mock_data
+        from ingest import ImportLog
+        from repository import InMemoryRepository
+
+        logs = {name: ImportLog(str(tmp_path / f"{name}.imports")) for name in ("orders", "transactions")}
+        monkeypatch.setattr(main, "repository", InMemoryRepository(mock_data.load_dataset, None, logs))
+        main.response_cache.clear()
+        body = "\n".join(json.dumps(order(i)) for i in range(3))
+        assert client.post("/api/orders/import", content=body, headers=NDJSON).json()["imported"] == 3
+        with open(logs["orders"].path, "ab") as f:
+            f.write(b'[{"id": "IMP-9"')
+
+        reloaded = InMemoryRepository(mock_data.load_dataset, None, logs)
+        assert [reloaded.get("orders", f"IMP-{i}")["order_number"] for i in range(3)] == [
+            f"ORD-IMP-{i:04d}" for i in range(3)]
+        assert reloaded.get("orders", "IMP-9") is None
+        assert len(reloaded.order_store) == len(mock_data.load_dataset("orders")) + 3
+        # An edited data file that took the orders in does not get them twice
+        monkeypatch.setattr(reloaded, "load", lambda name: list(mock_data.load_dataset(name)) + [order(1)])
+        reloaded.__dict__.pop("order_store")
+        assert len(reloaded.order_store) == len(mock_data.load_dataset("orders")) + 3
+        main.response_cache.clear()
+
+    def test_imports_during_a_reload_are_taken_over(self, tmp_path):
+        """Test that a reloaded dataset takes in imports logged through the previous one, then and later."""
+        import mock_data
+        from ingest import ImportLog
+        from repository import InMemoryRepository
+
+        def repository():
+            logs = {name: ImportLog(str(tmp_path / f"{name}.imports")) for name in ("orders", "transactions")}
+            return InMemoryRepository(mock_data.load_dataset, None, logs)
+
+        current, reloaded = repository(), repository()
+        current.add_orders([order(0)])
+        reloaded.warm()
+        current.add_orders([order(1)])
+        published = []
+        reloaded.take_over(lambda: published.append(reloaded.get("orders", "IMP-1")))
+        assert published[0]["order_number"] == "ORD-IMP-0001"
+
+        current.add_orders([order(2)])
+        reloaded.add_orders([order(3)])
+        assert [reloaded.get("orders", f"IMP-{i}") is not None for i in range(4)] == [True] * 4
+        assert len(reloaded.order_store) == len(mock_data.load_dataset("orders")) + 4
+
+
+class TestTransactionImport:
+    """Test suite for POST /api/spending/transactions/import."""
+
+    def test_csv_import(self, client, repository):
+        """Test that imported transactions are listed and counted in the spending rollups."""
+        before = client.get("/api/spending/breakdown?by=vendor").json()
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(TRANSACTION_FIELDS)
+        writer.writerow(["TXN-IMP-1", "2025-09-15", "Bulk\n\"valves\"", "Components", "A", "250.5", "New Vendor",
+                         "Purchase"])
+        writer.writerow(["TXN-IMP-2", "2025-09-15", "Missing amount", "Components", "A", "", "New Vendor",
+                         "Purchase"])
+
+        report = client.post("/api/spending/transactions/import", content=out.getvalue(), headers=CSV).json()
+        assert (report["imported"], report["failed"]) == (1, 1)
+        assert report["errors"] == [{"row": 4, "field": "amount", "message": "Field required"}]
+        assert client.get("/api/spending/transactions").json()[-1]["description"] == 'Bulk\n"valves"'
+        after = client.get("/api/spending/breakdown?by=vendor").json()
+        assert after != before
+        assert json.dumps(after).count("New Vendor") == 1
@@ -0,0 +1,90 @@
+"""
+Tests for request metrics and the /metrics endpoint.
+"""
+from metrics import Histogram, Metrics
+
+
+def samples(client):
+    """Scrape /metrics into a dict of sample line names (with labels) to values."""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    return {
+        name: float(value)
+        for name, value in (line.rsplit(" ", 1) for line in response.text.splitlines() if not line.startswith("#"))
+    }
+
+
+class TestHistogram:
+    """Test suite for histogram recording and rendering."""
+
+    def test_buckets_are_cumulative(self):
+        """Test that values land in the first bucket bounding them and render cumulatively."""
+        histogram = Histogram((1, 10))
+        for value in (0.5, 1, 5, 50):
+            histogram.observe(value)
+
+        assert list(histogram.lines("h", route="/x")) == [
+            'h_bucket{route="/x",le="1.0"} 2',
+            'h_bucket{route="/x",le="10.0"} 3',
+            'h_bucket{route="/x",le="+Inf"} 4',
+            'h_sum{route="/x"} 56.5',
+            'h_count{route="/x"} 4',
+        ]
+
+    def test_filter_selectivity(self):
+        """Test that filters record their match count and the matched share of the collection."""
+        metrics = Metrics()
+        metrics.observe_filter("orders", "index", 25, 100)
+        text = metrics.render()
+
+        assert 'inventory_filter_results_bucket{collection="orders",filter="index",le="100.0"} 1' in text
+        assert 'inventory_filter_selectivity_bucket{collection="orders",filter="index",le="0.1"} 0' in text
+        assert 'inventory_filter_selectivity_bucket{collection="orders",filter="index",le="0.25"} 1' in text
+
+
+class TestMetricsEndpoint:
+    """Test suite for the middleware and /metrics."""
+
+    def test_requests_are_labelled_by_route_template(self, client):
+        """Test that requests count under their route template, not the raw path."""
+        key = 'inventory_http_requests_total{method="GET",route="/api/orders/{order_id}",status="200"}'
+        missing = 'inventory_http_requests_total{method="GET",route="/api/orders/{order_id}",status="404"}'
+        before = samples(client)
+
+        client.get("/api/orders/1")
+        client.get("/api/orders/2")
+        client.get("/api/orders/no-such-order")
+        after = samples(client)
+
+        assert after[key] - before.get(key, 0) == 2
+        assert after[missing] - before.get(missing, 0) == 1
+        assert not any("no-such-order" in name for name in after)
+        duration = 'inventory_http_request_duration_seconds_count{method="GET",route="/api/orders/{order_id}"}'
+        assert after[duration] - before.get(duration, 0) == 3
+
+    def test_response_sizes(self, client):
+        """Test that response size histograms add up the bytes sent."""
+        key = 'inventory_http_response_size_bytes_sum{method="GET",route="/api/inventory/{item_id}"}'
+        before = samples(client)
+        body = client.get("/api/inventory/1").content
+        assert samples(client)[key] - before.get(key, 0) == len(body)
+
+    def test_filters_and_caches(self, client):
+        """Test that filtered queries, cache lookups and 304s show up in the scrape."""
+        import main
+
+        main.response_cache.clear()
+        before = samples(client)
+        client.get("/api/orders?status=delivered&include_total=true&limit=5")
+        first = client.get("/api/inventory")
+        client.get("/api/inventory")
+        client.get("/api/inventory", headers={"If-None-Match": first.headers["ETag"]})
+        after = samples(client)
+
+        count = 'inventory_filter_results_count{collection="orders",filter="index"}'
+        assert after[count] - before.get(count, 0) == 1
+        hits = 'inventory_response_cache_requests_total{result="hit"}'
+        assert after[hits] - before[hits] == 1
+        assert after["inventory_not_modified_total"] - before["inventory_not_modified_total"] == 1
+        assert 0 < after["inventory_response_cache_hit_ratio"] <= 1
@@ -0,0 +1,88 @@
+"""
+Tests for keyset pagination and field projection on list endpoints.
+"""
+import pytest
+
+
+def fetch_all_pages(client, path, limit):
+    """Follow X-Next-Cursor until the result set is exhausted."""
+    separator = "&" if "?" in path else "?"
+    records, cursor = [], None
+    while True:
+        url = f"{path}{separator}limit={limit}" + (f"&after={cursor}" if cursor else "")
+        response = client.get(url)
+        assert response.status_code == 200
+        records.extend(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return records
+
+
+class TestPagination:
+    """Test suite for paginated list endpoints."""
+
+    @pytest.mark.parametrize("path", [
+        "/api/orders",
+        "/api/orders?warehouse=Tokyo&status=Delivered",
+        "/api/orders?month=Q2-2025",
+        "/api/inventory",
+        "/api/inventory?category=Sensors",
+    ])
+    def test_pages_cover_full_result(self, client, path):
+        """Test that walking every page returns the unpaginated result in order."""
+        expected = client.get(path).json()
+        assert fetch_all_pages(client, path, limit=7) == expected
+
+    def test_page_size_and_cursor(self, client):
+        """Test that a page honours the limit and resumes after its last record."""
+        response = client.get("/api/orders?limit=10")
+        assert len(response.json()) == 10
+        assert response.headers["X-Next-Cursor"] == "9"
+
+        next_page = client.get("/api/orders?limit=10&after=9").json()
+        assert next_page == client.get("/api/orders").json()[10:20]
+
+    def test_cursor_crosses_duplicated_ids(self, client):
+        """Test that pages stay in order across records that share an id."""
+        all_orders = client.get("/api/orders").json()
+        ids = [order["id"] for order in all_orders]
+        duplicated = next(i for i, order_id in enumerate(ids) if ids.count(order_id) > 1 and ids.index(order_id) < i)
+
+        # End a page on the later copy of a duplicated id and resume from it
+        response = client.get(f"/api/orders?limit={duplicated + 1}")
+        assert response.json()[-1]["id"] == ids[duplicated]
+
+        cursor = response.headers["X-Next-Cursor"]
+        assert client.get(f"/api/orders?limit=5&after={cursor}").json() == all_orders[duplicated + 1:duplicated + 6]
+
+    def test_include_total(self, client):
+        """Test that the total match count is reported on request."""
+        expected = len(client.get("/api/orders?category=Sensors&month=2025-03").json())
+
+        response = client.get("/api/orders?category=Sensors&month=2025-03&limit=1&include_total=true")
+        assert response.headers["X-Total-Count"] == str(expected)
+
+    def test_field_projection(self, client):
+        """Test that fields= returns only the requested fields."""
+        response = client.get("/api/orders?fields=id,order_number,status&limit=5")
+        assert response.status_code == 200
+
+        for order in response.json():
+            assert set(order) == {"id", "order_number", "status"}
+
+    def test_unknown_field_rejected(self, client):
+        """Test that unknown projection fields are rejected."""
+        response = client.get("/api/inventory?fields=id,colour")
+        assert response.status_code == 400
+        assert "colour" in response.json()["detail"]
+
+    def test_invalid_cursor_rejected(self, client):
+        """Test that an unknown cursor is rejected."""
+        for cursor in ("nonexistent-id-999", "-1", "99999999"):
+            response = client.get(f"/api/orders?limit=5&after={cursor}")
+            assert response.status_code == 400
+
+    def test_limit_bounds(self, client):
+        """Test that limit must be positive."""
+        response = client.get("/api/orders?limit=0")
+        assert response.status_code == 422
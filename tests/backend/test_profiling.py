@@ -0,0 +1,84 @@
+"""
+Tests for on-demand request profiling and /debug/profiles.
+"""
+import marshal
+
+import pytest
+from fastapi.testclient import TestClient
+
+from profiling import ProfileStore, ProfilingMiddleware
+
+TOKEN = "s3cret"
+ADMIN = {"X-Admin-Token": TOKEN}
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """Turn profiling on with a fresh ring buffer of two profiles."""
+    import main
+
+    store = ProfileStore(2)
+    monkeypatch.setattr(main, "PROFILING_TOKEN", TOKEN)
+    monkeypatch.setattr(main, "profile_store", store)
+    return store
+
+
+@pytest.fixture
+def profiled_client(store):
+    """A client for the app behind the profiling middleware, as installed when the token is set."""
+    import main
+
+    with TestClient(ProfilingMiddleware(main.app, token=TOKEN, store=store)) as test_client:
+        yield test_client
+
+
+class TestProfiling:
+    """Test suite for profiling requests and serving their profiles."""
+
+    def test_only_requested_and_authorized_requests_are_profiled(self, profiled_client, store):
+        """Test that a request needs both the profile header and the admin token to be profiled."""
+        assert "X-Profile-Id" not in profiled_client.get("/api/inventory").headers
+        assert "X-Profile-Id" not in profiled_client.get("/api/inventory", headers={"X-Profile": "1"}).headers
+        assert "X-Profile-Id" not in profiled_client.get(
+            "/api/inventory", headers={"X-Profile": "1", "X-Admin-Token": "wrong"}).headers
+        assert store.summaries() == []
+
+        response = profiled_client.get("/api/orders?status=delivered", headers={"X-Profile": "1", **ADMIN})
+        assert response.status_code == 200
+        [summary] = profiled_client.get("/debug/profiles", headers=ADMIN).json()
+        assert summary["id"] == int(response.headers["X-Profile-Id"])
+        assert (summary["method"], summary["path"], summary["query"], summary["status"]) == (
+            "GET", "/api/orders", "status=delivered", 200)
+
+    def test_report_and_download(self, profiled_client):
+        """Test that a profile is served as a pstats listing and as a loadable stats file."""
+        profile_id = profiled_client.get("/api/dashboard/summary",
+                                         headers={"X-Profile": "1", **ADMIN}).headers["X-Profile-Id"]
+
+        report = profiled_client.get(f"/debug/profiles/{profile_id}?sort=tottime&limit=5", headers=ADMIN)
+        assert report.status_code == 200
+        assert "function calls" in report.text
+
+        download = profiled_client.get(f"/debug/profiles/{profile_id}?format=pstats", headers=ADMIN)
+        assert download.headers["content-disposition"] == f'attachment; filename="profile-{profile_id}.pstats"'
+        assert any(function.endswith("get_dashboard_summary")
+                   for _, _, function in marshal.loads(download.content))
+
+    def test_ring_buffer_keeps_the_latest(self, profiled_client, store):
+        """Test that only the most recent profiles are kept, newest first."""
+        ids = [profiled_client.get("/api/inventory", headers={"X-Profile": "1", **ADMIN}).headers["X-Profile-Id"]
+               for _ in range(3)]
+
+        assert [summary["id"] for summary in store.summaries()] == [int(ids[2]), int(ids[1])]
+        assert profiled_client.get(f"/debug/profiles/{ids[0]}", headers=ADMIN).status_code == 404
+
+    def test_debug_endpoints_need_the_token(self, client, store):
+        """Test that the debug endpoints refuse a missing or wrong token, and vanish when profiling is off."""
+        import main
+
+        assert client.get("/debug/profiles").status_code == 403
+        assert client.get("/debug/profiles", headers={"X-Admin-Token": "wrong"}).status_code == 403
+        assert client.get("/debug/profiles", headers=ADMIN).json() == []
+
+        main.PROFILING_TOKEN = None
+        assert client.get("/debug/profiles", headers=ADMIN).status_code == 404
@@ -0,0 +1,167 @@
+"""
+Tests for hot reloading of the data files.
+"""
+import json
+import shutil
+import threading
+from pathlib import Path
+
+import pytest
+
+from reloader import DataReloader
+
+
+class StubRepository:
+    """Stands in for a repository in reloader unit tests."""
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.warmed = False
+
+    def warm(self):
+        self.warmed = True
+
+    def take_over(self, publish):
+        publish()
+
+
+class TestDataReloader:
+    """Test suite for DataReloader."""
+
+    def make_reloader(self, signature, load=None):
+        published = []
+        built = iter(range(1, 100))
+        reloader = DataReloader(load or (lambda: StubRepository(next(built))), published.append,
+                                lambda: signature[0], interval=0)
+        return reloader, published
+
+    def test_waits_for_files_to_settle(self):
+        """Test that a change is only reloaded once it is stable for one check."""
+        signature = ["v1"]
+        reloader, published = self.make_reloader(signature)
+
+        assert reloader.check() is False
+        signature[0] = "v2"
+        assert reloader.check() is False
+        assert published == []
+
+        assert reloader.check() is True
+        assert [repository.generation for repository in published] == [1]
+        assert published[0].warmed
+        assert reloader.check() is False
+
+    def test_stats_track_reloads(self):
+        """Test that reload counters and timings are recorded."""
+        reloader, _ = self.make_reloader(["v1"])
+        reloader.reload()
+
+        stats = reloader.stats.as_dict()
+        assert stats["generation"] == 1
+        assert stats["reloads"] == 1
+        assert stats["last_duration_seconds"] >= 0
+        assert stats["last_error"] is None
+
+    def test_failed_load_keeps_current_dataset(self):
+        """Test that a load error is counted and nothing is published."""
+        def load():
+            raise ValueError("bad data file")
+
+        reloader, published = self.make_reloader(["v1"], load)
+        assert reloader.reload() is False
+
+        assert published == []
+        assert reloader.stats.failures == 1
+        assert reloader.stats.generation == 0
+        assert "bad data file" in reloader.stats.last_error
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Serve the endpoints from a copy of the data files that tests may edit."""
+    import main
+    import mock_data
+
+    directory = tmp_path / "data"
+    shutil.copytree(Path(mock_data.BASE_DIR) / "data", directory,
+                    ignore=shutil.ignore_patterns(".*", "*.db*", "*.wal*", "*.imports"))
+    monkeypatch.setattr(mock_data, "DATA_DIR", str(directory))
+    monkeypatch.setattr(mock_data, "ADJUSTMENT_LOG_PATH", str(directory / "inventory.wal"))
+    monkeypatch.setattr(mock_data, "IMPORT_LOG_DIR", str(directory))
+    monkeypatch.setattr(mock_data, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    monkeypatch.setattr(main, "repository", mock_data.load_repository())
+    main.response_cache.clear()
+    yield directory
+    main.response_cache.clear()
+
+
+def write_inventory(data_dir, items):
+    path = data_dir / "inventory.json"
+    path.write_text(json.dumps(items))
+
+
+class TestHotReload:
+    """Test suite for reloading the data behind the running app."""
+
+    def make_reloader(self):
+        import main
+        import mock_data
+
+        return DataReloader(mock_data.load_repository, main._publish, mock_data.data_signature, interval=0)
+
+    def test_reload_publishes_new_data(self, client, data_dir):
+        """Test that edited data files are served after a reload."""
+        reloader = self.make_reloader()
+        inventory = client.get("/api/inventory").json()
+        etag = client.get("/api/inventory").headers["ETag"]
+
+        write_inventory(data_dir, inventory[:3])
+        assert reloader.reload()
+
+        response = client.get("/api/inventory", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json() == inventory[:3]
+        assert client.get("/api/dashboard/summary").json()["low_stock_items"] == sum(
+            item["quantity_on_hand"] <= item["reorder_point"] for item in inventory[:3])
+
+    def test_status_reports_generation(self, client, data_dir, monkeypatch):
+        """Test that the data status endpoint exposes reload statistics."""
+        import main
+
+        reloader = self.make_reloader()
+        monkeypatch.setattr(main, "data_reloader", reloader)
+        before = client.get("/api/data/status").json()
+
+        reloader.reload()
+        after = client.get("/api/data/status").json()
+
+        assert after["generation"] == before["generation"] + 1
+        assert after["dataset_version"] > before["dataset_version"]
+        assert after["last_duration_seconds"] is not None
+
+    def test_readers_never_see_partial_data(self, client, data_dir):
+        """Test that concurrent reads always see one complete dataset or the other."""
+        reloader = self.make_reloader()
+        inventory = client.get("/api/inventory").json()
+        sizes = {len(inventory), 3}
+        low_stock = {sum(item["quantity_on_hand"] <= item["reorder_point"] for item in items)
+                     for items in (inventory, inventory[:3])}
+        seen, stop = [], threading.Event()
+
+        def read():
+            while not stop.is_set():
+                summary = client.get("/api/dashboard/summary").json()
+                items = client.get("/api/inventory?fields=id").json()
+                seen.append((summary["low_stock_items"], len(items)))
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        try:
+            for items in (inventory[:3], inventory, inventory[:3]):
+                write_inventory(data_dir, items)
+                assert reloader.reload()
+        finally:
+            stop.set()
+            reader.join()
+
+        assert seen
+        assert all(low in low_stock and count in sizes for low, count in seen)
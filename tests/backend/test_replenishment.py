@@ -0,0 +1,104 @@
+"""
+Tests for reorder recommendations.
+"""
+import pytest
+
+from replenishment import ReplenishmentPlan
+
+
+def inventory_item(item_id, sku, warehouse, on_hand, reorder_point, unit_cost=2.0, category="Sensors"):
+    return {
+        "id": item_id, "sku": sku, "name": sku, "category": category, "warehouse": warehouse,
+        "quantity_on_hand": on_hand, "reorder_point": reorder_point, "unit_cost": unit_cost,
+    }
+
+
+@pytest.fixture
+def plan():
+    """Two warehouses stocking SKU-A, one stocking SKU-B, with demand, backlog and an open purchase order."""
+    return ReplenishmentPlan(
+        [
+            inventory_item("1", "SKU-A", "Tokyo", 100, 80),
+            inventory_item("2", "SKU-A", "London", 30, 80),
+            inventory_item("3", "SKU-B", "Tokyo", 500, 100, unit_cost=1.5, category="Actuators"),
+        ],
+        [
+            {"item_sku": "SKU-A", "forecasted_demand": 60},
+            {"item_sku": "SKU-B", "forecasted_demand": 450},
+            {"item_sku": "SKU-Z", "forecasted_demand": 999},
+        ],
+        [{"id": "b1", "item_sku": "SKU-A", "quantity_needed": 50, "quantity_available": 30}],
+        [
+            {"backlog_item_id": "b1", "status": "Pending", "quantity": 40},
+            {"backlog_item_id": "b1", "status": "Received", "quantity": 1000},
+        ],
+    )
+
+
+class TestReplenishmentPlan:
+    """Test suite for the vectorized recommendation join."""
+
+    def test_join_splits_sku_totals_across_warehouses(self, plan):
+        """Test the projected position, shortfall, quantity and cost of each row."""
+        rows = {row["id"]: row for row in plan.recommendations()}
+
+        # SKU-A: demand 60, backlog 20 and 40 on order, split over two warehouses
+        assert rows["1"]["forecasted_demand"] == 30.0
+        assert rows["1"]["backlog_quantity"] == 10.0
+        assert rows["1"]["on_order_quantity"] == 20.0
+        assert rows["1"]["projected_quantity"] == 80.0
+        assert rows["1"]["recommended_quantity"] == 0
+
+        assert rows["2"]["projected_quantity"] == 10.0
+        assert rows["2"]["shortfall"] == 70.0
+        assert rows["2"]["recommended_quantity"] == 70
+        assert rows["2"]["recommended_cost"] == 140.0
+
+        assert rows["3"]["projected_quantity"] == 50.0
+        assert rows["3"]["recommended_quantity"] == 50
+        assert rows["3"]["recommended_cost"] == 75.0
+
+    def test_filters_and_shortfall_only(self, plan):
+        """Test warehouse and lower-cased category filters, and dropping rows with nothing to order."""
+        assert [row["id"] for row in plan.recommendations(warehouse=["Tokyo"])] == ["1", "3"]
+        assert [row["id"] for row in plan.recommendations(category=["actuators"])] == ["3"]
+        assert [row["id"] for row in plan.recommendations(shortfall_only=True)] == ["2", "3"]
+        assert plan.recommendations(warehouse=["Paris"]) == []
+
+    def test_incremental_updates(self, plan):
+        """Test that new purchase orders, backlog items and inventory rows update the totals in place."""
+        plan.add_purchase_order({"backlog_item_id": "b1", "status": "Approved", "quantity": 140})
+        plan.add_purchase_order({"backlog_item_id": "unknown", "status": "Pending", "quantity": 5})
+        rows = {row["id"]: row for row in plan.recommendations()}
+        assert rows["2"]["on_order_quantity"] == 90.0
+        assert rows["2"]["recommended_quantity"] == 0
+
+        plan.add_backlog_item({"id": "b2", "item_sku": "SKU-B", "quantity_needed": 25, "quantity_available": 0})
+        plan.add_inventory_item(inventory_item("4", "SKU-C", "London", 0, 10))
+        rows = {row["id"]: row for row in plan.recommendations()}
+        assert rows["3"]["recommended_quantity"] == 75
+        assert rows["4"]["recommended_quantity"] == 10
+        assert len(plan) == 4
+
+
+class TestReplenishmentEndpoint:
+    """Test suite for /api/replenishment/recommendations."""
+
+    def test_recommendations_cover_inventory(self, client):
+        """Test that every inventory item gets a recommendation, in inventory order."""
+        inventory = client.get("/api/inventory").json()
+        response = client.get("/api/replenishment/recommendations")
+        assert response.status_code == 200
+
+        rows = response.json()
+        assert [row["id"] for row in rows] == [item["id"] for item in inventory]
+        for row in rows:
+            assert row["recommended_quantity"] >= 0
+            assert row["recommended_cost"] == pytest.approx(row["recommended_quantity"] * row["unit_cost"])
+
+    def test_shortfall_only_with_filters(self, client):
+        """Test that filtered shortfall-only results are the matching rows that need ordering."""
+        everything = client.get("/api/replenishment/recommendations?warehouse=Tokyo").json()
+        response = client.get("/api/replenishment/recommendations?warehouse=Tokyo&shortfall_only=true")
+        assert response.json() == [row for row in everything if row["recommended_quantity"] > 0]
+        assert all(row["projected_quantity"] < row["reorder_point"] for row in response.json())
@@ -0,0 +1,299 @@
+"""
+Tests for the repository backends behind the API endpoints.
+"""
+import pytest
+
+from repository import InMemoryRepository, SqliteRepository, build_sqlite_database
+
+
+@pytest.fixture(scope="module")
+def sqlite_path(tmp_path_factory):
+    """A SQLite database built from the sample data."""
+    from mock_data import load_datasets
+
+    path = str(tmp_path_factory.mktemp("sqlite") / "inventory.db")
+    build_sqlite_database(path, **load_datasets())
+    return path
+
+
+@pytest.fixture
+def use_sqlite(sqlite_path, monkeypatch):
+    """Return a function switching the endpoints over to a fresh SQLite repository."""
+    import main
+
+    def switch():
+        repository = SqliteRepository(sqlite_path)
+        monkeypatch.setattr(main, "repository", repository)
+        main.response_cache.clear()
+        return repository
+
+    yield switch
+    main.response_cache.clear()
+
+
+class TestSqliteRepository:
+    """Test suite checking the SQLite backend against the in-memory one."""
+
+    @pytest.mark.parametrize("path", [
+        "/api/inventory",
+        "/api/inventory?warehouse=Tokyo&category=SENSORS",
+        "/api/inventory?limit=7&after=3&include_total=true",
+        "/api/orders",
+        "/api/orders?warehouse=London&status=delivered",
+        "/api/orders?month=Q2-2025&category=Sensors",
+        "/api/orders?month=2025-12",
+        "/api/orders?month=2025&limit=5&after=10&include_total=true",
+        "/api/orders?month=Q9-2025&fields=id,status",
+        "/api/orders?stream=true&warehouse=Tokyo",
+        "/api/orders/1",
+        "/api/inventory/1",
+        "/api/demand",
+        "/api/backlog",
+        "/api/dashboard/summary",
+        "/api/dashboard/summary?warehouse=Tokyo&category=sensors&status=Processing",
+        "/api/dashboard/summary?month=Q3-2025",
+        "/api/dashboard/summary?month=2025-0",
+        "/api/dashboard/bundle?warehouse=Tokyo&month=2025-03&include=summary,orders,inventory,backlog,demand",
+        "/api/spending/summary",
+        "/api/spending/monthly",
+        "/api/spending/categories",
+        "/api/spending/summary?warehouse=A&category=Components&month=2025-09",
+        "/api/spending/monthly?month=09-1",
+        "/api/spending/breakdown?by=vendor&warehouse=B",
+        "/api/spending/transactions",
+        "/api/reports/monthly-trends",
+        "/api/replenishment/recommendations?category=sensors",
+        "/api/replenishment/recommendations?warehouse=Tokyo&shortfall_only=true",
+        "/api/search?q=sens",
+        "/api/search?q=ORD-2025-00&limit=50",
+        "/api/search?q=ilter%20cart&limit=100",
+        "/api/search?q=corp&types=customer,order_item",
+        "/api/search?q=o&limit=100",
+    ])
+    def test_matches_memory_backend(self, client, use_sqlite, path):
+        """Test that responses are identical whichever backend serves them."""
+        expected = client.get(path)
+        use_sqlite()
+        actual = client.get(path)
+
+        assert actual.status_code == expected.status_code
+        assert actual.content == expected.content
+        assert actual.headers.get("X-Next-Cursor") == expected.headers.get("X-Next-Cursor")
+        assert actual.headers.get("X-Total-Count") == expected.headers.get("X-Total-Count")
+
+    @pytest.mark.parametrize("path", [
+        "/api/reports/quarterly",
+        "/api/reports/quarterly?warehouse=Tokyo",
+        "/api/reports/monthly-trends?category=sensors&status=delivered",
+    ])
+    def test_reports_match(self, client, use_sqlite, path):
+        """Test that report rows agree, allowing for summation order in revenue."""
+        expected = client.get(path).json()
+        use_sqlite()
+        actual = client.get(path).json()
+
+        assert len(actual) == len(expected)
+        for row, expected_row in zip(actual, expected):
+            assert row == pytest.approx(expected_row)
+
+    @pytest.mark.parametrize("path,body", [
+        ("/api/inventory/batch", {"ids": ["3", "1", "missing"], "skus": ["PCB-001", "NONE"]}),
+        ("/api/orders/batch", {"ids": [str(n) for n in range(600, 0, -1)], "order_numbers": ["ORD-2025-0001"]}),
+    ])
+    def test_batch_lookup_matches(self, client, use_sqlite, path, body):
+        """Test that batch lookups, including ones spanning several SQL batches, agree."""
+        expected = client.post(path, json=body)
+        use_sqlite()
+        actual = client.post(path, json=body)
+
+        assert actual.status_code == expected.status_code == 200
+        assert actual.content == expected.content
+
+    def test_pages_cover_full_result(self, client, use_sqlite):
+        """Test that walking every page of a filtered query returns the full result."""
+        use_sqlite()
+        expected = client.get("/api/orders?status=delivered").json()
+
+        records, cursor = [], None
+        while True:
+            response = client.get("/api/orders?status=delivered&limit=9" + (f"&after={cursor}" if cursor else ""))
+            records.extend(response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+        assert records == expected
+
+    def test_purchase_order_roundtrip(self, client, use_sqlite):
+        """Test that purchase orders are written to and read back from the database."""
+        repository = use_sqlite()
+        backlog_item_id = client.get("/api/backlog").json()[0]["id"]
+        version = repository.version.value
+
+        created = client.post("/api/purchase-orders", json={
+            "backlog_item_id": backlog_item_id,
+            "supplier_name": "Industrial Supply Co",
+            "quantity": 10,
+            "unit_cost": 2.5,
+            "expected_delivery_date": "2025-10-15"
+        }).json()
+
+        assert repository.version.value > version
+        assert client.get(f"/api/purchase-orders/{backlog_item_id}").json() == created
+        backlog = {item["id"]: item for item in client.get("/api/backlog").json()}
+        assert backlog[backlog_item_id]["has_purchase_order"] is True
+
+    def test_version_is_shared_between_workers(self, tmp_path):
+        """Test that a write through one worker's repository moves the version every worker sees."""
+        from mock_data import load_datasets
+
+        path = str(tmp_path / "inventory.db")
+        build_sqlite_database(path, **load_datasets())
+        writer, reader = SqliteRepository(path), SqliteRepository(path)
+        version = reader.version.value
+
+        writer.adjust_inventory([("1", 1)])
+        assert reader.version.value == writer.version.value > version
+        writer.add_purchase_order({"id": "PO-9999", "backlog_item_id": "1"})
+        assert reader.version.value == version + 2
+
+    def test_concurrent_builds(self, tmp_path):
+        """Test that builds of the same database running at once each write a file of their own."""
+        import sqlite3
+        import threading
+        from mock_data import load_datasets
+
+        path = str(tmp_path / "inventory.db")
+        datasets = load_datasets()
+        errors = []
+
+        def build():
+            try:
+                build_sqlite_database(path, **datasets)
+            except Exception as error:
+                errors.append(error)
+        threads = [threading.Thread(target=build) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == [] and [p.name for p in tmp_path.iterdir()] == ["inventory.db"]
+        (count,), = sqlite3.connect(path).execute("SELECT COUNT(*) FROM orders").fetchall()
+        assert count == len(datasets["orders"])
+
+    def test_local_writes_are_not_rebuilt_over(self, tmp_path, monkeypatch, caplog):
+        """Test that newer JSON files rebuild an untouched database but not one holding API writes."""
+        import os
+        from mock_data import load_sqlite_repository
+
+        path = str(tmp_path / "inventory.db")
+        monkeypatch.setenv("INVENTORY_SQLITE_PATH", path)
+        version = load_sqlite_repository().version.value
+        os.utime(path, (0, 0))
+        repository = load_sqlite_repository()
+        assert repository.version.value != version
+
+        repository.add_purchase_order({"id": "PO-9999", "backlog_item_id": "1"})
+        version = repository.version.value
+        os.utime(path, (0, 0))
+        assert load_sqlite_repository().version.value == version
+        assert "holds writes made through the API" in caplog.text
+
+    def test_search_and_replenishment_follow_writes(self, tmp_path):
+        """Test that orders and purchase orders written through the API are searchable and planned for."""
+        from mock_data import load_dataset, load_datasets
+
+        path = str(tmp_path / "inventory.db")
+        build_sqlite_database(path, **load_datasets())
+        backends = [InMemoryRepository(load_dataset), SqliteRepository(path)]
+        item = backends[0].backlog_items()[0]
+        for repository in backends:
+            repository.add_orders([{"id": "9001", "order_number": "ORD-2099-0001", "customer": "Zenith Labs",
+                                    "items": [{"sku": item["item_sku"], "name": "Zenith Probe"}]}])
+            repository.add_purchase_order({"id": "PO-9999", "backlog_item_id": item["id"], "status": "Pending",
+                                           "quantity": 25})
+        memory, sqlite = backends
+
+        for query in ("zenith", "ORD-2099", "probe"):
+            assert sqlite.search(query, 20) == memory.search(query, 20) != []
+        criteria = {"warehouse": None, "category": None}
+        assert sqlite.replenishment(criteria) == memory.replenishment(criteria)
+
+    def test_older_schema_is_upgraded_in_place(self, tmp_path, monkeypatch):
+        """Test that a database without the search tables gains them and keeps records written to it."""
+        import sqlite3
+        from mock_data import load_sqlite_repository
+
+        path = str(tmp_path / "inventory.db")
+        monkeypatch.setenv("INVENTORY_SQLITE_PATH", path)
+        load_sqlite_repository().add_purchase_order({"id": "PO-9999", "backlog_item_id": "1"})
+        connection = sqlite3.connect(path)
+        connection.executescript("DROP TABLE search_keys; DROP TABLE search_words; DROP TABLE search_summaries; "
+                                 "PRAGMA user_version = 2;")
+        connection.close()
+
+        repository = load_sqlite_repository()
+        assert repository.has_purchase_order_id("PO-9999")
+        assert repository.search("ORD-2025-0001", 1)[0]["order_number"] == "ORD-2025-0001"
+
+    def test_exact_sum_aggregate(self, sqlite_path):
+        """Test that SQL totals are correctly rounded rather than accumulated left to right."""
+        import math
+
+        repository = SqliteRepository(sqlite_path)
+        connection = repository._connection()
+        values = [1e16, 1.0, -1e16, 0.1, 0.2]
+        (total,), = connection.execute(
+            "SELECT exact_sum(value) FROM (" + " UNION ALL ".join("SELECT ? AS value" for _ in values) + ")",
+            values
+        ).fetchall()
+        assert total == math.fsum(values)
+
+
+class TestInMemoryRepository:
+    """Test suite for the in-memory backend."""
+
+    def test_datasets_load_on_first_use(self, client, monkeypatch):
+        """Test that an endpoint only loads the datasets it reads."""
+        import main
+        from mock_data import load_dataset
+
+        loaded = []
+
+        def load(name):
+            loaded.append(name)
+            return load_dataset(name)
+
+        monkeypatch.setattr(main, "repository", InMemoryRepository(load))
+        main.response_cache.clear()
+
+        assert client.get("/api/inventory?limit=5").status_code == 200
+        assert loaded == ["inventory_items"]
+
+        client.get("/api/dashboard/summary")
+        client.get("/api/dashboard/summary?warehouse=Tokyo")
+        assert sorted(loaded) == ["backlog_items", "inventory_items", "orders"]
+        main.response_cache.clear()
+
+    def test_version_moves_after_derived_structures(self):
+        """Test that a reader seeing a new version also finds the change in the search index and plan."""
+        from data_store import DatasetVersion
+        from mock_data import load_dataset
+
+        repository = InMemoryRepository(load_dataset)
+        seen = []
+
+        class Version(DatasetVersion):
+            def bump(self, *_):
+                item = repository.replenishment({"warehouse": None, "category": None})[0]
+                seen.append((repository.search("ORD-2099-0001", 1) != [], item["quantity_on_hand"]))
+                super().bump()
+
+        repository.version = Version()
+        repository.warm()
+        item_id = repository.inventory_store.records[0]["id"]
+        quantity = repository.inventory_store.records[0]["quantity_on_hand"]
+        repository.add_orders([dict(repository.order_store.records[0], id="9001", order_number="ORD-2099-0001")])
+        repository.adjust_inventory([(item_id, 5)])
+
+        assert seen == [(True, quantity), (True, quantity + 5)]
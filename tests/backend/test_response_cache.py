@@ -0,0 +1,74 @@
+"""
+Tests for the pre-serialized response cache.
+"""
+import pytest
+
+from response_cache import ResponseCache, cache_key
+
+
+class TestResponseCache:
+    """Test suite for ResponseCache."""
+
+    def test_version_mismatch_is_a_miss(self):
+        """Test that entries built from an older dataset version are discarded."""
+        cache = ResponseCache()
+        cache.put(("/a", ()), 1, b"[1]")
+
+        assert cache.get(("/a", ()), 1) == b"[1]"
+        assert cache.get(("/a", ()), 2) is None
+        assert len(cache) == 0
+
+    def test_lru_eviction_by_entries_and_bytes(self):
+        """Test that the least recently used entries are evicted first."""
+        cache = ResponseCache(max_entries=2, max_bytes=10)
+        cache.put("a", 0, b"1234")
+        cache.put("b", 0, b"1234")
+        cache.get("a", 0)
+        cache.put("c", 0, b"12")
+
+        assert cache.get("b", 0) is None
+        assert cache.get("a", 0) == b"1234"
+
+        cache.put("d", 0, b"12345678")
+        assert cache.get("a", 0) is None
+        assert cache.size <= 10
+
+    def test_cache_key_normalization(self):
+        """Test that parameter order and neutral values do not change the key."""
+        assert cache_key("/x", [("b", "2"), ("a", "1")]) == cache_key("/x", [("a", "1"), ("b", "2"), ("c", "all")])
+
+
+class TestCachedEndpoints:
+    """Test suite for endpoints served through the response cache."""
+
+    @pytest.mark.parametrize("path", [
+        "/api/demand",
+        "/api/spending/summary",
+        "/api/spending/monthly",
+        "/api/spending/categories",
+        "/api/spending/transactions",
+        "/api/inventory",
+    ])
+    def test_hit_returns_identical_body(self, client, path):
+        """Test that a cache hit returns the same bytes as the first response."""
+        from main import response_cache
+
+        first = client.get(path)
+        hits = response_cache.hits
+        second = client.get(path)
+
+        assert second.status_code == 200
+        assert second.content == first.content
+        assert response_cache.hits == hits + 1
+
+    def test_dataset_change_invalidates(self, client):
+        """Test that a dataset version bump forces a rebuild."""
+        from main import response_cache
+        from mock_data import repository
+
+        client.get("/api/inventory")
+        repository.version.bump()
+        misses = response_cache.misses
+        client.get("/api/inventory")
+
+        assert response_cache.misses == misses + 1
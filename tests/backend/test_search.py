@@ -0,0 +1,106 @@
+"""
+Tests for the search index and /api/search.
+"""
+import pytest
+
+from search import SearchIndex
+
+
+@pytest.fixture
+def index():
+    """Two inventory items and three orders sharing customers and line items."""
+    return SearchIndex(
+        [
+            {"id": "1", "sku": "TMP-201", "name": "Temperature Sensor Module", "warehouse": "London",
+             "category": "Sensors"},
+            {"id": "2", "sku": "TMP-202", "name": "Thermostat Controller", "warehouse": "Tokyo",
+             "category": "Controllers"},
+        ],
+        [
+            {"id": "1", "order_number": "ORD-2025-0001", "customer": "MegaCorp Industries",
+             "items": [{"sku": "TMP-201", "name": "Temperature Sensor Module"}]},
+            {"id": "2", "order_number": "ORD-2025-0002", "customer": "MegaCorp Industries",
+             "items": [{"sku": "TMP-201", "name": "Temperature Sensor Module"}]},
+            {"id": "3", "order_number": "ORD-2025-0010", "customer": "Omega Manufacturing", "items": []},
+        ],
+    )
+
+
+def keys(results):
+    return [(result["type"], result.get("id") or result.get("name")) for result in results]
+
+
+class TestSearchIndex:
+    """Test suite for matching and ranking in SearchIndex."""
+
+    def test_key_prefix(self, index):
+        """Test that SKUs and order numbers match by case-insensitive prefix, exact matches scoring highest."""
+        assert keys(index.search("ord-2025-000", 10)) == [("order", "1"), ("order", "2")]
+        assert [(result["order_number"], result["score"]) for result in index.search("ord-2025-001", 10)] == [
+            ("ORD-2025-0010", 5)
+        ]
+        assert index.search("ORD-2025-0001", 10)[0]["score"] == 10
+        assert keys(index.search("tmp-20", 10)) == [("inventory", "1"), ("inventory", "2")]
+
+    def test_words_match_whole_prefix_and_infix(self, index):
+        """Test that whole words score above word prefixes, which score above infixes."""
+        assert [(result["name"], result["score"]) for result in index.search("mega", 10)] == [
+            ("MegaCorp Industries", 2), ("Omega Manufacturing", 1)
+        ]
+        assert index.search("megacorp", 10)[0] == {
+            "type": "customer", "name": "MegaCorp Industries", "order_count": 2, "score": 3
+        }
+
+    def test_every_query_word_must_match(self, index):
+        """Test that multi-word queries only match entries containing every word, scores summed."""
+        results = index.search("temp sens", 10)
+        assert keys(results) == [("inventory", "1"), ("order_item", "Temperature Sensor Module")]
+        assert {result["score"] for result in results} == {4}
+        assert index.search("temp controller", 10) == []
+
+    def test_limit_and_types(self, index):
+        """Test that results are cut to the limit and to the requested types."""
+        assert len(index.search("ord", 2)) == 2
+        assert keys(index.search("temperature", 10, types=["order_item"])) == [
+            ("order_item", "Temperature Sensor Module")
+        ]
+
+    def test_incremental_updates(self, index):
+        """Test that added records are searchable and counted without a rebuild."""
+        index.add_order({"id": "4", "order_number": "ORD-2025-0003", "customer": "Zenith Labs",
+                         "items": [{"sku": "TMP-201", "name": "Temperature Sensor Module"}]})
+        index.add_inventory_item({"id": "3", "sku": "VLV-301", "name": "Solenoid Valve"})
+
+        assert keys(index.search("ord-2025-000", 10)) == [("order", "1"), ("order", "2"), ("order", "4")]
+        assert keys(index.search("zenith", 10)) == [("customer", "Zenith Labs")]
+        assert keys(index.search("vlv", 10)) == [("inventory", "3")]
+        assert keys(index.search("olenoid", 10)) == [("inventory", "3")]
+        assert index.search("temperature", 10, types=["order_item"])[0]["order_count"] == 3
+
+
+class TestSearchEndpoint:
+    """Test suite for /api/search."""
+
+    def test_finds_sku_order_and_customer(self, client):
+        """Test that SKUs, order numbers and customers in the sample data are found."""
+        inventory = client.get("/api/inventory").json()
+        orders = client.get("/api/orders").json()
+        order = orders[0]
+
+        top = client.get("/api/search", params={"q": inventory[0]["sku"]}).json()[0]
+        assert (top["type"], top["id"]) == ("inventory", inventory[0]["id"])
+        top = client.get("/api/search", params={"q": order["order_number"]}).json()[0]
+        assert (top["type"], top["id"]) == ("order", order["id"])
+
+        customers = client.get("/api/search", params={"q": order["customer"], "types": "customer"}).json()
+        assert customers[0]["name"] == order["customer"]
+        assert customers[0]["order_count"] == sum(o["customer"] == order["customer"] for o in orders)
+
+    def test_limit_and_validation(self, client):
+        """Test the limit bound, and rejection of empty queries and unknown types."""
+        assert len(client.get("/api/search?q=ord&limit=3").json()) == 3
+        assert client.get("/api/search?q=").status_code == 422
+        assert client.get("/api/search?q=ord&limit=101").status_code == 422
+        response = client.get("/api/search?q=ord&types=order,suppliers")
+        assert response.status_code == 400
+        assert "suppliers" in response.json()["detail"]
@@ -0,0 +1,154 @@
+"""
+Tests for memory-mapped shared datasets and the shared backend.
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from columnar import OrderColumns
+from shared_dataset import MappedRecords, load_shared
+
+
+@pytest.fixture
+def source(tmp_path):
+    """A small JSON data file."""
+    path = tmp_path / "orders.json"
+    path.write_text(json.dumps([
+        {"id": "1", "order_number": "ORD-1", "warehouse": "London", "category": "Sensors", "status": "Delivered",
+         "order_date": "2025-01-03T10:00:00", "total_value": 10.0, "items": [{"sku": "A", "quantity": 2}]},
+        {"id": "2", "order_number": "ORD-2", "warehouse": "Tokyo", "category": "Valves", "status": "Processing",
+         "order_date": "2025-02-03T10:00:00", "total_value": 5.5, "items": []},
+    ]))
+    return str(path)
+
+
+def loader(source, calls):
+    def load():
+        calls.append(source)
+        with open(source) as f:
+            return json.load(f)
+    return load
+
+
+class TestMappedRecords:
+    """Test suite for building, attaching to and reading shared dataset files."""
+
+    def test_records_round_trip(self, source, tmp_path):
+        """Test that mapped records decode to the source records, with appends kept in an overlay."""
+        with open(source) as f:
+            expected = json.load(f)
+        records = load_shared(source, str(tmp_path / "shared" / "orders.shared"), loader(source, []))
+
+        assert isinstance(records, MappedRecords)
+        assert list(records) == expected
+        assert (records[1], records[-1], records[0:1]) == (expected[1], expected[1], expected[:1])
+
+        added = {"id": "3"}
+        records.append(added)
+        assert len(records) == 3
+        assert records[2] is added and list(records)[-1] is added
+
+    def test_built_once_and_rebuilt_when_stale(self, source, tmp_path):
+        """Test that later loads attach to the file, and a changed source rebuilds it."""
+        path, calls = str(tmp_path / "orders.shared"), []
+        load_shared(source, path, loader(source, calls))
+        load_shared(source, path, loader(source, calls))
+        assert len(calls) == 1
+
+        stat = os.stat(source)
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert len(load_shared(source, path, loader(source, calls))) == 2
+        assert len(calls) == 2
+
+    def test_order_columns_are_mapped(self, source, tmp_path):
+        """Test that order columns saved with the records are used in place and answer like fresh ones."""
+        with open(source) as f:
+            orders = json.load(f)
+        records = load_shared(source, str(tmp_path / "orders.shared"), loader(source, []),
+                              OrderColumns.shared_columns)
+        records.append(dict(orders[0], id="3", total_value=1.0))
+
+        attached = OrderColumns.attach(records.columns, records.meta, records.appended)
+        fresh = OrderColumns(list(records))
+        assert not records.columns["total_value"].flags.writeable
+        for criteria in ({}, {"warehouse": ["London"]}, {"status": ["processing"], "month": [202502]}):
+            assert attached.order_totals(attached.mask(**criteria)) == fresh.order_totals(fresh.mask(**criteria))
+        assert np.array_equal(attached.item_offsets, fresh.item_offsets)
+        assert attached.sku_quantities(attached.mask()) == {"A": 4}
+
+    def test_key_indexes_are_mapped(self, source, tmp_path):
+        """Test that a store indexed from the file's key indexes answers like one that built its own."""
+        from data_store import IndexedCollection, field_key
+        from repository import SHARED_ORDER_KEYS
+        from shared_dataset import MappedPositions
+
+        records = load_shared(source, str(tmp_path / "orders.shared"), loader(source, []),
+                              key_indexes=SHARED_ORDER_KEYS)
+        indexes = {"warehouse": field_key("warehouse"), "order_number": field_key("order_number")}
+        mapped = IndexedCollection(records, indexes, records.mapped_indexes(("id", "order_number")))
+        built = IndexedCollection(list(records), indexes)
+        assert isinstance(mapped.id_positions, MappedPositions)
+
+        added = dict(records[0], id="3", order_number="ORD-3")
+        for store in (mapped, built):
+            store.add(added)
+        for key in ("1", "2", "3", "4"):
+            assert mapped.get(key) == built.get(key)
+        for key in ("ORD-1", "ORD-3", "ORD-4", None):
+            assert mapped.lookup("order_number", key) == built.lookup("order_number", key)
+        criteria = {"warehouse": ["London"], "order_number": ["ORD-1", "ORD-3"]}
+        assert list(mapped.iter_query(**criteria)) == list(built.iter_query(**criteria)) == [records[0], added]
+        assert list(records.key_index("search").prefixed("ord-")) == [("ord-1", [0]), ("ord-2", [1])]
+
+
+class TestSharedBackend:
+    """Test suite checking the shared backend against the in-memory one."""
+
+    @pytest.mark.parametrize("path", [
+        "/api/orders?warehouse=London&status=delivered",
+        "/api/orders?month=2025&limit=5&after=10&include_total=true",
+        "/api/orders/1",
+        "/api/inventory?warehouse=Tokyo&category=SENSORS",
+        "/api/backlog",
+        "/api/dashboard/summary?month=Q3-2025",
+        "/api/reports/monthly-trends?category=sensors&status=delivered",
+        "/api/spending/transactions",
+        "/api/search?q=ORD-2025-00&limit=50",
+        "/api/search?q=ord-2025-0001",
+        "/api/search?q=o&limit=100",
+    ])
+    def test_matches_memory_backend(self, client, monkeypatch, tmp_path, path):
+        """Test that responses are identical when the records are served from mapped files."""
+        import main
+        import mock_data
+        from repository import InMemoryRepository
+
+        expected = client.get(path)
+        monkeypatch.setattr(mock_data, "SHARED_DIR", str(tmp_path))
+        monkeypatch.setattr(main, "repository", InMemoryRepository(mock_data.load_shared_dataset))
+        main.response_cache.clear()
+        actual = client.get(path)
+        main.response_cache.clear()
+
+        assert actual.status_code == expected.status_code == 200
+        assert actual.content == expected.content
+        assert actual.headers.get("X-Total-Count") == expected.headers.get("X-Total-Count")
+
+    def test_appended_orders_are_found(self, tmp_path, monkeypatch):
+        """Test that orders added after the file was mapped are looked up and searched with the mapped ones."""
+        import mock_data
+        from repository import InMemoryRepository
+
+        monkeypatch.setattr(mock_data, "SHARED_DIR", str(tmp_path))
+        memory, shared = InMemoryRepository(mock_data.load_dataset), InMemoryRepository(mock_data.load_shared_dataset)
+        for repository in (memory, shared):
+            repository.search_index
+            order = repository.order_store.records[0]
+            repository.add_orders([dict(order, id="9001", order_number="ORD-2025-00010A")])
+
+        assert shared.get("orders", "9001") == memory.get("orders", "9001")
+        assert shared.get_many("orders", "order_number", ["ORD-2025-00010A"]) == \
+            memory.get_many("orders", "order_number", ["ORD-2025-00010A"])
+        assert shared.search("ORD-2025-0001", 20) == memory.search("ORD-2025-0001", 20)
@@ -0,0 +1,66 @@
+"""
+Tests for the binary snapshot cache of the JSON data files.
+"""
+import json
+import os
+
+import pytest
+
+import snapshot
+from snapshot import load_json, snapshot_path
+
+
+@pytest.fixture
+def source(tmp_path):
+    """A small JSON data file."""
+    path = tmp_path / "orders.json"
+    path.write_text(json.dumps([{"id": "1", "total_value": 10.5, "items": [], "actual_delivery": None}]))
+    return str(path)
+
+
+def fail_json_load(*args, **kwargs):
+    raise AssertionError("JSON should not be parsed")
+
+
+class TestSnapshot:
+    """Test suite for snapshot loading and invalidation."""
+
+    def test_first_load_writes_snapshot(self, source, tmp_path):
+        """Test that loading a file leaves a snapshot behind."""
+        data = load_json(source, str(tmp_path / "snapshots"))
+
+        assert data == json.loads(open(source).read())
+        assert os.path.exists(snapshot_path(source, str(tmp_path / "snapshots")))
+
+    def test_unchanged_source_skips_json(self, source, tmp_path, monkeypatch):
+        """Test that a current snapshot is used without parsing the JSON."""
+        expected = load_json(source, str(tmp_path))
+
+        monkeypatch.setattr(snapshot.json, "load", fail_json_load)
+        assert load_json(source, str(tmp_path)) == expected
+
+    def test_changed_source_rebuilds(self, source, tmp_path):
+        """Test that editing the source invalidates the snapshot."""
+        load_json(source, str(tmp_path))
+
+        with open(source, "w") as f:
+            json.dump([{"id": "2"}, {"id": "3"}], f)
+        stat = os.stat(source)
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        assert load_json(source, str(tmp_path)) == [{"id": "2"}, {"id": "3"}]
+
+    def test_corrupt_snapshot_falls_back(self, source, tmp_path):
+        """Test that an unreadable snapshot is replaced from the JSON."""
+        load_json(source, str(tmp_path))
+        with open(snapshot_path(source, str(tmp_path)), "wb") as f:
+            f.write(b"not a snapshot")
+
+        assert load_json(source, str(tmp_path)) == json.loads(open(source).read())
+
+    def test_unwritable_snapshot_dir(self, source, tmp_path):
+        """Test that loading still works when no snapshot can be written."""
+        blocked = tmp_path / "blocked"
+        blocked.write_text("a file where the snapshot directory should be")
+
+        assert load_json(source, str(blocked)) == json.loads(open(source).read())
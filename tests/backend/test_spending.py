@@ -0,0 +1,124 @@
+"""
+Tests for spending analytics derived from the transactions.
+"""
+import pytest
+
+from aggregates import SpendingRollup, category_spending, monthly_spending, spending_breakdown, spending_summary
+
+
+def transaction(date, amount, txn_type="Purchase", category="Components", warehouse="A", vendor="Acme"):
+    return {"date": date, "amount": amount, "type": txn_type, "category": category,
+            "warehouse": warehouse, "vendor": vendor}
+
+
+@pytest.fixture
+def rollup():
+    """Spending in August and September across two warehouses, types and vendors."""
+    return SpendingRollup([
+        transaction("2025-08-03", 100.0),
+        transaction("2025-08-09", 40.0, "Operational", "Labor", vendor="Internal"),
+        transaction("2025-09-01", 150.0),
+        transaction("2025-09-02", 50.0, category="Sensors", warehouse="B"),
+        transaction("2025-09-20", 60.0, "Operational", "Labor", vendor="Internal"),
+        transaction("2025-09-21", 25.0, "Overhead", "Overhead", warehouse="B", vendor="PowerGrid"),
+    ])
+
+
+class TestSpendingRollup:
+    """Test suite for SpendingRollup and the spending documents built from it."""
+
+    def test_totals_group_and_filter(self, rollup):
+        """Test grouping by any dimension under warehouse, lower-cased category and month filters."""
+        assert rollup.totals(("vendor",)) == {("Acme",): (3, 300.0), ("Internal",): (2, 100.0),
+                                              ("PowerGrid",): (1, 25.0)}
+        assert rollup.totals(("warehouse",), category={"components"}) == {("A",): (2, 250.0)}
+        assert rollup.totals(("type", "month"), warehouse={"B"}, month={202509}) == {
+            ("Purchase", 202509): (1, 50.0), ("Overhead", 202509): (1, 25.0)
+        }
+
+    def test_incremental_updates(self, rollup):
+        """Test that added and removed transactions move the cells without a rebuild."""
+        added = transaction("2025-10-01", 30.0, vendor="Newco")
+        rollup.add_transaction(added)
+        assert rollup.totals(("month",), category={"components"})[(202510,)] == (1, 30.0)
+
+        rollup.remove_transaction(added)
+        assert (202510,) not in rollup.totals(("month",))
+        assert ("A", "Components", "Purchase", "Newco", 202510) not in rollup.cells
+
+    def test_summary_changes_on_previous_month(self, rollup):
+        """Test bucket totals over the selected months and the latest month's change."""
+        totals = rollup.totals(("type", "category", "month"))
+        summary = spending_summary(totals)
+        assert summary["total_procurement_cost"] == 300.0
+        assert summary["total_labor_cost"] == 100.0
+        assert summary["total_overhead"] == 25.0
+        assert summary["total_operational_cost"] == 0.0
+        assert summary["procurement_change"] == 100.0
+        assert summary["labor_change"] == 50.0
+        assert summary["overhead_change"] == 0.0
+
+        # Selecting September alone still compares against August
+        september = spending_summary(totals, {202509})
+        assert september["total_procurement_cost"] == 200.0
+        assert september["procurement_change"] == 100.0
+
+    def test_monthly_and_categories(self, rollup):
+        """Test monthly bucket rows and procurement shares per category."""
+        totals = rollup.totals(("type", "category", "month"))
+        assert monthly_spending(totals, {202509}) == [{
+            "month": "Sep", "period": "2025-09", "procurement": 200.0, "operational": 0.0,
+            "labor": 60.0, "overhead": 25.0,
+        }]
+        assert category_spending(totals) == [
+            {"category": "Components", "amount": 250.0, "percentage": 83.3, "change": 50.0},
+            {"category": "Sensors", "amount": 50.0, "percentage": 16.7, "change": 0.0},
+        ]
+
+    def test_breakdown_rows(self, rollup):
+        """Test breakdown rows largest first, with months as YYYY-MM labels."""
+        assert spending_breakdown("month", rollup.totals(("month",))) == [
+            {"month": "2025-09", "amount": 285.0, "transaction_count": 4, "percentage": 67.1},
+            {"month": "2025-08", "amount": 140.0, "transaction_count": 2, "percentage": 32.9},
+        ]
+
+
+class TestSpendingEndpoints:
+    """Test suite for filtering the spending endpoints against the transactions."""
+
+    def test_filtered_summary_matches_transactions(self, client):
+        """Test that a filtered summary adds up exactly the matching transactions."""
+        transactions = client.get("/api/spending/transactions").json()
+        summary = client.get("/api/spending/summary?warehouse=A&category=operational").json()
+
+        expected = sum(t["amount"] for t in transactions if t["warehouse"] == "A" and t["category"] == "Operational")
+        assert summary["total_operational_cost"] == pytest.approx(expected)
+        assert summary["total_procurement_cost"] == summary["total_labor_cost"] == summary["total_overhead"] == 0
+
+    def test_breakdown_by_vendor(self, client):
+        """Test that a breakdown covers every matching transaction once."""
+        transactions = [t for t in client.get("/api/spending/transactions").json() if t["warehouse"] == "B"]
+        rows = client.get("/api/spending/breakdown?by=vendor&warehouse=B").json()
+
+        assert sum(row["transaction_count"] for row in rows) == len(transactions)
+        assert sum(row["amount"] for row in rows) == pytest.approx(sum(t["amount"] for t in transactions))
+        assert client.get("/api/spending/breakdown?by=supplier").status_code == 422
+
+    def test_added_transaction_updates_responses(self, client, monkeypatch):
+        """Test that an appended transaction shows up in the next response."""
+        import main
+        from mock_data import load_dataset
+        from repository import InMemoryRepository
+
+        repository = InMemoryRepository(load_dataset)
+        monkeypatch.setattr(main, "repository", repository)
+        main.response_cache.clear()
+
+        before = client.get("/api/spending/categories").json()
+        repository.add_transaction(transaction("2025-09-30", 1000.0, category="Valves"))
+        after = client.get("/api/spending/categories").json()
+        main.response_cache.clear()
+
+        assert len(after) == len(before) + 1
+        assert {"category": "Valves", "amount": 1000.0}.items() <= next(
+            row for row in after if row["category"] == "Valves").items()
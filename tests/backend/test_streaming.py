@@ -0,0 +1,50 @@
+"""
+Tests for NDJSON streaming on collection endpoints.
+"""
+import json
+
+import pytest
+
+
+def parse_ndjson(response):
+    """Decode an NDJSON body into a list of records."""
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+class TestStreaming:
+    """Test suite for streamed collection responses."""
+
+    @pytest.mark.parametrize("path", [
+        "/api/orders",
+        "/api/orders?warehouse=London&month=Q3-2025",
+        "/api/inventory?category=Sensors",
+        "/api/spending/transactions",
+    ])
+    def test_stream_query_param(self, client, path):
+        """Test that ?stream=1 returns the same records as NDJSON."""
+        expected = client.get(path).json()
+        separator = "&" if "?" in path else "?"
+
+        response = client.get(f"{path}{separator}stream=1")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert parse_ndjson(response) == expected
+
+    def test_stream_accept_header(self, client):
+        """Test that Accept: application/x-ndjson opts into streaming."""
+        response = client.get("/api/orders?status=Delivered", headers={"Accept": "application/x-ndjson"})
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert len(parse_ndjson(response)) == len(client.get("/api/orders?status=Delivered").json())
+
+    def test_stream_with_projection_and_limit(self, client):
+        """Test that streaming honours fields= and limit."""
+        response = client.get("/api/orders?stream=1&fields=id,total_value&limit=3")
+        records = parse_ndjson(response)
+
+        assert len(records) == 3
+        assert all(set(record) == {"id", "total_value"} for record in records)
+
+    def test_default_response_is_json(self, client):
+        """Test that plain requests still get a JSON array."""
+        response = client.get("/api/orders")
+        assert response.headers["content-type"].startswith("application/json")
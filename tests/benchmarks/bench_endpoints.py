@@ -0,0 +1,123 @@
+"""
+Endpoint benchmark runner.
+
+Loads the app against the dataset in --data-dir, drives each endpoint through
+the ASGI app and prints latency percentiles (milliseconds) and peak RSS as JSON.
+Runs in its own process so every dataset size starts from a clean interpreter
+and the peak memory belongs to that size alone.
+
+Usage:
+    python bench_endpoints.py --data-dir /tmp/bench-data --requests 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+SERVER_DIR = Path(__file__).parent.parent.parent / "server"
+
+ENDPOINTS = [
+    "/api/inventory",
+    "/api/inventory?warehouse=Tokyo&category=Sensors",
+    "/api/orders?limit=100",
+    "/api/orders?warehouse=London&status=Delivered&limit=100",
+    "/api/orders?month=Q2-2025&limit=100&after=200",
+    "/api/dashboard/summary",
+    "/api/dashboard/summary?warehouse=Tokyo&month=2025-03",
+    "/api/dashboard/summary?month=2025-0",
+    "/api/demand",
+    "/api/backlog",
+    "/api/spending/summary",
+    "/api/spending/transactions",
+    "/api/reports/quarterly",
+    "/api/reports/monthly-trends?warehouse=San Francisco",
+    "/api/replenishment/recommendations?shortfall_only=true",
+]
+
+
+# Endpoints driven concurrently to measure throughput under load
+THROUGHPUT_ENDPOINTS = [
+    "/api/dashboard/summary?warehouse=Tokyo",
+    "/api/orders?status=Delivered&limit=50",
+    "/api/inventory?category=Sensors&limit=20",
+    "/api/reports/monthly-trends",
+]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+async def measure(app, requests):
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for endpoint in ENDPOINTS:
+            samples = []
+            for _ in range(requests):
+                started = time.perf_counter()
+                response = await client.get(endpoint)
+                samples.append((time.perf_counter() - started) * 1000)
+                response.raise_for_status()
+            results[endpoint] = {
+                "p50": round(percentile(samples, 0.50), 3),
+                "p95": round(percentile(samples, 0.95), 3),
+                "p99": round(percentile(samples, 0.99), 3),
+            }
+    return results
+
+
+async def throughput(app, concurrency, requests):
+    """Requests per second with `concurrency` clients issuing `requests` requests in total"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        remaining = iter(range(requests))
+
+        async def worker():
+            for n in remaining:
+                response = await client.get(THROUGHPUT_ENDPOINTS[n % len(THROUGHPUT_ENDPOINTS)])
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return round(requests / (time.perf_counter() - started), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API endpoints against a dataset")
+    parser.add_argument("--data-dir", required=True)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=500)
+    args = parser.parse_args()
+
+    os.environ["INVENTORY_DATA_DIR"] = args.data_dir
+    sys.path.insert(0, str(SERVER_DIR))
+    started = time.perf_counter()
+    from main import app
+    load_seconds = time.perf_counter() - started
+
+    endpoints = asyncio.run(measure(app, args.requests))
+    requests_per_second = asyncio.run(throughput(app, args.concurrency, args.concurrency * 4))
+    print(json.dumps({
+        "load_seconds": round(load_seconds, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "endpoints": endpoints,
+        "throughput": {"concurrency": args.concurrency, "requests_per_second": requests_per_second},
+    }))
+
+
+if __name__ == "__main__":
+    main()
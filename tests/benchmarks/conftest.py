@@ -0,0 +1,68 @@
+"""
+Pytest configuration and fixtures for endpoint benchmarks.
+
+Benchmarks are not collected by the default test run; run them explicitly:
+    cd tests && pytest benchmarks
+
+BENCH_SIZES          comma-separated order counts to benchmark (default 1000,10000)
+BENCH_REQUESTS       requests per endpoint (default 50)
+BENCH_TOLERANCE      allowed ratio over the baseline before failing (default 1.5)
+BENCH_SLACK_MS       absolute latency slack so sub-millisecond noise never fails (default 1.0)
+BENCH_UPDATE_BASELINE=1 rewrites baseline.json with the measured results
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SERVER_PATH = Path(__file__).parent.parent.parent / "server"
+RUNNER = Path(__file__).parent / "bench_endpoints.py"
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+
+BENCH_SIZES = [int(size) for size in os.environ.get("BENCH_SIZES", "1000,10000").split(",") if size]
+BENCH_REQUESTS = int(os.environ.get("BENCH_REQUESTS", "50"))
+BENCH_TOLERANCE = float(os.environ.get("BENCH_TOLERANCE", "1.5"))
+BENCH_SLACK_MS = float(os.environ.get("BENCH_SLACK_MS", "1.0"))
+UPDATE_BASELINE = os.environ.get("BENCH_UPDATE_BASELINE") == "1"
+
+sys.path.insert(0, str(SERVER_PATH))
+
+from generate_data import generate
+
+
+def dataset_scale(orders):
+    """Scale the other datasets with the order count so every file grows with it"""
+    return {
+        "orders": orders,
+        "skus": max(32, orders // 100),
+        "warehouses": 3,
+        "backlog_items": max(4, orders // 100),
+        "purchase_orders": orders // 1000,
+        "transactions": max(56, orders // 2),
+    }
+
+
+@pytest.fixture(scope="session")
+def baseline():
+    """Stored baseline results keyed by dataset size, written back at the end when updating"""
+    results = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    yield results
+    if UPDATE_BASELINE:
+        BASELINE_PATH.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+
+
+@pytest.fixture(scope="session")
+def run_benchmark(tmp_path_factory):
+    """Generate a seeded dataset of the given size and benchmark it in a fresh interpreter"""
+    def run(orders):
+        data_dir = tmp_path_factory.mktemp(f"data-{orders}")
+        generate(str(data_dir), seed=42, **dataset_scale(orders))
+        completed = subprocess.run(
+            [sys.executable, str(RUNNER), "--data-dir", str(data_dir), "--requests", str(BENCH_REQUESTS)],
+            capture_output=True, text=True, check=True,
+        )
+        return json.loads(completed.stdout.splitlines()[-1])
+    return run
@@ -0,0 +1,43 @@
+"""
+Endpoint latency and memory benchmarks against seeded datasets of increasing size.
+"""
+import pytest
+
+from conftest import BENCH_SIZES, BENCH_SLACK_MS, BENCH_TOLERANCE, UPDATE_BASELINE
+
+
+class TestEndpointBenchmarks:
+    """Benchmark every endpoint and compare with the stored baseline."""
+
+    @pytest.mark.parametrize("orders", BENCH_SIZES)
+    def test_endpoints_within_baseline(self, run_benchmark, baseline, orders):
+        """Test that p95 latency, peak memory and throughput stay within tolerance of the baseline."""
+        result = run_benchmark(orders)
+
+        print(f"\n{orders} orders: loaded in {result['load_seconds']}s, peak RSS {result['peak_rss_mb']} MB")
+        for endpoint, timings in result["endpoints"].items():
+            print(f"  {endpoint}: p50 {timings['p50']}ms  p95 {timings['p95']}ms  p99 {timings['p99']}ms")
+        throughput = result["throughput"]
+        print(f"  {throughput['requests_per_second']} req/s at concurrency {throughput['concurrency']}")
+
+        if UPDATE_BASELINE:
+            baseline[str(orders)] = result
+            return
+
+        expected = baseline.get(str(orders))
+        if expected is None:
+            pytest.skip(f"No baseline for {orders} orders; run with BENCH_UPDATE_BASELINE=1")
+
+        regressions = [
+            f"{endpoint}: p95 {timings['p95']}ms vs baseline {expected['endpoints'][endpoint]['p95']}ms"
+            for endpoint, timings in result["endpoints"].items()
+            if endpoint in expected["endpoints"]
+            and timings["p95"] > expected["endpoints"][endpoint]["p95"] * BENCH_TOLERANCE + BENCH_SLACK_MS
+        ]
+        if result["peak_rss_mb"] > expected["peak_rss_mb"] * BENCH_TOLERANCE:
+            regressions.append(f"peak RSS {result['peak_rss_mb']} MB vs baseline {expected['peak_rss_mb']} MB")
+        expected_throughput = expected.get("throughput", {}).get("requests_per_second")
+        if expected_throughput and throughput["requests_per_second"] < expected_throughput / BENCH_TOLERANCE:
+            regressions.append(f"throughput {throughput['requests_per_second']} req/s "
+                               f"vs baseline {expected_throughput} req/s")
+        assert not regressions, "Regressions against baseline:\n" + "\n".join(regressions)